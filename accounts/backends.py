@@ -1,5 +1,26 @@
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from helper.cache import bump_data_version, versioned_user_key
+
+
+def cached_user_key(user_id):
+    return versioned_user_key('accounts', user_id, 'auth')
+
+
+def forget_cached_user(user_id):
+    """
+    Stop serving the cached copy of a user, see EmailBackend.get_user.
+
+    Bumps the user's version now, so this request never reads the old entry,
+    and again once the save commits: a concurrent request that loaded the row
+    before the commit can only have cached it under the version in between.
+    """
+    bump_data_version('accounts', user_id)
+    transaction.on_commit(lambda: bump_data_version('accounts', user_id))
 
 
 class EmailBackend(ModelBackend):
@@ -14,8 +35,28 @@ class EmailBackend(ModelBackend):
                 return user
 
     def get_user(self, user_id):
-        UserModel = get_user_model()
-        try:
-            return UserModel.objects.get(pk=user_id)
-        except UserModel.DoesNotExist:
-            return None
+        """
+        The session's user, with its profile, served from the cache for
+        AUTH_USER_CACHE_TIMEOUT seconds.
+
+        Entries are keyed by the user's accounts data version, which every save
+        or delete of the user or its profile bumps (accounts.signals). That
+        covers password changes: set_password() is followed by save(), so the
+        session auth hash is never checked against a stale password. Writes
+        that bypass signals, such as QuerySet.update(), show up once the entry
+        expires. The settings only enable this on a shared in-memory cache, as
+        the entry holds the password hash.
+        """
+        timeout = settings.AUTH_USER_CACHE_TIMEOUT
+        key = cached_user_key(user_id) if timeout else None
+        user = cache.get(key) if timeout else None
+        if user is None:
+            UserModel = get_user_model()
+            try:
+                # The navbar shows the profile avatar, so load it with the user rather than per render
+                user = UserModel.objects.select_related('profile').get(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            if timeout:
+                cache.set(key, user, timeout=timeout)
+        return user
@@ -108,11 +108,15 @@ class UpdateProfileForm(ModelForm):
         user = super().save(commit=False)
         user.save()
         profile = user.profile
+        changed = []
         if self.cleaned_data.get('avatar'):
             profile.avatar = self.cleaned_data['avatar']
-        if self.cleaned_data.get('bio'):
+            changed.append('avatar')
+        if self.cleaned_data.get('bio') and self.cleaned_data['bio'] != profile.bio:
             profile.bio = self.cleaned_data['bio']
-        profile.save()
+            changed.append('bio')
+        if changed:
+            profile.save(update_fields=changed + ['updated_at'])
         return user
 
 class Set_Password_Form(SetPasswordForm):
@@ -0,0 +1,73 @@
+import time
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.test import Client, override_settings
+from django.urls import reverse
+
+User = get_user_model()
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def legacy_save_profile(sender, instance, **kwargs):
+    """The receiver accounts.signals used to have: re-save the profile on every user save"""
+    instance.profile.save()
+
+
+class Command(BaseCommand):
+    help = ('Measures login throughput through the login view, with the current signals and with the '
+            'old save-the-profile-on-every-user-save receiver. Runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200, help='Logins per mode')
+        parser.add_argument('--real-hasher', action='store_true',
+                            help='Keep the configured password hasher; by default a fast one isolates the DB cost')
+
+    def handle(self, *args, **options):
+        hashers = {} if options['real_hasher'] else {'PASSWORD_HASHERS': FAST_HASHERS}
+        with override_settings(**hashers), transaction.atomic():
+            password = 'benchmark-password'
+            User.objects.create_user(email='logins@example.com', password=password,
+                                     first_name='Login', last_name='Benchmark', is_active=True)
+            results = [('current signals', self.run(options['logins'], password))]
+            post_save.connect(legacy_save_profile, sender=User, dispatch_uid='benchmark_legacy_save_profile')
+            try:
+                results.append(('legacy profile save', self.run(options['logins'], password)))
+            finally:
+                post_save.disconnect(sender=User, dispatch_uid='benchmark_legacy_save_profile')
+            transaction.set_rollback(True)
+
+        self.report(results)
+
+    @staticmethod
+    def run(logins, password):
+        url = reverse('accounts:login')
+        latencies, statements = [], []
+
+        def count(execute, sql, params, many, context):
+            statements.append(sql.lstrip().upper().startswith(WRITES))
+            return execute(sql, params, many, context)
+
+        # An execute wrapper rather than connection.queries, which every request resets
+        with connection.execute_wrapper(count):
+            for _ in range(logins):
+                # A fresh client per login, like a new visitor without a session
+                client = Client()
+                started = time.perf_counter()
+                response = client.post(url, {'email': 'logins@example.com', 'password': password})
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 302:
+                    raise CommandError(f'Login failed with status {response.status_code}')
+        return latencies, len(statements) / logins, sum(statements) / logins
+
+    def report(self, results):
+        self.stdout.write(f"{'mode':<20} {'logins/s':>9} {'mean ms':>8} {'p95 ms':>7} {'queries':>8} {'writes':>7}")
+        for mode, (latencies, queries, writes) in results:
+            latencies = np.array(latencies)
+            self.stdout.write(f'{mode:<20} {len(latencies) / latencies.sum():>9.0f} {latencies.mean() * 1000:>8.2f} '
+                              f'{np.percentile(latencies, 95) * 1000:>7.2f} {queries:>8.1f} {writes:>7.1f}')
@@ -0,0 +1,208 @@
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+
+from accounts.signals import provision_users
+from helper.processes import process_pool
+
+User = get_user_model()
+
+FORMATS = ('csv', 'json', 'jsonl')
+REQUIRED_FIELDS = ('email', 'first_name', 'last_name')
+TEXT_FIELDS = REQUIRED_FIELDS + ('phone_number', 'password')
+USERNAME_MAX_LENGTH = User._meta.get_field('username').max_length
+# Unique on CustomUser besides the email, so a clash would abort the whole batch
+UNIQUE_FIELDS = ('username', 'first_name', 'last_name')
+
+
+class Command(BaseCommand):
+    help = ('Creates users in bulk from a CSV, JSON or JSON Lines file with email, first_name, last_name and '
+            'optionally password and phone_number columns. Passwords are hashed in a process pool and users, '
+            'profiles and SMS codes are inserted with bulk_create, so no post_save signals run. Rows whose email '
+            'already exists are skipped, which makes an interrupted import safe to rerun; rows that are invalid '
+            'or whose username, first_name or last_name is already taken are skipped and reported.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, "-" reads standard input')
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='Input format (default: from the file extension, csv for standard input)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Users hashed and inserted per transaction')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes for password hashing (default: CPU count, 1 runs inline)')
+        parser.add_argument('--active', action='store_true',
+                            help='Create the users active instead of waiting for email activation')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or self.guess_format(path)
+        batch_size = options['batch_size']
+        workers = options['workers']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if workers is not None and workers < 1:
+            raise CommandError('--workers must be at least 1')
+        started = time.perf_counter()
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        executor = None
+        imported = skipped = rejected = 0
+        hashing = writing = 0.0
+        seen = {field: set() for field in ('email',) + UNIQUE_FIELDS}
+        try:
+            executor = process_pool(workers)
+            rows = self.read_rows(stream, input_format)
+            while batch := list(islice(rows, batch_size)):
+                offset = imported + skipped + rejected
+                users, passwords, messages = self.build_users(batch, seen, offset, options['active'])
+                for message in messages:
+                    self.stderr.write(self.style.WARNING(message))
+                rejected += len(messages)
+                skipped += len(batch) - len(users) - len(messages)
+                if not users:
+                    continue
+
+                hash_started = time.perf_counter()
+                if executor is None:
+                    hashes = [make_password(password) for password in passwords]
+                else:
+                    chunksize = max(1, len(passwords) // (4 * (workers or os.cpu_count() or 1)))
+                    hashes = list(executor.map(make_password, passwords, chunksize=chunksize))
+                write_started = time.perf_counter()
+                hashing += write_started - hash_started
+
+                for user, password_hash in zip(users, hashes):
+                    user.password = password_hash
+                try:
+                    with transaction.atomic():
+                        User.objects.bulk_create(users)
+                        provision_users(users)
+                except IntegrityError as error:
+                    raise CommandError(f'Rows {offset + 1}-{offset + len(batch)} could '
+                                       f'not be imported ({error}); {imported} users were imported before them')
+                writing += time.perf_counter() - write_started
+                imported += len(users)
+                self.stdout.write(f'{imported} users imported')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if executor is not None:
+                executor.shutdown()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} users, skipped {skipped} existing or duplicate emails and {rejected} invalid '
+            f'rows or taken usernames or names in {elapsed:.2f}s '
+            f'({imported / elapsed:.0f} rows/s; hashing {hashing:.2f}s, writing {writing:.2f}s)'
+        ))
+
+    @staticmethod
+    def guess_format(path):
+        if path == '-':
+            return 'csv'
+        extension = os.path.splitext(path)[1].lstrip('.').lower()
+        if extension not in FORMATS:
+            raise CommandError(f'Cannot tell the format of {path}, pass --format')
+        return extension
+
+    @staticmethod
+    def read_rows(stream, input_format):
+        """Yield one dict per user; CSV and JSON Lines are streamed, a JSON array is loaded whole"""
+        if input_format == 'csv':
+            yield from csv.DictReader(stream)
+        elif input_format == 'json':
+            yield from json.load(stream)
+        else:
+            yield from (json.loads(line) for line in stream if line.strip())
+
+    @staticmethod
+    def invalid(row):
+        """Why a row cannot be inserted as it is, or None if it can"""
+        if not isinstance(row, dict):
+            return 'is not an object'
+        for field in TEXT_FIELDS:
+            value = row.get(field)
+            if value is None or value == '':
+                if field in REQUIRED_FIELDS:
+                    return f'is missing {field}'
+                continue
+            if not isinstance(value, str):
+                return f'has {field} of type {type(value).__name__}, not text'
+            value = value.strip()
+            if not value and field in REQUIRED_FIELDS:
+                return f'is missing {field}'
+            max_length = User._meta.get_field(field).max_length
+            # The password column holds the hash, whatever the raw password's length
+            if field != 'password' and len(value) > max_length:
+                return f'has a {field} longer than {max_length} characters'
+        try:
+            validate_email(row['email'].strip())
+        except ValidationError:
+            return f'has an invalid email "{row["email"].strip()}"'
+        return None
+
+    @classmethod
+    def build_users(cls, batch, seen, offset, active):
+        """
+        Unsaved users for the rows of a batch whose email is neither already
+        imported nor taken, with the raw passwords to hash in the same order
+        and a message for every row skipped because it is invalid (see
+        invalid()) or its username, first_name or last_name is taken.
+
+        Fills in what CustomUserManager.create_user and CustomUser.save would
+        have: the normalized email and the username derived from it.
+        """
+        candidates, rejected = [], []
+        for number, row in enumerate(batch, start=offset + 1):
+            reason = cls.invalid(row)
+            if reason is None:
+                email = User.objects.normalize_email(row['email'].strip())
+                values = {
+                    'email': email,
+                    'username': slugify(email.split('@')[0]),
+                    'first_name': row['first_name'].strip(),
+                    'last_name': row['last_name'].strip(),
+                }
+                if not 0 < len(values['username']) <= USERNAME_MAX_LENGTH:
+                    reason = f'has an email "{email}" that gives no valid username'
+            if reason is not None:
+                rejected.append(f'Row {number} skipped, it {reason}')
+                continue
+            candidates.append((number, values, row))
+
+        taken = {
+            field: set(User.objects.filter(**{f'{field}__in': [values[field] for _, values, _ in candidates]})
+                       .values_list(field, flat=True))
+            for field in seen
+        }
+        users, passwords = [], []
+        for number, values, row in candidates:
+            if values['email'] in taken['email'] or values['email'] in seen['email']:
+                continue
+            clashing = [field for field in UNIQUE_FIELDS
+                        if values[field] in taken[field] or values[field] in seen[field]]
+            if clashing:
+                rejected.append(f'Row {number} ({values["email"]}) skipped, '
+                                + ', '.join(f'{field} "{values[field]}"' for field in clashing) + ' already taken')
+                continue
+            for field in seen:
+                seen[field].add(values[field])
+            users.append(User(
+                **values,
+                phone_number=(row.get('phone_number') or '').strip(),
+                is_active=active,
+            ))
+            # No password gives an unusable one, as create_user(password=None) does
+            passwords.append(row.get('password') or None)
+        return users, passwords, rejected
@@ -121,9 +121,12 @@ class SMSCode(models.Model):
     def __str__(self):
         return f'{self.user.username}-{self.number}'
 
+    @staticmethod
+    def generate_number():
+        return str(random.randint(100000, 999999))
+
     def save(self, *args, **kwargs):
-        verification_code = random.randint(100000, 999999)
-        self.number = str(verification_code)
+        self.number = self.generate_number()
 
         super().save(*args, **kwargs)
 
@@ -1,22 +1,45 @@
-
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from .backends import forget_cached_user
 from .models import Profile, CustomUser, SMSCode
 
 
-@receiver(post_save, sender=CustomUser)
-def create_profile(sender, instance, created, **kwargs):
-    if created:
-        Profile.objects.create(user=instance)
+def provision_user(user):
+    """
+    Create the user's Profile and SMSCode if they do not exist yet.
+
+    Safe to call repeatedly; existing rows are left untouched.
+    """
+    Profile.objects.get_or_create(user=user)
+    SMSCode.objects.get_or_create(user=user)
+
+
+def provision_users(users, batch_size=None):
+    """
+    Bulk counterpart of provision_user for users that were just bulk created.
+
+    bulk_create sends no post_save, so the users have neither a Profile nor an
+    SMSCode yet. SMSCode.save() is bypassed as well, hence the explicit numbers.
+    """
+    Profile.objects.bulk_create([Profile(user=user) for user in users], batch_size=batch_size)
+    SMSCode.objects.bulk_create([SMSCode(user=user, number=SMSCode.generate_number()) for user in users],
+                                batch_size=batch_size)
 
 
 @receiver(post_save, sender=CustomUser)
-def save_profile(sender, instance, **kwargs):
-    instance.profile.save()
+def provision_new_user(sender, instance, created, raw=False, **kwargs):
+    # Only on creation: later saves (last_login on every login, profile edits) leave the profile alone
+    if created and not raw:
+        provision_user(instance)
 
 
 @receiver(post_save, sender=CustomUser)
-def post_save_generate_code(sender, instance, created, *args, **kwargs):
-    if created:
-        SMSCode.objects.create(user=instance)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    forget_cached_user(instance.pk)
+
 
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_cached_profile_user(sender, instance, **kwargs):
+    forget_cached_user(instance.user_id)
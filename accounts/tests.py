@@ -1,9 +1,17 @@
-from django.test import TestCase
+import os
+import tempfile
+from io import StringIO
+
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 
+from .backends import EmailBackend, cached_user_key
 from .models import Profile, SMSCode
+from .signals import provision_user
 
 class CustomUserModelTests(TestCase):
 
@@ -76,3 +84,153 @@ class SMSCodeModelTests(TestCase):
         self.sms_code.save()
         self.assertRegex(self.sms_code.number, r'^\d{6}$')
 
+
+class UserProvisioningTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='provisioned@example.com',
+            first_name='Provisioned',
+            last_name='User',
+            password='testpass123',
+            is_active=True
+        )
+
+    def test_profile_and_sms_code_created_once(self):
+        provision_user(self.user)
+        self.user.save()
+        self.assertEqual(Profile.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(SMSCode.objects.filter(user=self.user).count(), 1)
+
+    def test_login_leaves_profile_untouched(self):
+        updated_at = Profile.objects.get(user=self.user).updated_at
+        response = self.client.post(reverse('accounts:login'),
+                                    {'email': 'provisioned@example.com', 'password': 'testpass123'})
+        self.assertRedirects(response, reverse('website:index'), fetch_redirect_response=False)
+        self.assertEqual(Profile.objects.get(user=self.user).updated_at, updated_at)
+
+
+class ImportUsersCommandTests(TestCase):
+
+    def setUp(self):
+        self.existing = get_user_model().objects.create_user(
+            email='existing@example.com',
+            first_name='Existing',
+            last_name='Member',
+            password='testpass123'
+        )
+
+    def import_rows(self, content, suffix, *args):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False) as source:
+            source.write(content)
+        self.addCleanup(os.remove, source.name)
+        call_command('import_users', source.name, '--workers', '1', '--batch-size', '2', *args,
+                     stdout=StringIO(), stderr=StringIO())
+
+    def test_csv_import_provisions_users(self):
+        self.import_rows(
+            'email,first_name,last_name,password,phone_number\n'
+            'Alice@Example.COM,Alice,Anders,alicepass123,+441234\n'
+            'bob@example.com,Bob,Brown,,\n'
+            'existing@example.com,Other,Person,secret,\n'
+            'carol@example.com,Carol,Clark,carolpass123,\n',
+            '.csv', '--active'
+        )
+        User = get_user_model()
+        alice = User.objects.get(email='Alice@example.com')
+        self.assertTrue(alice.check_password('alicepass123'))
+        self.assertTrue(alice.is_active)
+        self.assertEqual((alice.username, alice.phone_number), ('alice', '+441234'))
+        self.assertFalse(User.objects.get(email='bob@example.com').has_usable_password())
+        self.assertEqual(User.objects.count(), 4)
+        self.assertEqual(Profile.objects.count(), 4)
+        self.assertEqual(SMSCode.objects.filter(number__regex=r'^\d{6}$').count(), 4)
+        self.assertTrue(self.existing.check_password('testpass123'))
+
+    def test_jsonl_rerun_skips_imported_users(self):
+        content = '{"email": "dave@example.com", "first_name": "Dave", "last_name": "Doe"}\n'
+        self.import_rows(content, '.jsonl')
+        self.import_rows(content, '.jsonl')
+        self.assertEqual(get_user_model().objects.filter(email='dave@example.com').count(), 1)
+        self.assertFalse(get_user_model().objects.get(email='dave@example.com').is_active)
+
+    def test_taken_username_or_name_is_skipped(self):
+        self.import_rows(
+            'email,first_name,last_name\n'
+            'existing@other.com,Erin,Evans\n'
+            'frank@example.com,Existing,Fisher\n'
+            'gina@example.com,Gina,Green\n'
+            'gina@example.org,Gwen,Grey\n'
+            'hank@example.com,Hank,Green\n'
+            'ivy@example.com,Ivy,Irwin\n',
+            '.csv'
+        )
+        emails = set(get_user_model().objects.values_list('email', flat=True))
+        self.assertEqual(emails, {'existing@example.com', 'gina@example.com', 'ivy@example.com'})
+
+    def test_invalid_rows_are_skipped(self):
+        self.import_rows(
+            '{"email": "jack@example.com", "first_name": "Jack", "last_name": 42}\n'
+            '{"email": "kate@example.com", "first_name": null, "last_name": "Kent"}\n'
+            '{"email": "liam@example.com", "first_name": "Liam", "last_name": "Lane", "phone_number": 12345}\n'
+            '{"email": "mia@example.com", "first_name": "Mia", "last_name": "Moss", "phone_number": "+4412345678901234"}\n'
+            '{"email": "not-an-email", "first_name": "Ned", "last_name": "Nash"}\n'
+            '["olga@example.com", "Olga", "Owens"]\n'
+            '{"email": "pia@example.com", "first_name": "Pia", "last_name": "Park", "phone_number": "+441234"}\n',
+            '.jsonl'
+        )
+        emails = set(get_user_model().objects.values_list('email', flat=True))
+        self.assertEqual(emails, {'existing@example.com', 'pia@example.com'})
+
+    def test_batch_size_must_be_positive(self):
+        with self.assertRaisesMessage(CommandError, '--batch-size must be at least 1'):
+            self.import_rows('email,first_name,last_name\n', '.csv', '--batch-size', '0')
+
+
+@override_settings(AUTH_USER_CACHE_TIMEOUT=60)
+class CachedUserTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='cached@example.com',
+            first_name='Cached',
+            last_name='User',
+            password='testpass123'
+        )
+        self.backend = EmailBackend()
+
+    def test_user_and_profile_served_from_cache(self):
+        self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+            self.assertEqual(user.profile.user_id, self.user.pk)
+
+    def test_password_change_drops_cached_user(self):
+        self.backend.get_user(self.user.pk)
+        self.user.set_password('newpass456')
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertTrue(self.backend.get_user(self.user.pk).check_password('newpass456'))
+
+    def test_profile_save_drops_cached_user(self):
+        self.backend.get_user(self.user.pk)
+        profile = Profile.objects.get(user=self.user)
+        profile.bio = 'Updated bio'
+        profile.save()
+        self.assertEqual(self.backend.get_user(self.user.pk).profile.bio, 'Updated bio')
+
+    def test_late_write_of_stale_user_is_never_read(self):
+        key = cached_user_key(self.user.pk)
+        stale = get_user_model().objects.get(pk=self.user.pk)
+        self.user.set_password('newpass456')
+        self.user.save()
+        # A request that loaded the user before the save caches it afterwards
+        cache.set(key, stale)
+        self.assertTrue(self.backend.get_user(self.user.pk).check_password('newpass456'))
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=0)
+    def test_timeout_zero_disables_cache(self):
+        self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(1):
+            self.backend.get_user(self.user.pk)
@@ -9,6 +9,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import User
 from django.contrib.sites.shortcuts import get_current_site
 from django.core.mail import send_mail
+from django.db import transaction
 from django.db.models.query_utils import Q
 from django.shortcuts import render, redirect
 from django.template.loader import render_to_string
@@ -37,7 +38,9 @@ def register(request):
             # Save form data without committing to the database
             user = form.save(commit=False)
             user.is_active = True
-            user.save()
+            # The user, its Profile and SMSCode (created by the post_save signal) are stored together or not at all
+            with transaction.atomic():
+                user.save()
             # TODO: Implement send_activation_email if needed
             # send_activation_email(request, user)
             return redirect('accounts:login')  # Update with your actual login view name
@@ -0,0 +1,171 @@
+"""
+Offline stand-in for the Gemini generateContent API.
+
+Serves ``POST /<version>/models/<model>:generateContent`` and
+``:streamGenerateContent?alt=sse`` with canned answers shaped like the ones
+GeminiService expects, after a configurable latency. A share of requests can be
+made to fail with HTTP 500 or to return malformed text so error paths can be
+exercised. Run it with ``python manage.py fake_gemini_server``.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'exponential', 'lognormal')
+RESPONSE_SHAPES = ('json', 'markdown', 'prose')
+
+
+class FakeGeminiConfig:
+    def __init__(self, latency_ms=800, distribution='lognormal', jitter_ms=300, failure_rate=0.0,
+                 malformed_rate=0.0, shape='json', chunks=8, seed=None):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f'distribution must be one of {LATENCY_DISTRIBUTIONS}')
+        if shape not in RESPONSE_SHAPES:
+            raise ValueError(f'shape must be one of {RESPONSE_SHAPES}')
+        self.latency_ms = latency_ms
+        self.distribution = distribution
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.shape = shape
+        self.chunks = chunks
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.served = 0
+        self.failed = 0
+
+    def sample_latency(self):
+        """Seconds to wait before answering, drawn from the configured distribution"""
+        with self.lock:
+            if self.distribution == 'fixed':
+                ms = self.latency_ms
+            elif self.distribution == 'uniform':
+                ms = self.random.uniform(self.latency_ms - self.jitter_ms, self.latency_ms + self.jitter_ms)
+            elif self.distribution == 'exponential':
+                ms = self.random.expovariate(1 / self.latency_ms) if self.latency_ms else 0
+            else:
+                # lognormal with the requested median and jitter as a rough spread
+                sigma = self.jitter_ms / self.latency_ms if self.latency_ms else 0
+                ms = self.latency_ms * self.random.lognormvariate(0, sigma)
+        return max(ms, 0) / 1000
+
+    def roll(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+
+def canned_answer(prompt, shape):
+    """Return text shaped like a model answer to one of GeminiService's prompts"""
+    if 'financial calculator' in prompt:
+        payload = {
+            'result': '₹1,234.56',
+            'explanation': 'Step 1: Read the inputs.\nStep 2: Apply the formula.\nStep 3: Round to two decimals.',
+            'insights': ['This is a canned answer from the fake Gemini server.'],
+        }
+    elif 'forecasting system' in prompt:
+        payload = {
+            'predictions': [
+                {'month': i, 'amount': 3000 + 100 * i, 'confidence': 0.7} for i in range(1, 4)
+            ],
+            'explanation': 'Spending grows slowly month over month.',
+        }
+    elif 'anomaly detection system' in prompt:
+        payload = [{
+            'type': 'unusual amount',
+            'description': 'Spending well above the usual level.',
+            'transaction': 'Date: 2024-01-01, Category: Shopping, Amount: ₹5000',
+        }]
+    else:
+        return '- Save 20% of your income.\n- Cut discretionary spending.\n- Pay down high-interest debt first.'
+
+    if shape == 'markdown':
+        return f"Here is the answer:\n```json\n{json.dumps(payload, ensure_ascii=False)}\n```"
+    if shape == 'prose':
+        return f"The answer is {json.dumps(payload, ensure_ascii=False)} as computed above."
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def _candidate(text):
+    return {'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'}}]}
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    server_version = 'FakeGemini/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        config = self.server.config
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            prompt = payload['contents'][0]['parts'][0]['text']
+        except (ValueError, KeyError, IndexError):
+            self._send_json(400, {'error': {'code': 400, 'message': 'Invalid request payload'}})
+            return
+
+        latency = config.sample_latency()
+        streaming = ':streamGenerateContent' in self.path
+        if not streaming:
+            time.sleep(latency)
+        with config.lock:
+            config.served += 1
+
+        if config.roll(config.failure_rate):
+            with config.lock:
+                config.failed += 1
+            self._send_json(500, {'error': {'code': 500, 'message': 'Injected failure'}})
+            return
+
+        text = canned_answer(prompt, config.shape)
+        if config.roll(config.malformed_rate):
+            text = text[:len(text) // 2]
+
+        if streaming:
+            self._stream(text, config, latency)
+        elif ':generateContent' in self.path:
+            self._send_json(200, _candidate(text))
+        else:
+            self._send_json(404, {'error': {'code': 404, 'message': 'Unknown method'}})
+
+    def _stream(self, text, config, latency):
+        # Chunked like the real API, with the latency spread across the chunks so
+        # time to first token is shorter than the total response time
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        step = max(1, -(-len(text) // config.chunks))
+        pieces = [text[i:i + step] for i in range(0, len(text), step)]
+        try:
+            for piece in pieces:
+                time.sleep(latency / len(pieces))
+                event = f"data: {json.dumps(_candidate(piece))}\r\n\r\n".encode()
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(event), event))
+                self.wfile.flush()
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up, e.g. on its read timeout
+            pass
+
+
+def make_server(host='127.0.0.1', port=8765, verbose=False, **config):
+    """Create (but do not start) a threaded fake Gemini server"""
+    server = ThreadingHTTPServer((host, port), FakeGeminiHandler)
+    server.daemon_threads = True
+    server.config = FakeGeminiConfig(**config)
+    server.verbose = verbose
+    return server
@@ -0,0 +1,286 @@
+import math
+import re
+
+from django.core.cache import cache
+
+from helper.cache import incr
+
+
+class LocalFinancialCalculator:
+    """
+    Deterministic evaluator for the standard formulas users ask the calculator.
+
+    Recognised queries (EMI, compound interest, SIP future value, CAGR and loan
+    tenure) are answered instantly with an exact step-by-step explanation in the
+    same result/explanation/insights shape GeminiService.financial_calculator
+    returns. Anything else returns None so the caller can fall back to Gemini,
+    including queries with more amounts, rates or durations than the formula
+    takes (a down payment next to a price, two loans to compare) and signed
+    numbers, which would otherwise get a confident answer to the wrong question.
+    """
+    HITS_KEY = 'ai_features:calculator:local_hits'
+    FALLBACKS_KEY = 'ai_features:calculator:llm_fallbacks'
+
+    MULTIPLIERS = {
+        'k': 1_000,
+        'thousand': 1_000,
+        'lakh': 100_000,
+        'lakhs': 100_000,
+        'lac': 100_000,
+        'lacs': 100_000,
+        'million': 1_000_000,
+        'crore': 10_000_000,
+        'crores': 10_000_000,
+    }
+    COMPOUNDING = {
+        'daily': 365,
+        'monthly': 12,
+        'quarterly': 4,
+        'half-yearly': 2,
+        'half yearly': 2,
+        'semi-annually': 2,
+        'annually': 1,
+        'yearly': 1,
+    }
+
+    # Formula -> how many (amounts, rates, durations) a query must contain
+    ARITY = {
+        'EMI': (1, 1, 1),
+        'LOAN_TENURE': (2, 1, 0),
+        'COMPOUND_INTEREST': (1, 1, 1),
+        'SIP': (1, 1, 1),
+        'CAGR': (2, 0, 1),
+    }
+
+    NUMBER = r'(\d[\d,]*(?:\.\d+)?)'
+    SIGNED_RE = re.compile(r'[-−+]\s*(?:₹|rs\.?|inr|\$)?\s*\d', re.IGNORECASE)
+    PERCENT_RE = re.compile(NUMBER + r'\s*(?:%|percent\b|per\s*cent\b)', re.IGNORECASE)
+    DURATION_RE = re.compile(NUMBER + r'\s*(years?|yrs?|months?)\b', re.IGNORECASE)
+    AMOUNT_RE = re.compile(
+        r'(?:₹|rs\.?|inr|\$)?\s*' + NUMBER + r'\s*(k|thousand|lakhs?|lacs?|million|crores?)?\b',
+        re.IGNORECASE
+    )
+
+    @staticmethod
+    def _to_float(number):
+        return float(number.replace(',', ''))
+
+    @staticmethod
+    def _money(value):
+        return f"₹{value:,.2f}"
+
+    @staticmethod
+    def _installments(months):
+        """A duration as a whole number of monthly installments; ValueError for part of a month"""
+        if not float(months).is_integer():
+            raise ValueError(f'{months:g} months is not a whole number of installments')
+        return int(months)
+
+    @classmethod
+    def extract_parameters(cls, query):
+        """
+        Pull rates, durations and amounts out of a free-text query.
+
+        Returns:
+            dict: 'rates' (percent values), 'months' (durations converted to
+            months), 'amounts' (rupee values in order of appearance) and
+            'signed' (whether any number carries a sign the patterns ignore)
+        """
+        text = query.lower()
+        signed = bool(cls.SIGNED_RE.search(text))
+        rates = [cls._to_float(m.group(1)) for m in cls.PERCENT_RE.finditer(text)]
+        text = cls.PERCENT_RE.sub(' ', text)
+
+        months = []
+        for m in cls.DURATION_RE.finditer(text):
+            value = cls._to_float(m.group(1))
+            months.append(value if m.group(2).startswith('month') else value * 12)
+        text = cls.DURATION_RE.sub(' ', text)
+
+        amounts = []
+        for m in cls.AMOUNT_RE.finditer(text):
+            value = cls._to_float(m.group(1))
+            if m.group(2):
+                value *= cls.MULTIPLIERS[m.group(2).lower()]
+            amounts.append(value)
+        return {'rates': rates, 'months': months, 'amounts': amounts, 'signed': signed}
+
+    @classmethod
+    def classify(cls, query):
+        """Return the formula a query asks for, or None if it is not a standard one"""
+        text = query.lower()
+        if 'cagr' in text or 'compound annual growth' in text:
+            return 'CAGR'
+        if re.search(r'\bsip\b', text) or 'systematic investment' in text or \
+                ('invest' in text and re.search(r'\bmonthly\b|(per|every|a) month', text)):
+            return 'SIP'
+        if re.search(r'how (long|many (months|years))|\btenure\b', text) and \
+                re.search(r'\bemi\b|installment|instalment|payment', text):
+            return 'LOAN_TENURE'
+        if re.search(r'\bemi\b|monthly (payment|installment|instalment)', text):
+            return 'EMI'
+        if 'compound interest' in text or 'compounded' in text:
+            return 'COMPOUND_INTEREST'
+        return None
+
+    @classmethod
+    def evaluate(cls, query):
+        """
+        Answer a query locally if it matches a known formula.
+
+        Returns:
+            dict or None: result/explanation/insights, or None when the query is
+            not recognised or its parameters do not map one to one onto the formula
+        """
+        formula = cls.classify(query)
+        if formula is None:
+            return None
+        params = cls.extract_parameters(query)
+        counts = (len(params['amounts']), len(params['rates']), len(params['months']))
+        if params['signed'] or counts != cls.ARITY[formula]:
+            return None
+        try:
+            return getattr(cls, f'_{formula.lower()}')(query.lower(), params)
+        except (IndexError, ValueError, ZeroDivisionError, OverflowError):
+            return None
+
+    @classmethod
+    def _emi(cls, text, params):
+        principal, annual_rate = params['amounts'][0], params['rates'][0]
+        months = cls._installments(params['months'][0])
+        r = annual_rate / 12 / 100
+        if r == 0:
+            emi = principal / months
+        else:
+            growth = (1 + r) ** months
+            emi = principal * r * growth / (growth - 1)
+        total = emi * months
+        return {
+            'result': cls._money(emi),
+            'explanation': "\n".join([
+                "EMI = P × r × (1 + r)^n / ((1 + r)^n − 1)",
+                f"Step 1: Principal P = {cls._money(principal)}",
+                f"Step 2: Monthly rate r = {annual_rate}% / 12 / 100 = {r:.6f}",
+                f"Step 3: Number of installments n = {months} months",
+                f"Step 4: EMI = {cls._money(emi)} per month",
+                f"Step 5: Total paid = {cls._money(emi)} × {months} = {cls._money(total)}",
+            ]),
+            'insights': [
+                f"Total interest paid over the loan is {cls._money(total - principal)}.",
+                "Prepaying part of the principal early reduces the total interest the most.",
+            ],
+        }
+
+    @classmethod
+    def _loan_tenure(cls, text, params):
+        principal, emi = max(params['amounts']), min(params['amounts'])
+        annual_rate = params['rates'][0]
+        r = annual_rate / 12 / 100
+        if r == 0:
+            months = principal / emi
+        else:
+            if emi <= principal * r:
+                raise ValueError('EMI does not cover the monthly interest')
+            months = -math.log(1 - principal * r / emi) / math.log(1 + r)
+        installments = math.ceil(months)
+        years, remainder = divmod(installments, 12)
+        return {
+            'result': f"{installments} months",
+            'explanation': "\n".join([
+                "n = −log(1 − P × r / EMI) / log(1 + r)",
+                f"Step 1: Principal P = {cls._money(principal)}, EMI = {cls._money(emi)}",
+                f"Step 2: Monthly rate r = {annual_rate}% / 12 / 100 = {r:.6f}",
+                f"Step 3: n = {months:.2f}, rounded up to {installments} installments",
+                f"Step 4: That is {years} years and {remainder} months",
+            ]),
+            'insights': [
+                f"Total repaid is about {cls._money(emi * months)}.",
+                "Raising the EMI even slightly shortens the tenure and cuts total interest.",
+            ],
+        }
+
+    @classmethod
+    def _compound_interest(cls, text, params):
+        principal, annual_rate, months = params['amounts'][0], params['rates'][0], params['months'][0]
+        periods_per_year = 1
+        for keyword, periods in cls.COMPOUNDING.items():
+            if keyword in text:
+                periods_per_year = periods
+                break
+        years = months / 12
+        amount = principal * (1 + annual_rate / 100 / periods_per_year) ** (periods_per_year * years)
+        return {
+            'result': cls._money(amount - principal),
+            'explanation': "\n".join([
+                "A = P × (1 + r / m)^(m × t)",
+                f"Step 1: Principal P = {cls._money(principal)}, rate r = {annual_rate}%",
+                f"Step 2: Compounded m = {periods_per_year} times a year for t = {years:g} years",
+                f"Step 3: Maturity amount A = {cls._money(amount)}",
+                f"Step 4: Compound interest = A − P = {cls._money(amount - principal)}",
+            ]),
+            'insights': [
+                f"The investment grows to {cls._money(amount)}.",
+                "More frequent compounding gives a slightly higher return at the same rate.",
+            ],
+        }
+
+    @classmethod
+    def _sip(cls, text, params):
+        installment, annual_rate = params['amounts'][0], params['rates'][0]
+        months = cls._installments(params['months'][0])
+        i = annual_rate / 12 / 100
+        if i == 0:
+            future_value = installment * months
+        else:
+            future_value = installment * ((1 + i) ** months - 1) / i * (1 + i)
+        invested = installment * months
+        return {
+            'result': cls._money(future_value),
+            'explanation': "\n".join([
+                "FV = M × ((1 + i)^n − 1) / i × (1 + i)",
+                f"Step 1: Monthly investment M = {cls._money(installment)}",
+                f"Step 2: Monthly rate i = {annual_rate}% / 12 / 100 = {i:.6f}",
+                f"Step 3: Number of installments n = {months}",
+                f"Step 4: Future value FV = {cls._money(future_value)}",
+            ]),
+            'insights': [
+                f"You invest {cls._money(invested)} in total and gain {cls._money(future_value - invested)}.",
+                "Returns on market-linked SIPs are not guaranteed; treat the rate as an assumption.",
+            ],
+        }
+
+    @classmethod
+    def _cagr(cls, text, params):
+        start_value, end_value = params['amounts'][0], params['amounts'][1]
+        years = params['months'][0] / 12
+        cagr = (end_value / start_value) ** (1 / years) - 1
+        return {
+            'result': f"{cagr * 100:.2f}%",
+            'explanation': "\n".join([
+                "CAGR = (Ending value / Beginning value)^(1 / years) − 1",
+                f"Step 1: Beginning value = {cls._money(start_value)}, ending value = {cls._money(end_value)}",
+                f"Step 2: Period = {years:g} years",
+                f"Step 3: Growth multiple = {end_value / start_value:.4f}",
+                f"Step 4: CAGR = {cagr * 100:.2f}% per year",
+            ]),
+            'insights': [
+                "CAGR smooths out year-to-year volatility, so actual yearly returns will vary.",
+            ],
+        }
+
+    @classmethod
+    def record(cls, local_hit):
+        """Count whether a query was answered locally or fell through to the LLM"""
+        incr(cls.HITS_KEY if local_hit else cls.FALLBACKS_KEY)
+
+    @classmethod
+    def hit_ratio(cls):
+        """Return local hits, LLM fallbacks and the share of queries answered locally"""
+        hits = cache.get(cls.HITS_KEY, 0)
+        fallbacks = cache.get(cls.FALLBACKS_KEY, 0)
+        total = hits + fallbacks
+        return {
+            'local_hits': hits,
+            'llm_fallbacks': fallbacks,
+            'ratio': hits / total if total else 0.0,
+        }
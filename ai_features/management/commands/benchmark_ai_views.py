@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.test import Client
+from django.urls import reverse
+
+from ai_features.models import (AnomalyScanState, ExpenseAnomaly, FinancialAdvice, FinancialCalculation,
+                                FinancialForecast)
+
+User = get_user_model()
+
+# Every model the AI views insert into for the requesting user
+WRITTEN_MODELS = (FinancialAdvice, ExpenseAnomaly, FinancialForecast, FinancialCalculation)
+
+ENDPOINTS = {
+    'dashboard': ('GET', 'ai_features:dashboard'),
+    'calculator': ('GET', 'ai_features:calculator'),
+    'advice': ('GET', 'ai_features:generate_advice'),
+    'anomalies': ('GET', 'ai_features:detect_anomalies'),
+    'forecast': ('GET', 'ai_features:generate_forecast'),
+    'calculate': ('POST', 'ai_features:calculate'),
+    'calculate_stream': ('POST', 'ai_features:calculate_stream'),
+}
+
+
+class Command(BaseCommand):
+    help = ('Drives the /ai/ views concurrently against a running server and reports throughput, '
+            'latency percentiles and worker saturation. The rows the views write for the user are removed '
+            'afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000',
+                            help='Server under test; start it with GEMINI_BASE_URL pointing at fake_gemini_server')
+        parser.add_argument('--email', required=True,
+                            help='Existing user to run as (the server must share this database for the session)')
+        parser.add_argument('--endpoints', default='calculate,advice,forecast,dashboard',
+                            help=f'Comma separated subset of: {", ".join(ENDPOINTS)}')
+        parser.add_argument('--requests', type=int, default=200, help='Total number of requests')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent client threads')
+        parser.add_argument('--server-workers', type=int, default=4,
+                            help='Worker count of the server, used to report saturation')
+        parser.add_argument('--query', default="What's 15% tip on a ₹78.50 bill?",
+                            help='Calculator query; the default is not answered by the local formula engine')
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['endpoints'].split(',') if name.strip()]
+        unknown = set(names) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+        try:
+            user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+
+        base_url = options['base_url'].rstrip('/')
+        snapshot = self.snapshot(user)
+        client = Client()
+        try:
+            cookies = self.authenticate(client, user, base_url)
+            results, wall = self.drive(names, options, base_url, cookies)
+        finally:
+            client.logout()
+            self.restore(user, snapshot)
+
+        self.report(results, wall, options['server_workers'])
+
+    @staticmethod
+    def snapshot(user):
+        """Newest row id per written model and the anomaly scan mark, taken before the run"""
+        last_ids = {model: model.objects.filter(user=user).aggregate(last=Max('pk'))['last'] or 0
+                    for model in WRITTEN_MODELS}
+        scan_state = AnomalyScanState.objects.filter(user=user).values('last_updated_at').first()
+        return last_ids, scan_state
+
+    def restore(self, user, snapshot):
+        """
+        Undo what the run wrote for the user.
+
+        The requests are served by another process, so the writes cannot be
+        wrapped in a transaction here and rolled back like benchmark_logins
+        does. The views only insert rows (and move the anomaly scan mark), so
+        deleting what is newer than the snapshot restores the user's data.
+        """
+        last_ids, scan_state = snapshot
+        with transaction.atomic():
+            deleted = sum(model.objects.filter(user=user, pk__gt=last_ids[model]).delete()[0]
+                          for model in WRITTEN_MODELS)
+            if scan_state is None:
+                AnomalyScanState.objects.filter(user=user).delete()
+            else:
+                AnomalyScanState.objects.filter(user=user).update(**scan_state)
+        self.stdout.write(f'Removed {deleted} rows written during the run')
+
+    def drive(self, names, options, base_url, cookies):
+        local = threading.local()
+
+        def session():
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+                local.session.cookies.update(cookies)
+            return local.session
+
+        def run(i):
+            name = names[i % len(names)]
+            method, url_name = ENDPOINTS[name]
+            started = time.perf_counter()
+            first_byte = None
+            try:
+                if method == 'POST':
+                    response = session().post(base_url + reverse(url_name), data={'query': options['query']},
+                                              headers={'X-CSRFToken': cookies['csrftoken'],
+                                                       'Referer': base_url + '/'},
+                                              stream=True)
+                else:
+                    response = session().get(base_url + reverse(url_name), stream=True, allow_redirects=False)
+                # Read a single byte first so streamed responses report their real time to first byte
+                if response.raw.read(1, decode_content=True):
+                    first_byte = time.perf_counter()
+                response.raw.read(decode_content=True)
+                status = response.status_code
+            except requests.RequestException:
+                status = 'error'
+            finished = time.perf_counter()
+            return name, status, started, first_byte or finished, finished
+
+        self.stdout.write(f"Running {options['requests']} requests with concurrency {options['concurrency']}...")
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(run, range(options['requests'])))
+        return results, time.perf_counter() - wall_start
+
+    def authenticate(self, client, user, base_url):
+        """Create a session for the user and fetch a CSRF cookie from the server"""
+        client.force_login(user)
+        cookies = {settings.SESSION_COOKIE_NAME: client.cookies[settings.SESSION_COOKIE_NAME].value}
+        response = requests.get(base_url + reverse('ai_features:calculator'), cookies=cookies, allow_redirects=False)
+        if response.status_code != 200 or settings.CSRF_COOKIE_NAME not in response.cookies:
+            raise CommandError(f'Could not open the calculator page as {user} (HTTP {response.status_code})')
+        cookies['csrftoken'] = response.cookies[settings.CSRF_COOKIE_NAME]
+        return cookies
+
+    def report(self, results, wall, server_workers):
+        latencies = np.array([finished - started for _, _, started, _, finished in results]) * 1000
+        ttfb = np.array([first_byte - started for _, _, started, first_byte, _ in results]) * 1000
+        statuses = Counter(str(status) for _, status, _, _, _ in results)
+
+        # Time-weighted number of requests in flight, compared with the server's workers
+        busy = latencies.sum() / 1000
+        average_in_flight = busy / wall if wall else 0
+        events = sorted([(started, 1) for _, _, started, _, _ in results] +
+                        [(finished, -1) for _, _, _, _, finished in results])
+        in_flight = peak = 0
+        for _, delta in events:
+            in_flight += delta
+            peak = max(peak, in_flight)
+
+        self.stdout.write(f'Completed {len(results)} requests in {wall:.2f}s '
+                          f'({len(results) / wall:.1f} req/s)')
+        self.stdout.write(f'Status codes: {dict(statuses)}')
+        self.stdout.write('Latency ms: p50 {:.0f}  p95 {:.0f}  p99 {:.0f}  max {:.0f}'.format(
+            *np.percentile(latencies, [50, 95, 99]), latencies.max()))
+        self.stdout.write('Time to first byte ms: p50 {:.0f}  p95 {:.0f}  p99 {:.0f}'.format(
+            *np.percentile(ttfb, [50, 95, 99])))
+        self.stdout.write(f'Worker saturation: {average_in_flight / server_workers:.0%} '
+                          f'(avg {average_in_flight:.1f} / peak {peak} in flight for {server_workers} workers)')
+
+        by_endpoint = defaultdict(list)
+        for (name, _, started, _, finished) in results:
+            by_endpoint[name].append((finished - started) * 1000)
+        for name, values in sorted(by_endpoint.items()):
+            self.stdout.write('  {:<17} n={:<5} p50 {:>6.0f}  p95 {:>6.0f}  p99 {:>6.0f}'.format(
+                name, len(values), *np.percentile(values, [50, 95, 99])))
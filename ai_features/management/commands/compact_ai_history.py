@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from ai_features.services import HistoryRetentionService
+
+
+class Command(BaseCommand):
+    help = 'Deduplicates and purges old AI advice, anomaly and forecast history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Maximum number of rows deleted per statement')
+
+    def handle(self, *args, **options):
+        results = HistoryRetentionService.compact(batch_size=options['batch_size'])
+        for name, counts in results.items():
+            self.stdout.write(
+                f"{name}: removed {counts['duplicates']} duplicates, "
+                f"{counts['expired']} expired and {counts['excess']} over the row limit"
+            )
+        self.stdout.write(self.style.SUCCESS('Successfully compacted AI history'))
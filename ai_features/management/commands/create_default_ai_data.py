@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from ai_features.models import FinancialAdvice, ExpenseAnomaly, FinancialForecast
 from datetime import datetime, timedelta
 from decimal import Decimal
@@ -70,33 +71,44 @@ class Command(BaseCommand):
             self.stdout.write('No users found. Please create a user first.')
             return
 
-        for user in users:
+        # Look up which defaults already exist for every user in one query per model,
+        # then insert only the missing rows in bulk inside a single transaction
+        user_ids = list(users.values_list('pk', flat=True))
+        existing_advice = set(FinancialAdvice.objects.filter(user_id__in=user_ids).values_list(
+            'user_id', 'advice_type', 'advice_text'
+        ))
+        existing_anomalies = set(ExpenseAnomaly.objects.filter(user_id__in=user_ids).values_list(
+            'user_id', 'amount', 'category', 'anomaly_type', 'description'
+        ))
+        existing_forecasts = set(FinancialForecast.objects.filter(user_id__in=user_ids).values_list(
+            'user_id', 'forecast_type', 'predicted_amount', 'confidence_score', 'forecast_date'
+        ))
+
+        new_advice = []
+        new_anomalies = []
+        new_forecasts = []
+        for user_id in user_ids:
             # Create advice
             for advice in default_advice:
-                FinancialAdvice.objects.get_or_create(
-                    user=user,
-                    advice_type=advice['advice_type'],
-                    advice_text=advice['advice_text']
-                )
+                if (user_id, advice['advice_type'], advice['advice_text']) not in existing_advice:
+                    new_advice.append(FinancialAdvice(user_id=user_id, **advice))
 
             # Create anomalies
             for anomaly in default_anomalies:
-                ExpenseAnomaly.objects.get_or_create(
-                    user=user,
-                    amount=anomaly['amount'],
-                    category=anomaly['category'],
-                    anomaly_type=anomaly['anomaly_type'],
-                    description=anomaly['description']
-                )
+                key = (user_id, anomaly['amount'], anomaly['category'], anomaly['anomaly_type'], anomaly['description'])
+                if key not in existing_anomalies:
+                    new_anomalies.append(ExpenseAnomaly(user_id=user_id, **anomaly))
 
             # Create forecasts
             for forecast in default_forecasts:
-                FinancialForecast.objects.get_or_create(
-                    user=user,
-                    forecast_type=forecast['forecast_type'],
-                    predicted_amount=forecast['predicted_amount'],
-                    confidence_score=forecast['confidence_score'],
-                    forecast_date=forecast['forecast_date']
-                )
+                key = (user_id, forecast['forecast_type'], forecast['predicted_amount'],
+                       forecast['confidence_score'], forecast['forecast_date'])
+                if key not in existing_forecasts:
+                    new_forecasts.append(FinancialForecast(user_id=user_id, **forecast))
+
+        with transaction.atomic():
+            FinancialAdvice.objects.bulk_create(new_advice, batch_size=500)
+            ExpenseAnomaly.objects.bulk_create(new_anomalies, batch_size=500)
+            FinancialForecast.objects.bulk_create(new_forecasts, batch_size=500)
 
         self.stdout.write(self.style.SUCCESS('Successfully created default AI data')) 
\ No newline at end of file
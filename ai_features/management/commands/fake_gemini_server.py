@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from ai_features.fake_gemini import LATENCY_DISTRIBUTIONS, RESPONSE_SHAPES, make_server
+
+
+class Command(BaseCommand):
+    help = 'Runs a local stand-in for the Gemini API with configurable latency and failures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=float, default=800,
+                            help='Median (lognormal), mean (exponential) or centre (uniform) latency')
+        parser.add_argument('--jitter-ms', type=float, default=300,
+                            help='Spread around the latency for uniform and lognormal distributions')
+        parser.add_argument('--distribution', choices=LATENCY_DISTRIBUTIONS, default='lognormal')
+        parser.add_argument('--failure-rate', type=float, default=0.0,
+                            help='Share of requests answered with HTTP 500')
+        parser.add_argument('--malformed-rate', type=float, default=0.0,
+                            help='Share of answers truncated into invalid JSON')
+        parser.add_argument('--shape', choices=RESPONSE_SHAPES, default='json',
+                            help='Wrap answers as bare JSON, a markdown code block or prose')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--verbose', action='store_true', help='Log every request')
+
+    def handle(self, *args, **options):
+        server = make_server(
+            host=options['host'],
+            port=options['port'],
+            verbose=options['verbose'],
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            distribution=options['distribution'],
+            failure_rate=options['failure_rate'],
+            malformed_rate=options['malformed_rate'],
+            shape=options['shape'],
+            seed=options['seed'],
+        )
+        host, port = server.server_address[:2]
+        self.stdout.write(self.style.SUCCESS(
+            f'Fake Gemini listening on http://{host}:{port}/v1beta/models '
+            f'(set GEMINI_BASE_URL to this URL)'
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            config = server.config
+            self.stdout.write(f'Served {config.served} requests, {config.failed} injected failures')
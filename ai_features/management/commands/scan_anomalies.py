@@ -0,0 +1,82 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import F, Max, Q
+
+from ai_features.services import AnomalyDetectionService
+from helper.processes import process_pool
+
+User = get_user_model()
+
+
+def score_user(job):
+    """Worker entry point: fit and score one user's history, no DB access."""
+    user_id, rows = job
+    return user_id, AnomalyDetectionService.score_transactions(user_id, rows)
+
+
+class Command(BaseCommand):
+    help = 'Scans every user with new transactions for expense anomalies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=50,
+                            help='Number of users scored per process pool round')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes (default: CPU count, 1 runs inline)')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        workers = options['workers']
+        started = time.perf_counter()
+
+        # Only users with a transaction added or edited past their high-water mark need a scan
+        user_ids = User.objects.annotate(
+            last_updated_at=Max('transaction__updated_at'),
+        ).filter(
+            Q(anomaly_scan_state__last_updated_at__isnull=True) |
+            Q(last_updated_at__gt=F('anomaly_scan_state__last_updated_at')),
+            last_updated_at__isnull=False,
+        ).order_by('pk').values_list('pk', flat=True)
+
+        executor = process_pool(workers)
+
+        scanned_users = 0
+        created_anomalies = 0
+        try:
+            chunk = []
+            for user_id in user_ids.iterator(chunk_size=chunk_size):
+                chunk.append(user_id)
+                if len(chunk) == chunk_size:
+                    created_anomalies += self.scan_chunk(chunk, executor)
+                    scanned_users += len(chunk)
+                    chunk = []
+            if chunk:
+                created_anomalies += self.scan_chunk(chunk, executor)
+                scanned_users += len(chunk)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Scanned {scanned_users} users in {elapsed:.2f}s, recorded {created_anomalies} new anomalies'
+        ))
+
+    def scan_chunk(self, user_ids, executor):
+        jobs = []
+        last_updated_ats = {}
+        for user_id in user_ids:
+            rows = list(AnomalyDetectionService.get_transaction_rows(user_id).iterator(chunk_size=2000))
+            # Keep the high-water mark in place until there is enough history to fit a model
+            if len(rows) >= AnomalyDetectionService.MIN_TRANSACTIONS:
+                jobs.append((user_id, rows))
+                last_updated_ats[user_id] = max(row[6] for row in rows)
+
+        results = executor.map(score_user, jobs) if executor is not None else map(score_user, jobs)
+        created = 0
+        for user_id, detected in results:
+            created += len(AnomalyDetectionService.record_new_anomalies(
+                user_id, detected, last_updated_ats[user_id]
+            ))
+        return created
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-19 17:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_features', '0003_anomalyscanstate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expenseanomaly',
+            index=models.Index(fields=['user', '-detected_at'], name='ai_features_user_id_019a62_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='financialadvice',
+            index=models.Index(fields=['user', '-created_at'], name='ai_features_user_id_2cae87_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='financialforecast',
+            index=models.Index(fields=['user', '-created_at'], name='ai_features_user_id_7d11c9_idx'),
+        ),
+    ]
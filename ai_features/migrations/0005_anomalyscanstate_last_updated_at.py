@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-19 18:52
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_last_updated_at(apps, schema_editor):
+    """
+    Carry each id watermark over to an updated_at one, so the next scan does not
+    report anomalies again: the newest updated_at among the transactions the
+    last scan covered, i.e. up to the old id and not edited since the scan.
+    """
+    AnomalyScanState = apps.get_model('ai_features', 'AnomalyScanState')
+    Transaction = apps.get_model('budget_section', 'Transaction')
+    for state in AnomalyScanState.objects.filter(last_transaction_id__gt=0):
+        state.last_updated_at = Transaction.objects.filter(
+            user_id=state.user_id, id__lte=state.last_transaction_id, updated_at__lte=state.scanned_at,
+        ).aggregate(newest=Max('updated_at'))['newest'] or state.scanned_at
+        # update() leaves the auto_now scanned_at alone
+        AnomalyScanState.objects.filter(pk=state.pk).update(last_updated_at=state.last_updated_at)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_features', '0004_history_indexes'),
+        ('budget_section', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='anomalyscanstate',
+            name='last_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(seed_last_updated_at, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='anomalyscanstate',
+            name='last_transaction_id',
+        ),
+    ]
@@ -12,6 +12,9 @@ class FinancialAdvice(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [models.Index(fields=['user', '-created_at'])]
+
 class ExpenseAnomaly(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
@@ -24,6 +27,9 @@ class ExpenseAnomaly(models.Model):
     description = models.TextField()
     detected_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['user', '-detected_at'])]
+
 class FinancialForecast(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     forecast_type = models.CharField(max_length=50, choices=[
@@ -36,6 +42,9 @@ class FinancialForecast(models.Model):
     confidence_score = models.FloatField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['user', '-created_at'])]
+
 class FinancialCalculation(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     query = models.TextField()
@@ -48,4 +57,13 @@ class FinancialCalculation(models.Model):
         return f"Calculation: {self.query[:30]}... = {self.result[:30]}..."
     
     class Meta:
-        ordering = ['-created_at'] 
\ No newline at end of file
+        ordering = ['-created_at'] 
+
+class AnomalyScanState(models.Model):
+    """Per-user high-water mark: the newest transaction updated_at scanned for anomalies."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='anomaly_scan_state')
+    last_updated_at = models.DateTimeField(null=True, blank=True)
+    scanned_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Anomaly scan for {self.user} up to {self.last_updated_at}"
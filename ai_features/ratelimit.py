@@ -0,0 +1,131 @@
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+from helper.cache import incr
+
+DEFAULT_USER_LIMIT = {'capacity': 10, 'refill_rate': 10 / 60}
+DEFAULT_GLOBAL_LIMIT = {'capacity': 120, 'refill_rate': 2}
+
+
+class SlidingWindow:
+    """
+    Sliding window rate limit built on atomic cache counters.
+
+    Admits at most ``capacity`` units per window of ``capacity / refill_rate``
+    seconds, the time a token bucket with the same settings takes to refill.
+    Each window has its own counter, and the estimate weighs the previous
+    window by how much of it still overlaps the sliding window. A request takes
+    its units with a single cache incr and gives them back if that pushed the
+    estimate over the limit, so concurrent requests can never all be admitted
+    on the same reading. Counters expire after two windows.
+
+    The counters are as shared as the cache: with the per-process locmem
+    backend every worker enforces its own limits.
+    """
+
+    def __init__(self, key, capacity, refill_rate):
+        self.key = key
+        self.capacity = capacity
+        self.window = capacity / refill_rate
+
+    def _position(self, now):
+        index, offset = divmod(now, self.window)
+        return int(index), offset / self.window
+
+    def acquire(self, cost, now):
+        """Take ``cost`` units; return True if they fit under the limit"""
+        index, elapsed = self._position(now)
+        current_key = f'{self.key}:{index}'
+        previous = cache.get(f'{self.key}:{index - 1}', 0)
+        count = incr(current_key, cost, timeout=math.ceil(2 * self.window))
+        if previous * (1 - elapsed) + count <= self.capacity:
+            return True
+        self.release(cost, now)
+        return False
+
+    def release(self, cost, now):
+        """Give back units taken by acquire() in the same window"""
+        index, _ = self._position(now)
+        try:
+            cache.decr(f'{self.key}:{index}', cost)
+        except ValueError:
+            # The counter expired or was evicted; nothing left to give back
+            pass
+
+    def retry_after(self, cost, now):
+        """
+        Seconds until ``cost`` units fit again, assuming no one else takes any.
+
+        The previous window keeps counting until the sliding window has moved
+        past it, so the answer can lie in the next window, once the current
+        count has become the previous one.
+        """
+        index, elapsed = self._position(now)
+        previous = cache.get(f'{self.key}:{index - 1}', 0)
+        count = cache.get(f'{self.key}:{index}', 0)
+        if cost > self.capacity:
+            return math.ceil(2 * self.window)
+        # Within this window: previous * (1 - t) + count + cost <= capacity
+        room = self.capacity - count - cost
+        if room >= 0:
+            position = 1 - room / previous if previous else 0
+            delay = max(0, position - elapsed)
+        else:
+            # In the next window the current count weighs count * (1 - t)
+            room = self.capacity - cost
+            position = 1 - room / count if count else 0
+            delay = 1 - elapsed + max(0, position)
+        return max(1, math.ceil(delay * self.window))
+
+
+def rate_limit_stats(view_name):
+    """Return the admitted/rejected counters recorded for a view"""
+    return {
+        'admitted': cache.get(f'ai_features:ratelimit:{view_name}:admitted', 0),
+        'rejected': cache.get(f'ai_features:ratelimit:{view_name}:rejected', 0),
+    }
+
+
+def rate_limit(cost=1):
+    """
+    Throttle a view with a per-user and a global sliding window.
+
+    Limits come from AI_RATE_LIMIT_USER / AI_RATE_LIMIT_GLOBAL settings
+    (``{'capacity': ..., 'refill_rate': units per second}``). A request is
+    admitted only if both windows have room for ``cost`` units; otherwise the
+    view is skipped and a 429 with a Retry-After header is returned. Apply it
+    below @login_required so the user is known, and only to views that call
+    Gemini or do comparable work.
+    """
+    def decorator(view_func):
+        view_name = view_func.__name__
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            user_limit = getattr(settings, 'AI_RATE_LIMIT_USER', DEFAULT_USER_LIMIT)
+            global_limit = getattr(settings, 'AI_RATE_LIMIT_GLOBAL', DEFAULT_GLOBAL_LIMIT)
+            windows = [
+                SlidingWindow(f'ai_features:ratelimit:user:{request.user.pk}', **user_limit),
+                SlidingWindow('ai_features:ratelimit:global', **global_limit),
+            ]
+            now = time.time()
+            acquired = []
+            for window in windows:
+                if not window.acquire(cost, now):
+                    for taken in acquired:
+                        taken.release(cost, now)
+                    incr(f'ai_features:ratelimit:{view_name}:rejected')
+                    response = JsonResponse({'error': 'Too many requests, please try again later'}, status=429)
+                    response['Retry-After'] = str(window.retry_after(cost, now))
+                    return response
+                acquired.append(window)
+
+            incr(f'ai_features:ratelimit:{view_name}:admitted')
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
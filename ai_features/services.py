@@ -1,9 +1,20 @@
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+
 import numpy as np
 from sklearn.ensemble import IsolationForest
-from datetime import datetime, timedelta
-from decimal import Decimal, InvalidOperation
-from django.db.models import Sum, Avg
-from .models import FinancialAdvice, ExpenseAnomaly, FinancialForecast
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.conf import settings
+from django.db.models import Count, DecimalField, F, Max, OuterRef, Subquery, Sum, Avg, Value, Window
+from django.db.models.functions import Coalesce, RowNumber, TruncMonth
+from django.utils import timezone
+from helper.cache import user_key
+from .models import FinancialAdvice, ExpenseAnomaly, FinancialForecast, AnomalyScanState
 from django.contrib.auth import get_user_model
 from .gemini_service import GeminiService
 from budget_section.models import Transaction, Category
@@ -13,49 +24,102 @@ import logging
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+class FinancialSnapshotService:
+    """
+    One memoized view of a user's finances shared by the AI services.
+
+    Current-month income and expenses, the latest balance, total debt and the
+    last HISTORY_MONTHS of monthly income/expense totals are computed with two
+    queries over sargable date ranges and cached per user per day. Saving an
+    Income, Outcome, Balance or Transaction drops the cached snapshot.
+    """
+    HISTORY_MONTHS = 12
+
+    @staticmethod
+    def _add_months(day, months):
+        y, m = divmod(day.month - 1 + months, 12)
+        return date(day.year + y, m + 1, 1)
+
+    @staticmethod
+    def cache_key(user_id, day):
+        return user_key('ai_features', user_id, 'snapshot', day.isoformat())
+
+    @classmethod
+    def get_snapshot(cls, user):
+        today = timezone.localdate()
+        key = cls.cache_key(user.pk, today)
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = cls.compute_snapshot(user.pk, today)
+            tomorrow = datetime.combine(today + timedelta(days=1), time.min, tzinfo=timezone.get_current_timezone())
+            cache.set(key, snapshot, timeout=max(1, int((tomorrow - timezone.now()).total_seconds())))
+        return snapshot
+
+    @classmethod
+    def invalidate(cls, user_id):
+        cache.delete(cls.cache_key(user_id, timezone.localdate()))
+
+    @classmethod
+    def compute_snapshot(cls, user_id, today):
+        month_start = today.replace(day=1)
+        next_month = cls._add_months(month_start, 1)
+        history_start = cls._add_months(month_start, 1 - cls.HISTORY_MONTHS)
+        zero = Value(Decimal('0.00'), output_field=DecimalField(max_digits=10, decimal_places=2))
+
+        def month_total(model, field='value', **filters):
+            return Coalesce(Subquery(
+                model.objects.filter(user=OuterRef('pk'), **filters)
+                .values('user').annotate(total=Sum(field)).values('total')
+            ), zero)
+
+        # Query 1: current-month totals, latest balance and debt in a single round trip
+        totals = User.objects.filter(pk=user_id).annotate(
+            month_income=month_total(Income, date__gte=month_start, date__lt=next_month),
+            month_expenses=month_total(Outcome, date__gte=month_start, date__lt=next_month),
+            latest_balance=Coalesce(Subquery(
+                Balance.objects.filter(user=OuterRef('pk')).order_by('-date', '-id').values('value')[:1]
+            ), zero),
+            # Simplified - assuming negative transactions are debts
+            negative_transactions=month_total(Transaction, field='amount', amount__lt=0),
+        ).values('month_income', 'month_expenses', 'latest_balance', 'negative_transactions').get()
+
+        # Query 2: monthly income and expense series for forecasting
+        def monthly(model, kind):
+            return model.objects.filter(
+                user_id=user_id, date__gte=history_start, date__lt=next_month
+            ).annotate(month=TruncMonth('date')).values('month').annotate(
+                total=Sum('value'), kind=Value(kind)
+            ).values('kind', 'month', 'total')
+
+        series = {'INCOME': [], 'EXPENSE': []}
+        for row in monthly(Income, 'INCOME').union(monthly(Outcome, 'EXPENSE'), all=True).order_by('month'):
+            series[row['kind']].append({
+                'date': row['month'].strftime('%Y-%m-%d'),
+                'amount': float(row['total'])
+            })
+
+        return {
+            'income': totals['month_income'],
+            'expenses': totals['month_expenses'],
+            'savings': totals['latest_balance'],
+            'debt': abs(totals['negative_transactions']),
+            'monthly_income': series['INCOME'],
+            'monthly_expenses': series['EXPENSE'],
+        }
+
 class FinancialAdviceService:
     @staticmethod
     def generate_saving_tips(user):
         try:
             # Get user's financial data
-            current_month = datetime.now().month
-            current_year = datetime.now().year
-            
-            # Get income data
-            total_income = Income.objects.filter(
-                user=user,
-                date__month=current_month,
-                date__year=current_year
-            ).aggregate(Sum('value'))['value__sum'] or Decimal('0.00')
-            
-            # Get expense data
-            total_expenses = Outcome.objects.filter(
-                user=user,
-                date__month=current_month,
-                date__year=current_year
-            ).aggregate(Sum('value'))['value__sum'] or Decimal('0.00')
-            
-            # Get savings data (simplified)
-            latest_balance = Balance.objects.filter(user=user).order_by('-date').first()
-            total_savings = latest_balance.value if latest_balance else Decimal('0.00')
-            
-            # Get debt data from transactions (simplified - assuming negative transactions are debts)
-            try:
-                total_debt = Transaction.objects.filter(
-                    user=user,
-                    amount__lt=0
-                ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0.00')
-                total_debt = abs(total_debt)
-            except Exception as e:
-                logger.warning(f"Error getting transaction data: {str(e)}")
-                total_debt = Decimal('0.00')
+            snapshot = FinancialSnapshotService.get_snapshot(user)
             
             # Prepare data for Gemini API
             user_data = {
-                'income': float(total_income),
-                'expenses': float(total_expenses),
-                'savings': float(total_savings),
-                'debt': float(total_debt)
+                'income': float(snapshot['income']),
+                'expenses': float(snapshot['expenses']),
+                'savings': float(snapshot['savings']),
+                'debt': float(snapshot['debt'])
             }
             
             # Generate advice using Gemini
@@ -76,21 +140,228 @@ class FinancialAdviceService:
             )
 
 class AnomalyDetectionService:
+    """
+    Local expense anomaly detection backed by a per-user IsolationForest.
+
+    Every transaction in the user's history is turned into a feature row
+    (amount, category code, day of week, rolling z-scores and days since the
+    previous transaction in the same category). The fitted forest is cached
+    per user and only refit when the history changes; when new transactions
+    are simply appended, extra trees are grown on the updated matrix instead
+    of rebuilding the whole ensemble.
+
+    The cache holds the MAX_CACHED_MODELS most recently used users. Entries are
+    identified by a digest of the feature matrix they were fitted on, and a
+    cached forest is never modified: extending one grows a copy, so concurrent
+    requests for the same user keep scoring with a complete model.
+    """
+    MIN_TRANSACTIONS = 10
+    ROLLING_WINDOW = 30
+    MIN_WINDOW = 3
+    ZSCORE_THRESHOLD = 2.0
+    RARE_CATEGORY_SHARE = 0.05
+    BASE_ESTIMATORS = 100
+    INCREMENT_ESTIMATORS = 20
+    MAX_ESTIMATORS = 200
+    RANDOM_STATE = 42
+    MAX_CACHED_MODELS = 500
+
+    # user_id -> {'n_rows', 'digest', 'model'}, least recently used first
+    _model_cache = OrderedDict()
+    _model_cache_lock = threading.Lock()
+
+    @staticmethod
+    def get_transaction_rows(user):
+        """Return the user's whole transaction history ordered by date."""
+        return Transaction.objects.filter(user=user).order_by('date', 'id').values_list(
+            'id', 'date', 'category_id', 'category__name', 'amount', 'title', 'updated_at'
+        )
+
+    @classmethod
+    def _rolling_zscores(cls, values):
+        """
+        Z-score of each value against the ROLLING_WINDOW values before it.
+
+        Rows with fewer than MIN_WINDOW predecessors (or a flat window) get 0.
+        """
+        n = len(values)
+        zscores = np.zeros(n)
+        if n == 0:
+            return zscores
+        csum = np.concatenate(([0.0], np.cumsum(values)))
+        csum_sq = np.concatenate(([0.0], np.cumsum(values ** 2)))
+        idx = np.arange(n)
+        start = np.maximum(idx - cls.ROLLING_WINDOW, 0)
+        count = idx - start
+        valid = count >= cls.MIN_WINDOW
+        safe_count = np.where(valid, count, 1)
+        mean = (csum[idx] - csum[start]) / safe_count
+        var = (csum_sq[idx] - csum_sq[start]) / safe_count - mean ** 2
+        std = np.sqrt(np.clip(var, 0, None))
+        valid &= std > 1e-9
+        zscores[valid] = (values[valid] - mean[valid]) / std[valid]
+        return zscores
+
+    @classmethod
+    def build_features(cls, rows):
+        """
+        Build the feature matrix for (id, date, category_id, ...) rows sorted by date.
+
+        Columns: amount, category code, day of week, global rolling z-score,
+        category rolling z-score, days since the previous transaction in the
+        same category.
+        """
+        n = len(rows)
+        if n == 0:
+            return np.empty((0, 6))
+        amounts = np.array([float(row[4]) for row in rows])
+        ordinals = np.array([row[1].toordinal() for row in rows], dtype=float)
+        weekdays = np.array([row[1].weekday() for row in rows], dtype=float)
+        _, category_codes = np.unique(np.array([row[2] for row in rows]), return_inverse=True)
+
+        category_z = np.zeros(n)
+        category_gap = np.zeros(n)
+        for code in np.unique(category_codes):
+            positions = np.flatnonzero(category_codes == code)
+            category_z[positions] = cls._rolling_zscores(amounts[positions])
+            category_gap[positions[1:]] = np.diff(ordinals[positions])
+
+        return np.column_stack([
+            amounts,
+            category_codes.astype(float),
+            weekdays,
+            cls._rolling_zscores(amounts),
+            category_z,
+            category_gap,
+        ])
+
+    @classmethod
+    def _fit_model(cls, user_id, features):
+        """Return a fitted forest for the user, reusing or extending the cached one."""
+        n_rows = len(features)
+        with cls._model_cache_lock:
+            cached = cls._model_cache.get(user_id)
+            if cached:
+                cls._model_cache.move_to_end(user_id)
+        if cached and cached['n_rows'] <= n_rows:
+            prefix_digest = hashlib.blake2b(features[:cached['n_rows']].tobytes()).hexdigest()
+            if prefix_digest == cached['digest']:
+                model = cached['model']
+                if cached['n_rows'] == n_rows:
+                    return model
+                if model.n_estimators + cls.INCREMENT_ESTIMATORS <= cls.MAX_ESTIMATORS:
+                    # Other requests may be scoring with the cached forest; grow a copy
+                    model = copy.deepcopy(model)
+                    model.set_params(n_estimators=model.n_estimators + cls.INCREMENT_ESTIMATORS, warm_start=True)
+                    model.fit(features)
+                    cls._cache_model(user_id, features, model)
+                    return model
+
+        model = IsolationForest(
+            n_estimators=cls.BASE_ESTIMATORS,
+            contamination='auto',
+            random_state=cls.RANDOM_STATE,
+        )
+        model.fit(features)
+        cls._cache_model(user_id, features, model)
+        return model
+
+    @classmethod
+    def _cache_model(cls, user_id, features, model):
+        entry = {
+            'n_rows': len(features),
+            'digest': hashlib.blake2b(features.tobytes()).hexdigest(),
+            'model': model,
+        }
+        with cls._model_cache_lock:
+            cls._model_cache[user_id] = entry
+            cls._model_cache.move_to_end(user_id)
+            while len(cls._model_cache) > cls.MAX_CACHED_MODELS:
+                cls._model_cache.popitem(last=False)
+
+    @classmethod
+    def score_transactions(cls, user_id, rows):
+        """
+        Run detection over the given rows and return the flagged ones.
+
+        Returns a list of dicts (most anomalous first) with the transaction id,
+        amount, category, anomaly type, score and a human readable description.
+        """
+        if len(rows) < cls.MIN_TRANSACTIONS:
+            return []
+
+        features = cls.build_features(rows)
+        model = cls._fit_model(user_id, features)
+        scores = model.decision_function(features)
+        flagged = np.flatnonzero(scores < 0)
+
+        category_share = np.bincount(features[:, 1].astype(int)) / len(rows)
+        results = []
+        for i in flagged[np.argsort(scores[flagged])]:
+            transaction_id, tx_date, _, category_name, amount, title, updated_at = rows[i]
+            zscore = features[i, 4] if abs(features[i, 4]) >= abs(features[i, 3]) else features[i, 3]
+            if abs(zscore) >= cls.ZSCORE_THRESHOLD:
+                anomaly_type = 'UNUSUAL_AMOUNT'
+                reason = f"{abs(zscore):.1f} standard deviations {'above' if zscore > 0 else 'below'} your usual spending"
+            elif category_share[int(features[i, 1])] <= cls.RARE_CATEGORY_SHARE:
+                anomaly_type = 'UNUSUAL_CATEGORY'
+                reason = "a category you rarely spend in"
+            else:
+                anomaly_type = 'UNUSUAL_FREQUENCY'
+                reason = f"{int(features[i, 5])} days after your previous {category_name} transaction"
+            results.append({
+                'transaction_id': transaction_id,
+                'updated_at': updated_at,
+                'amount': Decimal(amount),
+                'category': category_name or 'Uncategorized',
+                'anomaly_type': anomaly_type,
+                'score': float(scores[i]),
+                'description': f"{title} on {tx_date.strftime('%Y-%m-%d')} (₹{amount}) is {reason}.",
+            })
+        return results
+
+    @staticmethod
+    def record_new_anomalies(user_id, detected, last_updated_at):
+        """
+        Persist detected anomalies past the user's high-water mark and advance it.
+
+        The mark is the newest transaction updated_at seen by a scan. Only
+        anomalies for transactions added or edited after it are inserted, so
+        re-scanning history that was already seen never duplicates rows while
+        an edited transaction is judged again. Every one of them is inserted:
+        the mark moves past all the rows scanned, so an anomaly left out now
+        would never be reported.
+        """
+        with db_transaction.atomic():
+            state, _ = AnomalyScanState.objects.select_for_update().get_or_create(user_id=user_id)
+            new_anomalies = [
+                ExpenseAnomaly(
+                    user_id=user_id,
+                    amount=anomaly_data['amount'],
+                    category=anomaly_data['category'][:100],
+                    anomaly_type=anomaly_data['anomaly_type'],
+                    description=anomaly_data['description']
+                )
+                for anomaly_data in detected
+                if state.last_updated_at is None or anomaly_data['updated_at'] > state.last_updated_at
+            ]
+            created = ExpenseAnomaly.objects.bulk_create(new_anomalies)
+            if state.last_updated_at is None or last_updated_at > state.last_updated_at:
+                state.last_updated_at = last_updated_at
+                state.save(update_fields=['last_updated_at', 'scanned_at'])
+        return created
+
     @staticmethod
     def detect_anomalies(user):
         try:
-            # Get recent transactions
             try:
-                recent_transactions = Transaction.objects.filter(
-                    user=user,
-                    date__gte=datetime.now() - timedelta(days=90)
-                ).order_by('-date')[:50]  # Last 50 transactions or within 90 days
+                rows = list(AnomalyDetectionService.get_transaction_rows(user).iterator(chunk_size=2000))
             except Exception as tx_error:
                 logger.warning(f"Error getting transactions: {str(tx_error)}")
-                recent_transactions = []
-            
-            if not recent_transactions:
-                # Create sample anomaly if no transactions found
+                rows = []
+
+            if len(rows) < AnomalyDetectionService.MIN_TRANSACTIONS:
+                # Create sample anomaly if there is not enough history to fit a model
                 anomaly = ExpenseAnomaly.objects.create(
                     user=user,
                     amount=Decimal('0.00'),
@@ -99,87 +370,10 @@ class AnomalyDetectionService:
                     description="Not enough transaction data to analyze. Please add more transactions."
                 )
                 return [anomaly]
-            
-            # Prepare transaction data for Gemini API
-            transaction_data = []
-            for transaction in recent_transactions:
-                try:
-                    category_name = transaction.category.name if hasattr(transaction, 'category') and transaction.category else 'Uncategorized'
-                    transaction_data.append({
-                        'date': transaction.date.strftime('%Y-%m-%d'),
-                        'category': category_name,
-                        'amount': float(transaction.amount)
-                    })
-                except AttributeError as attr_error:
-                    logger.warning(f"Error processing transaction {transaction.id}: {str(attr_error)}")
-            
-            if not transaction_data:
-                anomaly = ExpenseAnomaly.objects.create(
-                    user=user,
-                    amount=Decimal('0.00'),
-                    category='General',
-                    anomaly_type='UNUSUAL_AMOUNT',
-                    description="Error processing transaction data. Please check your transaction records."
-                )
-                return [anomaly]
-            
-            # Detect anomalies using Gemini
-            gemini_anomalies = GeminiService.detect_anomalies(transaction_data)
-            
-            # Create anomaly objects
-            anomalies = []
-            for anomaly_data in gemini_anomalies:
-                anomaly_type = 'UNUSUAL_AMOUNT'  # Default
-                if 'type' in anomaly_data:
-                    if 'category' in anomaly_data['type'].lower():
-                        anomaly_type = 'UNUSUAL_CATEGORY'
-                    elif 'frequency' in anomaly_data['type'].lower():
-                        anomaly_type = 'UNUSUAL_FREQUENCY'
-                
-                # Extract amount from transaction if available
-                amount = Decimal('0.00')
-                category = 'Unknown'
-                if 'transaction' in anomaly_data and anomaly_data['transaction'] != 'N/A':
-                    # Try to extract amount from transaction description
-                    try:
-                        amount_str = anomaly_data['transaction'].split('$')[-1].split(',')[0].strip()
-                        amount = Decimal(amount_str)
-                    except (IndexError, ValueError, InvalidOperation):
-                        try:
-                            # Try to extract with rupee symbol
-                            if '₹' in anomaly_data['transaction']:
-                                amount_str = anomaly_data['transaction'].split('₹')[-1].split(',')[0].strip()
-                                amount = Decimal(amount_str)
-                            # Try to extract with "Rs." format
-                            elif 'Rs.' in anomaly_data['transaction']:
-                                amount_str = anomaly_data['transaction'].split('Rs.')[-1].split(',')[0].strip()
-                                amount = Decimal(amount_str)
-                            # Try to extract with "INR" format
-                            elif 'INR' in anomaly_data['transaction']:
-                                amount_str = anomaly_data['transaction'].split('INR')[-1].split(',')[0].strip()
-                                amount = Decimal(amount_str)
-                            else:
-                                amount = Decimal('0.00')
-                        except (IndexError, ValueError, InvalidOperation):
-                            amount = Decimal('0.00')
-                    
-                    # Try to extract category from transaction description
-                    try:
-                        if 'Category:' in anomaly_data['transaction']:
-                            category = anomaly_data['transaction'].split('Category:')[-1].split(',')[0].strip()
-                    except IndexError:
-                        pass
-                
-                anomaly = ExpenseAnomaly.objects.create(
-                    user=user,
-                    amount=amount,
-                    category=category,
-                    anomaly_type=anomaly_type,
-                    description=anomaly_data.get('description', 'Anomaly detected')
-                )
-                anomalies.append(anomaly)
-            
-            return anomalies
+
+            detected = AnomalyDetectionService.score_transactions(user.pk, rows)
+            last_updated_at = max(row[6] for row in rows)
+            return AnomalyDetectionService.record_new_anomalies(user.pk, detected, last_updated_at)
         except Exception as e:
             logger.error(f"Error detecting anomalies: {str(e)}")
             anomaly = ExpenseAnomaly.objects.create(
@@ -192,123 +386,71 @@ class AnomalyDetectionService:
             return [anomaly]
 
 class ForecastingService:
+    @staticmethod
+    def _build_forecasts(user, forecast_type, forecast_data):
+        """Turn Gemini predictions into unsaved FinancialForecast objects"""
+        forecasts = []
+        if 'predictions' in forecast_data:
+            for i, prediction in enumerate(forecast_data['predictions']):
+                forecast_date = datetime.now().date() + timedelta(days=30 * (i + 1))
+                amount = prediction.get('amount', 0)
+                confidence = prediction.get('confidence', 0.5)
+                
+                forecasts.append(FinancialForecast(
+                    user=user,
+                    forecast_type=forecast_type,
+                    forecast_date=forecast_date,
+                    predicted_amount=Decimal(str(amount)),
+                    confidence_score=confidence
+                ))
+        return forecasts
+
+    @staticmethod
+    def _sample_forecasts(user, samples):
+        return [
+            FinancialForecast(
+                user=user,
+                forecast_type=forecast_type,
+                forecast_date=datetime.now().date() + timedelta(days=30),
+                predicted_amount=Decimal(str(amount)),
+                confidence_score=confidence
+            )
+            for forecast_type, amount, confidence in samples
+        ]
+
+    @staticmethod
+    def _save_forecasts(forecasts):
+        """Insert all forecasts of one run with a single statement in one transaction"""
+        with db_transaction.atomic():
+            return FinancialForecast.objects.bulk_create(forecasts)
+
     @staticmethod
     def forecast_expenses(user):
         try:
-            # Get historical expense data (last 12 months)
-            end_date = datetime.now().date()
-            start_date = end_date - timedelta(days=365)
-            
-            # Aggregate expenses by month
-            try:
-                expenses_by_month = Outcome.objects.filter(
-                    user=user,
-                    date__gte=start_date,
-                    date__lte=end_date
-                ).values('date__year', 'date__month').annotate(
-                    total_amount=Sum('value')
-                ).order_by('date__year', 'date__month')
-            except Exception as exp_error:
-                logger.warning(f"Error getting expense data: {str(exp_error)}")
-                expenses_by_month = []
-            
-            # Prepare data for Gemini API
-            historical_data = []
-            for expense in expenses_by_month:
-                try:
-                    month_date = datetime(expense['date__year'], expense['date__month'], 1).date()
-                    historical_data.append({
-                        'date': month_date.strftime('%Y-%m-%d'),
-                        'amount': float(expense['total_amount'])
-                    })
-                except (KeyError, ValueError) as data_error:
-                    logger.warning(f"Error processing expense data: {str(data_error)}")
+            # Get historical monthly expense and income data (last 12 months)
+            snapshot = FinancialSnapshotService.get_snapshot(user)
+            historical_data = snapshot['monthly_expenses']
+            income_data = snapshot['monthly_income']
             
             # If insufficient data, create sample forecasts
             if len(historical_data) < 3:
-                # Create sample forecasts
-                forecasts = []
-                for forecast_type, amount, confidence in [
+                return ForecastingService._save_forecasts(ForecastingService._sample_forecasts(user, [
                     ('EXPENSE', 3000, 0.6),
                     ('INCOME', 5000, 0.7),
                     ('CASHFLOW', 2000, 0.5)
-                ]:
-                    forecast = FinancialForecast.objects.create(
-                        user=user,
-                        forecast_type=forecast_type,
-                        forecast_date=datetime.now().date() + timedelta(days=30),
-                        predicted_amount=Decimal(str(amount)),
-                        confidence_score=confidence
-                    )
-                    forecasts.append(forecast)
-                
-                return forecasts
+                ]))
             
             # Generate forecasts using Gemini
             forecasts = []
             
             # Expense forecast
             expense_forecast_data = GeminiService.generate_forecast(historical_data, 'EXPENSE')
-            
-            # Create Expense forecast objects
-            if 'predictions' in expense_forecast_data:
-                for i, prediction in enumerate(expense_forecast_data['predictions']):
-                    forecast_date = datetime.now().date() + timedelta(days=30 * (i + 1))
-                    amount = prediction.get('amount', 0)
-                    confidence = prediction.get('confidence', 0.5)
-                    
-                    forecast = FinancialForecast.objects.create(
-                        user=user,
-                        forecast_type='EXPENSE',
-                        forecast_date=forecast_date,
-                        predicted_amount=Decimal(str(amount)),
-                        confidence_score=confidence
-                    )
-                    forecasts.append(forecast)
-            
-            # Get income data
-            try:
-                income_by_month = Income.objects.filter(
-                    user=user,
-                    date__gte=start_date,
-                    date__lte=end_date
-                ).values('date__year', 'date__month').annotate(
-                    total_amount=Sum('value')
-                ).order_by('date__year', 'date__month')
-            except Exception as inc_error:
-                logger.warning(f"Error getting income data: {str(inc_error)}")
-                income_by_month = []
-            
-            income_data = []
-            for income in income_by_month:
-                try:
-                    month_date = datetime(income['date__year'], income['date__month'], 1).date()
-                    income_data.append({
-                        'date': month_date.strftime('%Y-%m-%d'),
-                        'amount': float(income['total_amount'])
-                    })
-                except (KeyError, ValueError) as data_error:
-                    logger.warning(f"Error processing income data: {str(data_error)}")
+            forecasts.extend(ForecastingService._build_forecasts(user, 'EXPENSE', expense_forecast_data))
             
             # Income forecast
             if len(income_data) >= 3:
                 income_forecast_data = GeminiService.generate_forecast(income_data, 'INCOME')
-                
-                # Create Income forecast objects
-                if 'predictions' in income_forecast_data:
-                    for i, prediction in enumerate(income_forecast_data['predictions']):
-                        forecast_date = datetime.now().date() + timedelta(days=30 * (i + 1))
-                        amount = prediction.get('amount', 0)
-                        confidence = prediction.get('confidence', 0.5)
-                        
-                        forecast = FinancialForecast.objects.create(
-                            user=user,
-                            forecast_type='INCOME',
-                            forecast_date=forecast_date,
-                            predicted_amount=Decimal(str(amount)),
-                            confidence_score=confidence
-                        )
-                        forecasts.append(forecast)
+                forecasts.extend(ForecastingService._build_forecasts(user, 'INCOME', income_forecast_data))
             
             # Cash flow forecast (combine both)
             if len(income_data) >= 3 and len(historical_data) >= 3:
@@ -320,51 +462,132 @@ class ForecastingService:
                 # Get all unique dates
                 all_dates = sorted(set(list(income_dict.keys()) + list(expense_dict.keys())))
                 
-                for date in all_dates:
-                    income_amount = income_dict.get(date, 0)
-                    expense_amount = expense_dict.get(date, 0)
+                for month in all_dates:
+                    income_amount = income_dict.get(month, 0)
+                    expense_amount = expense_dict.get(month, 0)
                     cashflow_amount = income_amount - expense_amount
                     
                     cashflow_data.append({
-                        'date': date,
+                        'date': month,
                         'amount': cashflow_amount
                     })
                     
                 cashflow_forecast_data = GeminiService.generate_forecast(cashflow_data, 'CASHFLOW')
-                
-                # Create Cashflow forecast objects
-                if 'predictions' in cashflow_forecast_data:
-                    for i, prediction in enumerate(cashflow_forecast_data['predictions']):
-                        forecast_date = datetime.now().date() + timedelta(days=30 * (i + 1))
-                        amount = prediction.get('amount', 0)
-                        confidence = prediction.get('confidence', 0.5)
-                        
-                        forecast = FinancialForecast.objects.create(
-                            user=user,
-                            forecast_type='CASHFLOW',
-                            forecast_date=forecast_date,
-                            predicted_amount=Decimal(str(amount)),
-                            confidence_score=confidence
-                        )
-                        forecasts.append(forecast)
+                forecasts.extend(ForecastingService._build_forecasts(user, 'CASHFLOW', cashflow_forecast_data))
             
-            return forecasts
+            return ForecastingService._save_forecasts(forecasts)
         except Exception as e:
             logger.error(f"Error generating forecasts: {str(e)}")
             # Return sample forecasts in case of error
-            forecasts = []
-            for forecast_type, amount, confidence in [
+            return ForecastingService._save_forecasts(ForecastingService._sample_forecasts(user, [
                 ('EXPENSE', 3000, 0.5),
                 ('INCOME', 5000, 0.5),
                 ('CASHFLOW', 2000, 0.5)
-            ]:
-                forecast = FinancialForecast.objects.create(
-                    user=user,
-                    forecast_type=forecast_type,
-                    forecast_date=datetime.now().date() + timedelta(days=30),
-                    predicted_amount=Decimal(str(amount)),
-                    confidence_score=confidence
-                )
-                forecasts.append(forecast)
-            
-            return forecasts 
\ No newline at end of file
+            ]))
+
+class HistoryRetentionService:
+    """
+    Retention policy for generated advice, anomaly and forecast history.
+
+    Each policy caps rows per user and type (advice_type, anomaly_type or
+    forecast_type) by age and by count; limits can be overridden with the
+    AI_HISTORY_RETENTION setting. Advice and anomalies are also deduplicated,
+    keeping the newest copy of identical rows. Deletes run in batches so a
+    large backlog never holds one long write lock.
+    """
+    POLICIES = {
+        'advice': {
+            'model': FinancialAdvice,
+            'time_field': 'created_at',
+            'type_field': 'advice_type',
+            'dedupe_fields': ['user', 'advice_type', 'advice_text'],
+            'max_age_days': 365,
+            'max_rows': 50,
+        },
+        'anomalies': {
+            'model': ExpenseAnomaly,
+            'time_field': 'detected_at',
+            'type_field': 'anomaly_type',
+            'dedupe_fields': ['user', 'amount', 'category', 'anomaly_type', 'description'],
+            'max_age_days': 180,
+            'max_rows': 100,
+        },
+        'forecasts': {
+            'model': FinancialForecast,
+            'time_field': 'created_at',
+            'type_field': 'forecast_type',
+            'dedupe_fields': None,
+            'max_age_days': 90,
+            'max_rows': 30,
+        },
+    }
+
+    @classmethod
+    def get_policy(cls, name):
+        policy = dict(cls.POLICIES[name])
+        policy.update(getattr(settings, 'AI_HISTORY_RETENTION', {}).get(name, {}))
+        return policy
+
+    @staticmethod
+    def _delete_in_batches(model, ids, batch_size):
+        deleted = 0
+        for i in range(0, len(ids), batch_size):
+            deleted += model.objects.filter(pk__in=ids[i:i + batch_size]).delete()[0]
+        return deleted
+
+    @classmethod
+    def deduplicate(cls, policy, batch_size):
+        """Delete all but the newest row of every group of identical rows"""
+        if not policy['dedupe_fields']:
+            return 0
+        model = policy['model']
+        duplicate_ids = []
+        groups = model.objects.values(*policy['dedupe_fields']).annotate(
+            keep_id=Max('pk'), copies=Count('pk')
+        ).filter(copies__gt=1)
+        for group in groups.iterator():
+            keep_id = group.pop('keep_id')
+            group.pop('copies')
+            duplicate_ids.extend(
+                model.objects.filter(**group).exclude(pk=keep_id).values_list('pk', flat=True)
+            )
+        return cls._delete_in_batches(model, duplicate_ids, batch_size)
+
+    @classmethod
+    def purge_expired(cls, policy, batch_size):
+        """Delete rows older than the policy's max age"""
+        model = policy['model']
+        cutoff = timezone.now() - timedelta(days=policy['max_age_days'])
+        expired = model.objects.filter(**{f"{policy['time_field']}__lt": cutoff})
+        deleted = 0
+        while True:
+            ids = list(expired.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += model.objects.filter(pk__in=ids).delete()[0]
+
+    @classmethod
+    def trim_excess(cls, policy, batch_size):
+        """Keep only the newest max_rows rows per user and type"""
+        model = policy['model']
+        ranked = model.objects.annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=[F('user'), F(policy['type_field'])],
+                order_by=[F(policy['time_field']).desc(), F('pk').desc()],
+            )
+        ).filter(position__gt=policy['max_rows'])
+        return cls._delete_in_batches(model, list(ranked.values_list('pk', flat=True)), batch_size)
+
+    @classmethod
+    def compact(cls, batch_size=1000):
+        """Apply every policy; returns deleted row counts per policy"""
+        results = {}
+        for name in cls.POLICIES:
+            policy = cls.get_policy(name)
+            results[name] = {
+                'duplicates': cls.deduplicate(policy, batch_size),
+                'expired': cls.purge_expired(policy, batch_size),
+                'excess': cls.trim_excess(policy, batch_size),
+            }
+        return results
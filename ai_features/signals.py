@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from budget_section.models import Transaction
+from my_finances.models import Balance, Income, Outcome
+from .services import FinancialSnapshotService
+
+
+@receiver(post_save, sender=Income)
+@receiver(post_save, sender=Outcome)
+@receiver(post_save, sender=Balance)
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Outcome)
+@receiver(post_delete, sender=Balance)
+@receiver(post_delete, sender=Transaction)
+def invalidate_financial_snapshot(sender, instance, **kwargs):
+    FinancialSnapshotService.invalidate(instance.user_id)
@@ -0,0 +1,462 @@
+import json
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from budget_section.models import Budget, Category, Transaction
+from my_finances.models import Balance, Income, Outcome
+from .fake_gemini import make_server
+from .gemini_service import GeminiService
+from .local_calculator import LocalFinancialCalculator
+from .ratelimit import SlidingWindow, rate_limit_stats
+from .models import AnomalyScanState, ExpenseAnomaly, FinancialAdvice, FinancialCalculation, FinancialForecast
+from .services import AnomalyDetectionService, FinancialSnapshotService, ForecastingService
+
+
+class AnomalyDetectionServiceTest(TestCase):
+
+    def setUp(self):
+        AnomalyDetectionService._model_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='anomaly@example.com',
+            first_name='Anomaly',
+            last_name='Tester',
+            password='testpass123'
+        )
+        self.budget = Budget.objects.create(name='Monthly', amount=5000, start_date=date(2024, 1, 1), user=self.user)
+        self.groceries = Category.objects.create(name='Groceries', user=self.user)
+        self.start = date(2024, 1, 1)
+        for i in range(40):
+            self.add_transaction(i, Decimal('50.00') + i % 5)
+
+    def add_transaction(self, day, amount, category=None):
+        return Transaction.objects.create(
+            title=f'Transaction {day}',
+            amount=amount,
+            category=category or self.groceries,
+            budget=self.budget,
+            date=self.start + timedelta(days=day),
+            user=self.user
+        )
+
+    def test_build_features_covers_whole_history(self):
+        rows = list(AnomalyDetectionService.get_transaction_rows(self.user))
+        features = AnomalyDetectionService.build_features(rows)
+        self.assertEqual(features.shape, (40, 6))
+        # the first rows have no rolling window yet
+        self.assertEqual(features[0, 3], 0)
+
+    def test_detects_outlier_amount(self):
+        outlier = self.add_transaction(40, Decimal('5000.00'))
+        rows = list(AnomalyDetectionService.get_transaction_rows(self.user))
+        detected = AnomalyDetectionService.score_transactions(self.user.pk, rows)
+        self.assertEqual(detected[0]['transaction_id'], outlier.id)
+        self.assertEqual(detected[0]['anomaly_type'], 'UNUSUAL_AMOUNT')
+
+        anomalies = AnomalyDetectionService.detect_anomalies(self.user)
+        self.assertEqual(anomalies[0].amount, Decimal('5000.00'))
+        self.assertEqual(ExpenseAnomaly.objects.filter(user=self.user).count(), len(anomalies))
+
+    def test_model_is_reused_and_extended_on_append(self):
+        rows = list(AnomalyDetectionService.get_transaction_rows(self.user))
+        AnomalyDetectionService.score_transactions(self.user.pk, rows)
+        model = AnomalyDetectionService._model_cache[self.user.pk]['model']
+        AnomalyDetectionService.score_transactions(self.user.pk, rows)
+        self.assertIs(AnomalyDetectionService._model_cache[self.user.pk]['model'], model)
+        self.assertEqual(model.n_estimators, AnomalyDetectionService.BASE_ESTIMATORS)
+
+        self.add_transaction(41, Decimal('52.00'))
+        rows = list(AnomalyDetectionService.get_transaction_rows(self.user))
+        AnomalyDetectionService.score_transactions(self.user.pk, rows)
+        cached = AnomalyDetectionService._model_cache[self.user.pk]
+        self.assertEqual(cached['n_rows'], 41)
+        self.assertEqual(
+            cached['model'].n_estimators,
+            AnomalyDetectionService.BASE_ESTIMATORS + AnomalyDetectionService.INCREMENT_ESTIMATORS
+        )
+        # The forest other requests may still be using is left as it was
+        self.assertEqual(model.n_estimators, AnomalyDetectionService.BASE_ESTIMATORS)
+
+    def test_model_cache_is_bounded(self):
+        rows = list(AnomalyDetectionService.get_transaction_rows(self.user))
+        with mock.patch.object(AnomalyDetectionService, 'MAX_CACHED_MODELS', 2):
+            for user_id in (1001, 1002, 1003):
+                AnomalyDetectionService.score_transactions(user_id, rows)
+            AnomalyDetectionService.score_transactions(1002, rows)
+            AnomalyDetectionService.score_transactions(self.user.pk, rows)
+        self.assertEqual(list(AnomalyDetectionService._model_cache), [1002, self.user.pk])
+
+    def test_not_enough_history(self):
+        Transaction.objects.filter(user=self.user).delete()
+        anomalies = AnomalyDetectionService.detect_anomalies(self.user)
+        self.assertEqual(len(anomalies), 1)
+        self.assertEqual(anomalies[0].amount, Decimal('0.00'))
+
+
+class ScanAnomaliesCommandTest(TestCase):
+
+    def setUp(self):
+        AnomalyDetectionService._model_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='scan@example.com',
+            first_name='Scan',
+            last_name='Tester',
+            password='testpass123'
+        )
+        budget = Budget.objects.create(name='Scan budget', amount=5000, start_date=date(2024, 1, 1), user=self.user)
+        category = Category.objects.create(name='Scan groceries', user=self.user)
+        for i in range(40):
+            Transaction.objects.create(
+                title=f'Scan transaction {i}',
+                amount=Decimal('5000.00') if i == 39 else Decimal('50.00') + i % 5,
+                category=category,
+                budget=budget,
+                date=date(2024, 1, 1) + timedelta(days=i),
+                user=self.user
+            )
+
+    def test_scan_is_deduplicated_by_high_water_mark(self):
+        out = StringIO()
+        call_command('scan_anomalies', workers=1, stdout=out)
+        first_run = ExpenseAnomaly.objects.filter(user=self.user).count()
+        self.assertGreater(first_run, 0)
+        self.assertIn('Scanned 1 users', out.getvalue())
+        self.assertEqual(
+            AnomalyScanState.objects.get(user=self.user).last_updated_at,
+            Transaction.objects.filter(user=self.user).latest('updated_at').updated_at
+        )
+
+        out = StringIO()
+        call_command('scan_anomalies', workers=1, stdout=out)
+        self.assertEqual(ExpenseAnomaly.objects.filter(user=self.user).count(), first_run)
+        self.assertIn('Scanned 0 users', out.getvalue())
+
+    def test_edited_transaction_is_rescanned(self):
+        call_command('scan_anomalies', workers=1, stdout=StringIO())
+        first_run = ExpenseAnomaly.objects.filter(user=self.user).count()
+
+        edited = Transaction.objects.filter(user=self.user).order_by('date').first()
+        edited.amount = Decimal('9000.00')
+        edited.save()
+        out = StringIO()
+        call_command('scan_anomalies', workers=1, stdout=out)
+        self.assertIn('Scanned 1 users', out.getvalue())
+        self.assertTrue(ExpenseAnomaly.objects.filter(user=self.user, amount=Decimal('9000.00')).exists())
+        self.assertGreater(ExpenseAnomaly.objects.filter(user=self.user).count(), first_run)
+
+    def test_every_new_anomaly_is_recorded(self):
+        updated_at = timezone.now()
+        detected = [{'updated_at': updated_at, 'amount': Decimal(i), 'category': 'Groceries',
+                     'anomaly_type': 'UNUSUAL_AMOUNT', 'description': f'Anomaly {i}'} for i in range(15)]
+        created = AnomalyDetectionService.record_new_anomalies(self.user.pk, detected, updated_at)
+        self.assertEqual(len(created), 15)
+        self.assertEqual(AnomalyDetectionService.record_new_anomalies(self.user.pk, detected, updated_at), [])
+
+
+class CalculateStreamViewTest(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='stream@example.com',
+            first_name='Stream',
+            last_name='Tester',
+            password='testpass123'
+        )
+        self.client.force_login(self.user)
+        cache.clear()
+
+    def test_streams_tokens_then_stores_result(self):
+        chunks = ['{"result": "₹1,100", ', '"explanation": "1000 * 1.1", ', '"insights": ["Compounding helps"]}']
+        with mock.patch.object(GeminiService, 'stream_response', return_value=iter(chunks)):
+            response = self.client.post(reverse('ai_features:calculate_stream'), {'query': '10% of 1000 added'})
+            body = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(body.count('event: token'), 3)
+        self.assertIn('event: result', body)
+        calculation = FinancialCalculation.objects.get(user=self.user)
+        self.assertEqual(calculation.result, '₹1,100')
+        self.assertEqual(json.loads(calculation.insights), ['Compounding helps'])
+
+    def test_local_formula_skips_gemini(self):
+        with mock.patch.object(GeminiService, 'stream_response') as stream_response:
+            response = self.client.post(reverse('ai_features:calculate_stream'),
+                                        {'query': 'EMI for a ₹5,00,000 loan at 9% for 5 years'})
+            body = b''.join(response.streaming_content).decode()
+        stream_response.assert_not_called()
+        self.assertNotIn('event: token', body)
+        self.assertIn('"source": "local"', body)
+        self.assertEqual(FinancialCalculation.objects.get(user=self.user).result, '₹10,379.18')
+
+    def test_missing_query(self):
+        response = self.client.post(reverse('ai_features:calculate_stream'), {'query': ''})
+        self.assertEqual(response.status_code, 400)
+
+
+class LocalFinancialCalculatorTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_standard_formulas(self):
+        cases = [
+            ('EMI for a ₹5,00,000 loan at 9% for 5 years', '₹10,379.18'),
+            ('EMI for a ₹5,00,000 loan at 9% for 2.5 years', '₹18,674.08'),
+            ('Compound interest on 1 lakh at 8% for 3 years compounded quarterly', '₹26,824.18'),
+            ('SIP of ₹500 per month at 8% for 20 years', '₹296,473.61'),
+            ('What is the CAGR if 10000 grew to 25000 in 5 years?', '20.11%'),
+            ('How many months to repay a loan of 200000 at 10% with EMI of 5000?', '49 months'),
+        ]
+        for query, expected in cases:
+            with self.subTest(query=query):
+                self.assertEqual(LocalFinancialCalculator.evaluate(query)['result'], expected)
+
+    def test_unrecognised_query_falls_through(self):
+        self.assertIsNone(LocalFinancialCalculator.evaluate("What's 15% tip on a ₹78.50 bill?"))
+        # recognised formula but missing the tenure
+        self.assertIsNone(LocalFinancialCalculator.evaluate('EMI for a ₹5,00,000 loan at 9%'))
+
+    def test_ambiguous_query_falls_through(self):
+        queries = [
+            'EMI for a ₹50,00,000 flat with ₹10,00,000 down payment at 9% for 20 years',
+            'Compare the EMI for 5 lakh at 9% for 5 years with 8.5% for 7 years',
+            'Compound interest on 1 lakh at -2% for 3 years',
+            # installments come in whole months
+            'EMI for a ₹5,00,000 loan at 9% for 2.5 months',
+            'SIP of ₹5,000 per month at 12% for 1.1 years',
+        ]
+        for query in queries:
+            with self.subTest(query=query):
+                self.assertIsNone(LocalFinancialCalculator.evaluate(query))
+
+    def test_hit_ratio(self):
+        LocalFinancialCalculator.record(True)
+        LocalFinancialCalculator.record(True)
+        LocalFinancialCalculator.record(False)
+        stats = LocalFinancialCalculator.hit_ratio()
+        self.assertEqual((stats['local_hits'], stats['llm_fallbacks']), (2, 1))
+        self.assertAlmostEqual(stats['ratio'], 2 / 3)
+
+
+@override_settings(
+    AI_RATE_LIMIT_USER={'capacity': 2, 'refill_rate': 0.01},
+    AI_RATE_LIMIT_GLOBAL={'capacity': 3, 'refill_rate': 0.01},
+)
+class RateLimitTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.first = User.objects.create_user(email='first@example.com', first_name='First', last_name='Limited',
+                                              password='testpass123')
+        self.second = User.objects.create_user(email='second@example.com', first_name='Second', last_name='Limiter',
+                                               password='testpass123')
+
+    def post_as(self, user):
+        self.client.force_login(user)
+        return self.client.post(reverse('ai_features:calculate'), {'query': ''})
+
+    def test_user_and_global_buckets(self):
+        self.assertEqual(self.post_as(self.first).status_code, 400)
+        self.assertEqual(self.post_as(self.first).status_code, 400)
+
+        response = self.post_as(self.first)
+        self.assertEqual(response.status_code, 429)
+        # the user window is capacity / refill_rate = 200 seconds long, and the
+        # two requests may still count until the end of the next one
+        self.assertTrue(1 <= int(response['Retry-After']) <= 400)
+
+        # the second user still has tokens but the global bucket is nearly drained
+        self.assertEqual(self.post_as(self.second).status_code, 400)
+        self.assertEqual(self.post_as(self.second).status_code, 429)
+
+        self.assertEqual(rate_limit_stats('calculate'), {'admitted': 3, 'rejected': 2})
+
+    def test_concurrent_requests_are_not_over_admitted(self):
+        window = SlidingWindow('ai_features:ratelimit:test', capacity=5, refill_rate=0.01)
+        now = time.time()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(window.acquire(1, now))) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 5)
+
+    def test_retry_after_is_honoured(self):
+        window = SlidingWindow('ai_features:ratelimit:test', capacity=10, refill_rate=10 / 60)
+        for _ in range(10):
+            self.assertTrue(window.acquire(1, 1))
+        self.assertFalse(window.acquire(1, 10))
+        # the full previous window still counts at the start of the next one
+        retry_after = window.retry_after(1, 10)
+        self.assertEqual(retry_after, 56)
+        self.assertFalse(window.acquire(1, 10 + retry_after - 1))
+        self.assertTrue(window.acquire(1, 10 + retry_after))
+
+    def test_page_views_are_not_limited(self):
+        self.client.force_login(self.first)
+        for _ in range(4):
+            self.assertEqual(self.client.get(reverse('ai_features:calculator')).status_code, 200)
+
+
+class FinancialSnapshotServiceTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='snapshot@example.com',
+            first_name='Snapshot',
+            last_name='Tester',
+            password='testpass123'
+        )
+        today = timezone.localdate()
+        last_month = today.replace(day=1) - timedelta(days=1)
+        Income.objects.create(user=self.user, value=Decimal('3000.00'), date=today, type=Income.ITypes.SAL)
+        Income.objects.create(user=self.user, value=Decimal('2500.00'), date=last_month, type=Income.ITypes.SAL)
+        Outcome.objects.create(user=self.user, value=Decimal('800.00'), date=today, type=Outcome.OTypes.REN)
+        Balance.objects.create(user=self.user, value=Decimal('100.00'), date=last_month, type=Balance.BType.CUR)
+        Balance.objects.create(user=self.user, value=Decimal('900.00'), date=today, type=Balance.BType.SAV)
+
+    def test_snapshot_in_two_queries_and_memoized(self):
+        with self.assertNumQueries(2):
+            snapshot = FinancialSnapshotService.get_snapshot(self.user)
+        self.assertEqual(snapshot['income'], Decimal('3000.00'))
+        self.assertEqual(snapshot['expenses'], Decimal('800.00'))
+        self.assertEqual(snapshot['savings'], Decimal('900.00'))
+        self.assertEqual(snapshot['debt'], Decimal('0.00'))
+        self.assertEqual([row['amount'] for row in snapshot['monthly_income']], [2500.0, 3000.0])
+        self.assertEqual(len(snapshot['monthly_expenses']), 1)
+
+        with self.assertNumQueries(0):
+            FinancialSnapshotService.get_snapshot(self.user)
+
+    def test_saving_income_invalidates_snapshot(self):
+        FinancialSnapshotService.get_snapshot(self.user)
+        Income.objects.create(user=self.user, value=Decimal('500.00'), date=timezone.localdate(), type=Income.ITypes.BON)
+        self.assertEqual(FinancialSnapshotService.get_snapshot(self.user)['income'], Decimal('3500.00'))
+
+
+@override_settings(AI_HISTORY_RETENTION={'forecasts': {'max_age_days': 30, 'max_rows': 2}})
+class CompactAiHistoryCommandTest(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='compact@example.com',
+            first_name='Compact',
+            last_name='Tester',
+            password='testpass123'
+        )
+
+    def test_compaction(self):
+        for _ in range(3):
+            FinancialAdvice.objects.create(user=self.user, advice_type='SAVING', advice_text='Save more')
+        FinancialAdvice.objects.create(user=self.user, advice_type='SAVING', advice_text='Spend less')
+        for amount in [100, 200, 300, 400]:
+            FinancialForecast.objects.create(user=self.user, forecast_type='EXPENSE', forecast_date=date(2024, 1, 1),
+                                             predicted_amount=amount, confidence_score=0.5)
+        old = FinancialForecast.objects.create(user=self.user, forecast_type='INCOME', forecast_date=date(2024, 1, 1),
+                                               predicted_amount=1, confidence_score=0.5)
+        FinancialForecast.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=31))
+
+        call_command('compact_ai_history', batch_size=1, stdout=StringIO())
+
+        self.assertEqual(
+            sorted(FinancialAdvice.objects.values_list('advice_text', flat=True)), ['Save more', 'Spend less']
+        )
+        self.assertFalse(FinancialForecast.objects.filter(pk=old.pk).exists())
+        self.assertEqual(
+            sorted(FinancialForecast.objects.values_list('predicted_amount', flat=True)),
+            [Decimal('300.00'), Decimal('400.00')]
+        )
+
+
+class BulkPersistenceTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='bulk@example.com',
+            first_name='Bulk',
+            last_name='Tester',
+            password='testpass123'
+        )
+
+    def test_forecasts_inserted_in_one_statement(self):
+        today = timezone.localdate()
+        for months_back in range(4):
+            day = FinancialSnapshotService._add_months(today, -months_back)
+            Income.objects.create(user=self.user, value=Decimal('3000.00'), date=day, type=Income.ITypes.SAL)
+            Outcome.objects.create(user=self.user, value=Decimal('1000.00'), date=day, type=Outcome.OTypes.REN)
+        FinancialSnapshotService.get_snapshot(self.user)
+
+        predictions = {'predictions': [{'amount': 100, 'confidence': 0.8}, {'amount': 110, 'confidence': 0.7}]}
+        with mock.patch.object(GeminiService, 'generate_forecast', return_value=predictions):
+            # savepoint + one INSERT + release
+            with self.assertNumQueries(3):
+                forecasts = ForecastingService.forecast_expenses(self.user)
+        self.assertEqual(len(forecasts), 6)
+        self.assertEqual(FinancialForecast.objects.filter(user=self.user).count(), 6)
+
+    def test_create_default_ai_data_is_idempotent(self):
+        call_command('create_default_ai_data', stdout=StringIO())
+        call_command('create_default_ai_data', stdout=StringIO())
+        self.assertEqual(FinancialAdvice.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(ExpenseAnomaly.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(FinancialForecast.objects.filter(user=self.user).count(), 3)
+
+
+class FakeGeminiServerTest(TestCase):
+    def setUp(self):
+        self.server = make_server(port=0, latency_ms=0, distribution='fixed', seed=1)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        host, port = self.server.server_address[:2]
+        patcher = mock.patch.object(GeminiService, 'BASE_URL', f'http://{host}:{port}/v1beta/models')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def test_calculator_answer_is_parsed(self):
+        result = GeminiService.financial_calculator("What's 15% tip on a ₹78.50 bill?")
+        self.assertEqual(result['result'], '₹1,234.56')
+        self.assertEqual(self.server.config.served, 1)
+
+    def test_stream_reassembles_answer(self):
+        prompt = GeminiService.calculator_prompt("What's 15% tip on a ₹78.50 bill?")
+        text = ''.join(GeminiService.stream_response(prompt))
+        self.assertEqual(GeminiService.parse_calculation(text)['result'], '₹1,234.56')
+
+    def test_stalled_stream_ends_with_error_event(self):
+        # 100ms between chunks against a 20ms read timeout
+        self.server.config.latency_ms = 800
+        user = get_user_model().objects.create_user(email='stall@example.com', first_name='Stall',
+                                                    last_name='Tester', password='testpass123')
+        self.client.force_login(user)
+        with mock.patch.object(GeminiService, 'STREAM_TIMEOUT', (1, 0.02)):
+            prompt = GeminiService.calculator_prompt("What's 15% tip on a ₹78.50 bill?")
+            with self.assertRaises(requests.Timeout):
+                ''.join(GeminiService.stream_response(prompt))
+            response = self.client.post(reverse('ai_features:calculate_stream'),
+                                        {'query': "What's 15% tip on a ₹78.50 bill?"})
+            body = b''.join(response.streaming_content).decode()
+        self.assertIn('event: error', body)
+        self.assertIn('took too long', body)
+        self.assertFalse(FinancialCalculation.objects.filter(user=user).exists())
+
+    def test_injected_failures(self):
+        self.server.config.failure_rate = 1.0
+        result = GeminiService.financial_calculator("What's 15% tip on a ₹78.50 bill?")
+        self.assertIn('Error', result['result'])
+        self.assertEqual(self.server.config.failed, 1)
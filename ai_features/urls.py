@@ -10,4 +10,5 @@ urlpatterns = [
     path('generate-forecast/', views.generate_forecast, name='generate_forecast'),
     path('calculator/', views.calculator, name='calculator'),
     path('calculate/', views.calculate, name='calculate'),
+    path('calculate/stream/', views.calculate_stream, name='calculate_stream'),
 ] 
\ No newline at end of file
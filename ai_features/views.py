@@ -1,10 +1,16 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from .services import FinancialAdviceService, AnomalyDetectionService, ForecastingService
 from .models import FinancialAdvice, ExpenseAnomaly, FinancialForecast, FinancialCalculation
 from .gemini_service import GeminiService
+from .local_calculator import LocalFinancialCalculator
+from .ratelimit import rate_limit
 import json
+import logging
+import requests
+
+logger = logging.getLogger(__name__)
 
 @login_required
 def dashboard(request):
@@ -16,16 +22,19 @@ def dashboard(request):
     return render(request, 'ai_features/dashboard.html', context)
 
 @login_required
+@rate_limit()
 def generate_advice(request):
     advice = FinancialAdviceService.generate_saving_tips(request.user)
     return JsonResponse({'message': 'Advice generated successfully'})
 
 @login_required
+@rate_limit()
 def detect_anomalies(request):
     anomalies = AnomalyDetectionService.detect_anomalies(request.user)
-    return JsonResponse({'message': f'Detected {len(anomalies)} anomalies'})
+    return JsonResponse({'message': f'Detected {len(anomalies)} new anomalies'})
 
 @login_required
+@rate_limit()
 def generate_forecast(request):
     forecast = ForecastingService.forecast_expenses(request.user)
     return JsonResponse({'message': 'Forecast generated successfully'})
@@ -36,12 +45,53 @@ def calculator(request):
     recent_calculations = FinancialCalculation.objects.filter(user=request.user)[:10]
     
     context = {
-        'recent_calculations': recent_calculations
+        'recent_calculations': recent_calculations,
+        'calculator_stats': LocalFinancialCalculator.hit_ratio()
     }
     
     return render(request, 'ai_features/calculator.html', context)
 
+def _local_calculation(query):
+    """Answer standard formula queries locally, recording the hit or the LLM fallback"""
+    calculation_result = LocalFinancialCalculator.evaluate(query)
+    LocalFinancialCalculator.record(calculation_result is not None)
+    return calculation_result
+
+def _store_calculation(user, query, calculation_result, source='gemini'):
+    """Persist a parsed calculator result and return the JSON payload sent to the UI"""
+    # Ensure insights is a string for database storage
+    insights_json = json.dumps(calculation_result.get('insights', [])) if isinstance(calculation_result.get('insights', []), list) else calculation_result.get('insights', '[]')
+    
+    calculation = FinancialCalculation.objects.create(
+        user=user,
+        query=query,
+        result=calculation_result.get('result', 'No result'),
+        explanation=calculation_result.get('explanation', 'No explanation'),
+        insights=insights_json
+    )
+    
+    # Return the calculation results
+    # Make sure we parse the insights properly
+    insights = []
+    if isinstance(calculation_result.get('insights', []), list):
+        insights = calculation_result.get('insights', [])
+    else:
+        try:
+            insights = json.loads(calculation_result.get('insights', '[]'))
+        except json.JSONDecodeError:
+            insights = [calculation_result.get('insights', 'No insights available')]
+    
+    return {
+        'id': calculation.id,
+        'result': calculation.result,
+        'explanation': calculation.explanation,
+        'insights': insights,
+        'created_at': calculation.created_at.strftime('%Y-%m-%d %H:%M'),
+        'source': source
+    }
+
 @login_required
+@rate_limit()
 def calculate(request):
     if request.method == 'POST':
         query = request.POST.get('query', '')
@@ -49,40 +99,16 @@ def calculate(request):
         if not query:
             return JsonResponse({'error': 'No query provided'}, status=400)
         
-        # Call the Gemini API for calculation
-        calculation_result = GeminiService.financial_calculator(query)
+        # Standard formulas are answered locally; only unrecognised queries reach Gemini
+        source = 'local'
+        calculation_result = _local_calculation(query)
+        if calculation_result is None:
+            source = 'gemini'
+            calculation_result = GeminiService.financial_calculator(query)
         
         # Store the calculation in the database
         try:
-            # Ensure insights is a string for database storage
-            insights_json = json.dumps(calculation_result.get('insights', [])) if isinstance(calculation_result.get('insights', []), list) else calculation_result.get('insights', '[]')
-            
-            calculation = FinancialCalculation.objects.create(
-                user=request.user,
-                query=query,
-                result=calculation_result.get('result', 'No result'),
-                explanation=calculation_result.get('explanation', 'No explanation'),
-                insights=insights_json
-            )
-            
-            # Return the calculation results
-            # Make sure we parse the insights properly
-            insights = []
-            if isinstance(calculation_result.get('insights', []), list):
-                insights = calculation_result.get('insights', [])
-            else:
-                try:
-                    insights = json.loads(calculation_result.get('insights', '[]'))
-                except json.JSONDecodeError:
-                    insights = [calculation_result.get('insights', 'No insights available')]
-            
-            return JsonResponse({
-                'id': calculation.id,
-                'result': calculation.result,
-                'explanation': calculation.explanation,
-                'insights': insights,
-                'created_at': calculation.created_at.strftime('%Y-%m-%d %H:%M')
-            })
+            return JsonResponse(_store_calculation(request.user, query, calculation_result, source))
             
         except Exception as e:
             import traceback
@@ -93,4 +119,52 @@ def calculate(request):
                 'details': str(calculation_result)
             }, status=500)
     
-    return JsonResponse({'error': 'Invalid request method'}, status=405) 
\ No newline at end of file
+    return JsonResponse({'error': 'Invalid request method'}, status=405)
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@login_required
+@rate_limit()
+def calculate_stream(request):
+    """
+    Server-sent events variant of calculate.
+
+    Emits a ``token`` event for every text chunk Gemini streams back, then a
+    single ``result`` event with the parsed and stored calculation (or an
+    ``error`` event if the upstream call or parsing fails). Queries the local
+    formula engine recognises skip Gemini and emit the ``result`` event at once.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=405)
+    
+    query = request.POST.get('query', '')
+    if not query:
+        return JsonResponse({'error': 'No query provided'}, status=400)
+    
+    user = request.user
+    
+    def events():
+        chunks = []
+        try:
+            local_result = _local_calculation(query)
+            if local_result is not None:
+                yield _sse_event('result', _store_calculation(user, query, local_result, 'local'))
+                return
+            for chunk in GeminiService.stream_response(GeminiService.calculator_prompt(query), max_tokens=2048):
+                chunks.append(chunk)
+                yield _sse_event('token', {'text': chunk})
+            calculation_result = GeminiService.parse_calculation(''.join(chunks))
+            yield _sse_event('result', _store_calculation(user, query, calculation_result, 'gemini'))
+        except requests.Timeout:
+            logger.warning("Gemini stream timed out")
+            yield _sse_event('error', {'error': "The calculation took too long, please try again"})
+        except Exception as e:
+            logger.error(f"Error streaming calculation: {str(e)}")
+            yield _sse_event('error', {'error': f"Error processing calculation: {str(e)}"})
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
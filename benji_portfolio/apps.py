@@ -0,0 +1,21 @@
+from django.contrib.staticfiles.apps import StaticFilesConfig
+
+
+class ProjectStaticFilesConfig(StaticFilesConfig):
+    """
+    staticfiles with the vendor sources and tooling files the pages never load
+    left out of collectstatic: SCSS/LESS sources, source maps, and the Font Awesome
+    SVGs, sprites, metadata and JS (the pages only use css/all.min.css and the webfonts).
+    """
+    ignore_patterns = StaticFilesConfig.ignore_patterns + [
+        '*.scss',
+        '*.less',
+        '*.map',
+        'vendor/bootstrap/scss/*',
+        'vendor/fontawesome-free/js/*',
+        'vendor/fontawesome-free/less/*',
+        'vendor/fontawesome-free/metadata/*',
+        'vendor/fontawesome-free/scss/*',
+        'vendor/fontawesome-free/sprites/*',
+        'vendor/fontawesome-free/svgs/*',
+    ]
@@ -0,0 +1,18 @@
+"""
+Settings are split by environment: ``base`` holds everything shared, ``dev``
+adds the debug instrumentation and ``prod`` strips it. DJANGO_ENV picks one
+(``dev`` by default), so DJANGO_SETTINGS_MODULE stays ``benji_portfolio.settings``;
+point it at ``benji_portfolio.settings.prod`` directly to bypass the switch.
+"""
+from .base import env
+
+DJANGO_ENV = env('DJANGO_ENV', default='dev')
+
+if DJANGO_ENV == 'prod':
+    from .prod import *  # noqa: F401,F403
+elif DJANGO_ENV == 'dev':
+    from .dev import *  # noqa: F401,F403
+else:
+    from django.core.exceptions import ImproperlyConfigured
+
+    raise ImproperlyConfigured(f"DJANGO_ENV must be 'dev' or 'prod', not {DJANGO_ENV!r}")
@@ -1,17 +1,19 @@
 # python manage.py create_default_ai_data
 # python manage.py create_default_tax_data
 
+import importlib.util
 import os
 from pathlib import Path
 
 import environ
+from django.core.exceptions import ImproperlyConfigured
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 env = environ.Env()
 # reading .env file
-environ.Env.read_env()
-
-# Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
+environ.Env.read_env(os.path.join(BASE_DIR, 'benji_portfolio', '.env'))
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.1/howto/deployment/checklist/
@@ -21,7 +23,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = '-05sgp9!deq=q1nltm@^^2cc+v29i(tyybv3v2t77qi66czazj'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# DEBUG is set by the dev and prod modules
+DEBUG = False
 
 ALLOWED_HOSTS = ['*']
 
@@ -34,7 +37,8 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.humanize',
     'django.contrib.messages',
-    'django.contrib.staticfiles',
+    # django.contrib.staticfiles, minus the vendor files collectstatic should skip
+    'benji_portfolio.apps.ProjectStaticFilesConfig',
     # apps
     'website',
     'accounts',
@@ -51,7 +55,6 @@ INSTALLED_APPS = [
     'captcha',
     'cloudinary_storage',
     'cloudinary',
-    'debug_toolbar',
 ]
 
 JAZZMIN_SETTINGS = {
@@ -145,6 +148,20 @@ PHONENUMBER_DEFAULT_REGION = "NG"
 
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5 MB
 
+# Gemini API endpoint; set GEMINI_BASE_URL=http://127.0.0.1:8765/v1beta/models to use the fake server
+GEMINI_BASE_URL = env('GEMINI_BASE_URL', default='https://generativelanguage.googleapis.com/v1beta/models')
+
+# Token-bucket limits for the ai_features views (refill_rate is tokens per second)
+AI_RATE_LIMIT_USER = {'capacity': env.int('AI_RATE_LIMIT_USER_CAPACITY', default=10), 'refill_rate': 10 / 60}
+AI_RATE_LIMIT_GLOBAL = {'capacity': env.int('AI_RATE_LIMIT_GLOBAL_CAPACITY', default=120), 'refill_rate': 2}
+
+# Retention for generated AI history, applied by `python manage.py compact_ai_history`
+AI_HISTORY_RETENTION = {
+    'advice': {'max_age_days': 365, 'max_rows': 50},
+    'anomalies': {'max_age_days': 180, 'max_rows': 100},
+    'forecasts': {'max_age_days': 90, 'max_rows': 30},
+}
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -154,8 +171,6 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
-
 ]
 
 
@@ -180,7 +195,7 @@ STORAGES = {
 
 
 STATICFILES_DIRS = os.path.join(BASE_DIR, 'static'),
-STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles_build', 'static')
+STATIC_ROOT = env('STATIC_ROOT', default=os.path.join(BASE_DIR, 'staticfiles_build', 'static'))
 
 
 
@@ -211,14 +226,105 @@ WSGI_APPLICATION = 'benji_portfolio.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
+# DB_ENGINE=postgres selects PostgreSQL from the POSTGRES_* variables (see .env_example);
+# without it the project runs on the bundled SQLite file.
+
+DB_ENGINE = env('DB_ENGINE', default='sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': env('POSTGRES_NAME'),
+            'USER': env('POSTGRES_USER', default='postgres'),
+            'PASSWORD': env('POSTGRES_PASSWORD', default=''),
+            'HOST': env('POSTGRES_HOST', default='127.0.0.1'),
+            'PORT': env('POSTGRES_PORT', default='5432'),
+            # Keep connections open across requests and check them before reuse
+            'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=60),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': env.int('DB_CONNECT_TIMEOUT', default=5),
+                'sslmode': env('POSTGRES_SSLMODE', default='prefer'),
+            },
+        }
+    }
+    # Server-side pool (needs `pip install "psycopg[binary,pool]"`); replaces persistent connections
+    if env.int('DB_POOL_MAX_SIZE', default=0):
+        if not all(importlib.util.find_spec(module) for module in ('psycopg', 'psycopg_pool')):
+            raise ImproperlyConfigured('DB_POOL_MAX_SIZE needs psycopg 3 with its pool extra, which '
+                                       'requirements.txt does not install: pip install "psycopg[binary,pool]"')
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': env.int('DB_POOL_MIN_SIZE', default=2),
+            'max_size': env.int('DB_POOL_MAX_SIZE'),
+            'timeout': env.int('DB_POOL_TIMEOUT', default=10),
+        }
+elif DB_ENGINE == 'sqlite':
+    # Applied to every new connection: WAL lets readers run alongside the single writer,
+    # synchronous=NORMAL is durable in WAL mode, and busy_timeout makes writers wait
+    # for the lock instead of failing with "database is locked"
+    SQLITE_PRAGMAS = {
+        'journal_mode': env('SQLITE_JOURNAL_MODE', default='WAL'),
+        'synchronous': env('SQLITE_SYNCHRONOUS', default='NORMAL'),
+        'busy_timeout': env.int('SQLITE_BUSY_TIMEOUT', default=5000),
+        'cache_size': env.int('SQLITE_CACHE_SIZE', default=-20000),  # negative means KiB, so 20 MB
+        'mmap_size': env.int('SQLITE_MMAP_SIZE', default=128 * 1024 * 1024),
+        'temp_store': 'MEMORY',
+    }
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': env('SQLITE_PATH', default=os.path.join(BASE_DIR, 'db.sqlite3')),
+            'OPTIONS': {
+                'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+                # Take the write lock when a transaction starts, so concurrent writers queue
+                # on busy_timeout rather than deadlocking on a read-to-write upgrade
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"DB_ENGINE must be 'postgres' or 'sqlite', not {DB_ENGINE!r}")
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# CACHE_BACKEND selects local memory (per process, the default), a shared directory
+# (CACHE_LOCATION) or a Redis-compatible server (CACHE_LOCATION=redis://..., needs
+# `pip install redis`). Keys are built with helper.cache.
+
+CACHE_BACKEND = env('CACHE_BACKEND', default='locmem')
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'fintracr'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, '.cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/0'),
+}
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ImproperlyConfigured(f'CACHE_BACKEND must be one of {", ".join(CACHE_BACKENDS)}, not {CACHE_BACKEND!r}')
 
-
-DATABASES = {
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': env('CACHE_LOCATION', default=CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'TIMEOUT': env.int('CACHE_TIMEOUT', default=300),
+        'KEY_PREFIX': env('CACHE_KEY_PREFIX', default='fintracr'),
     }
 }
+# Backs the {% cache %} template tag. Fragment keys include the user's data version
+# (helper.cache), so edits show up without explicit deletes. TEMPLATE_FRAGMENT_CACHE=off
+# renders every fragment, e.g. to measure what the caching saves.
+CACHES['template_fragments'] = CACHES['default'] if env.bool('TEMPLATE_FRAGMENT_CACHE', default=True) else {
+    'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+}
+# Seconds accounts.backends.EmailBackend keeps a signed-in user (with its profile) in the
+# default cache, sparing the user query on every request. Saving the user or profile drops
+# the entry early; 0 loads the user from the database on every request. Only on by default
+# with redis: a locmem entry is only dropped in the process that saved the user, and the
+# file backend would write password hashes to disk, so it is refused there.
+AUTH_USER_CACHE_TIMEOUT = env.int('AUTH_USER_CACHE_TIMEOUT', default=60 if CACHE_BACKEND == 'redis' else 0)
+if AUTH_USER_CACHE_TIMEOUT and CACHE_BACKEND == 'file':
+    raise ImproperlyConfigured('AUTH_USER_CACHE_TIMEOUT would store password hashes in the file cache, '
+                               'set it to 0 or use CACHE_BACKEND=redis')
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -0,0 +1,10 @@
+from .base import *  # noqa: F401,F403
+
+DEBUG = True
+
+INSTALLED_APPS = INSTALLED_APPS + ['debug_toolbar']
+
+MIDDLEWARE = MIDDLEWARE + ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
+# The toolbar only renders for these addresses
+INTERNAL_IPS = ['127.0.0.1']
@@ -0,0 +1,48 @@
+from .base import *  # noqa: F401,F403
+
+# No debug_toolbar and DEBUG off: requests skip the toolbar's SQL and template
+# instrumentation, and cursors stop recording every query in connection.queries
+# (which also grows without bound in long-running commands)
+DEBUG = False
+
+SECRET_KEY = env('SECRET_KEY', default=SECRET_KEY)
+
+ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', default=ALLOWED_HOSTS)
+
+# Cache invalidation (data versions, cached users) and the AI rate limits are only seen
+# by every worker when the cache is shared between them
+if CACHE_BACKEND == 'locmem':
+    raise ImproperlyConfigured('The prod settings need a cache shared by all workers: '
+                               'set CACHE_BACKEND to redis or file')
+
+# Compile each template once per process. Loaders are listed explicitly, so APP_DIRS
+# is turned off, and the debug context processor has nothing to add with DEBUG off.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'context_processors': [
+            processor for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+            if processor != 'django.template.context_processors.debug'
+        ],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+# Content-hashed, pre-compressed static files. WhiteNoise serves the hashed names with
+# far-future immutable Cache-Control and picks the .br/.gz variant the browser accepts.
+# Requires `python manage.py collectstatic` at build time.
+STORAGES = {
+    **STORAGES,
+    'staticfiles': {
+        'BACKEND': 'benji_portfolio.storage.CompressedManifestStorage',
+    },
+}
+# Templates only ever reference the hashed names, so skip the unhashed copies
+WHITENOISE_KEEP_ONLY_HASHED_FILES = True
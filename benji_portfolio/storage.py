@@ -0,0 +1,19 @@
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class CompressedManifestStorage(CompressedManifestStaticFilesStorage):
+    """
+    Hashed, gzip/brotli pre-compressed static files for WhiteNoise.
+
+    Source maps are not collected (see ProjectStaticFilesConfig), so the
+    sourceMappingURL comments in vendor CSS/JS are left as they are instead of
+    failing post-processing on the missing .map files.
+    """
+    patterns = tuple(
+        (extension, tuple(
+            pattern for pattern in patterns
+            if 'sourceMappingURL' not in (pattern[0] if isinstance(pattern, tuple) else pattern)
+        ))
+        for extension, patterns in ManifestStaticFilesStorage.patterns
+    )
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BudgetSectionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'budget_section'
+
+    def ready(self):
+        import budget_section.signals
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from helper.cache import bump_data_version
+from .models import Budget, BudgetTransaction, Category, Transaction
+
+
+@receiver(post_save, sender=Budget)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=BudgetTransaction)
+@receiver(post_delete, sender=Budget)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=BudgetTransaction)
+def invalidate_user_cache(sender, instance, **kwargs):
+    bump_data_version('budget_section', instance.user_id)
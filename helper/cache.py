@@ -0,0 +1,117 @@
+"""
+Shared cache helpers.
+
+Keys are namespaced by app and, for per-user data, by user:
+``<app>:<part>:...`` and ``<app>:user:<user_id>:<part>:...``. Per-user data
+is invalidated by bumping a version counter kept per app and user rather than
+by deleting keys, so every entry built from the old version simply stops being
+read and expires on its own. This works the same on every backend, including
+ones that cannot delete by pattern, but only invalidates across processes when
+the backend is shared (file or redis), which the prod settings require.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.http import HttpResponse
+from django.utils import timezone
+
+
+def make_key(app, *parts):
+    """Key in an app's namespace"""
+    return ':'.join(str(part) for part in (app, *parts))
+
+
+def user_key(app, user_id, *parts):
+    """Key in an app's namespace, scoped to one user"""
+    return make_key(app, 'user', user_id, *parts)
+
+
+def incr(key, delta=1, timeout=None):
+    """
+    Atomically add ``delta`` to a counter, creating it at ``delta``.
+
+    The counter never expires unless ``timeout`` is given; the timeout only
+    applies when this call creates the key.
+    """
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # The key was evicted between add() and incr()
+        cache.set(key, delta, timeout=timeout)
+        return delta
+
+
+def data_version(app, user_id):
+    """
+    Current version of a user's data as seen by an app.
+
+    A missing version (never set, culled, or lost with a cache restart) is
+    seeded from the clock rather than restarting at 1, so entries cached under
+    an earlier version can never become current again.
+    """
+    key = user_key(app, user_id, 'version')
+    version = cache.get(key)
+    if version is None:
+        seed = time.time_ns()
+        version = seed if cache.add(key, seed, timeout=None) else cache.get(key, seed)
+    return version
+
+
+def bump_data_version(app, user_id):
+    """Invalidate everything an app cached for a user under the current version"""
+    key = user_key(app, user_id, 'version')
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # No current version: a fresh seed is newer than any version used before
+        seed = time.time_ns()
+        cache.set(key, seed, timeout=None)
+        return seed
+
+
+def versioned_user_key(app, user_id, *parts):
+    """Per-user key that changes whenever the user's data version is bumped"""
+    return user_key(app, user_id, f'v{data_version(app, user_id)}', *parts)
+
+
+def cache_json_view(app, timeout=DEFAULT_TIMEOUT):
+    """
+    Cache a JSON view's successful GET responses per user.
+
+    Entries are keyed by the view, the query string, today's date (the
+    dashboard endpoints compute up to today) and the user's data version for
+    ``app``, so a call to ``bump_data_version(app, user_id)`` invalidates every
+    decorated view of that app for the user. Responses carry an ``X-Cache``
+    header telling whether they were served from the cache.
+
+    Args:
+        app (str): Namespace whose data version the view depends on
+        timeout (int): Seconds to keep a response, defaults to the cache's TIMEOUT
+    """
+    def decorator(view):
+        view_name = f'{view.__module__}.{view.__qualname__}'
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or not request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            query = hashlib.md5(request.GET.urlencode().encode() + repr((args, kwargs)).encode()).hexdigest()
+            key = versioned_user_key(app, request.user.pk, 'view', view_name,
+                                     timezone.localdate().isoformat(), query)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response['X-Cache'] = 'HIT'
+                return response
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(key, (response.content, response['Content-Type']), timeout=timeout)
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -1,10 +1,32 @@
 from datetime import datetime
 
+from django.utils.functional import SimpleLazyObject
+
+from helper.cache import data_version
+
 
 def add_custom_context(request):
-    return {
-        'app_name': request.resolver_match.app_name,
-        'page_path': request.path,
-        'today': datetime.today(),
-        'user': request.user if request.user.is_authenticated else None
-    }
\ No newline at end of file
+    """
+    Project-wide template context, built once per request.
+
+    Every value that costs anything is lazy, so a render only pays for what its
+    templates use, and the dict is kept on the request so later renders in the
+    same request (includes, render_to_string) reuse it. resolver_match is None
+    when no URL matched, e.g. for 404 and other error pages.
+    """
+    context = getattr(request, '_custom_context', None)
+    if context is None:
+        app_name = request.resolver_match.app_name if request.resolver_match else ''
+        context = request._custom_context = {
+            'app_name': app_name,
+            # Namespaced URL name; keys per-page fragments such as the sidebar, unlike page_path
+            # which differs for every object a detail page shows
+            'view_name': request.resolver_match.view_name if request.resolver_match else '',
+            'page_path': request.path,
+            'today': SimpleLazyObject(datetime.today),
+            # Resolves request.user, whose profile comes in the same query (see EmailBackend.get_user)
+            'user': SimpleLazyObject(lambda: request.user if request.user.is_authenticated else None),
+            # Version of the user's data in the current app, for {% cache %} keys
+            'data_version': SimpleLazyObject(lambda: data_version(app_name, request.user.pk)),
+        }
+    return context
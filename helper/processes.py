@@ -0,0 +1,32 @@
+"""
+Process pools for the CPU-bound parts of management commands.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import connections
+
+
+def process_pool(workers):
+    """
+    Start a process pool whose workers run django.setup().
+
+    Workers must never share this process's database connections, but
+    ProcessPoolExecutor only forks them at the first submit, by when the
+    command has usually queried again. So the connections are closed and every
+    worker is forked here, before the caller's next query reopens them.
+
+    Args:
+        workers (int): Worker processes, None for the CPU count
+
+    Returns:
+        ProcessPoolExecutor: the started pool, or None when ``workers`` is 1 and
+        the work should run inline
+    """
+    if workers == 1:
+        return None
+    connections.close_all()
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+    # The first submit forks all the workers; later ones reuse them
+    executor.submit(int).result()
+    return executor
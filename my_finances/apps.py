@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MyFinancesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'my_finances'
+
+    def ready(self):
+        import my_finances.signals
@@ -0,0 +1,146 @@
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.db.models import Sum
+
+from my_finances.models import Income
+
+User = get_user_model()
+
+# Rollback journal with SQLite's default durability, as before the tuned pragmas
+BASELINE_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+class Command(BaseCommand):
+    help = ('Compares mixed read/write throughput on a scratch SQLite database with the default '
+            'rollback journal and with the tuned pragmas from settings')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent connections')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per mode')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Share of operations that write')
+        parser.add_argument('--users', type=int, default=20, help='Users to spread the rows over')
+        parser.add_argument('--seed-rows', type=int, default=5000, help='Incomes inserted before measuring')
+
+    def handle(self, *args, **options):
+        tuned = getattr(settings, 'SQLITE_PRAGMAS', None)
+        if tuned is None:
+            raise CommandError('SQLITE_PRAGMAS is only defined when DB_ENGINE=sqlite')
+
+        results = []
+        for mode, pragmas in [('rollback journal', BASELINE_PRAGMAS), ('tuned (settings)', tuned)]:
+            directory = tempfile.mkdtemp()
+            alias = f'sqlite_benchmark_{len(results)}'
+            connections.databases[alias] = {
+                **connections.databases['default'],
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(directory, 'benchmark.sqlite3'),
+                'OPTIONS': {
+                    'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in pragmas.items()),
+                    'transaction_mode': 'IMMEDIATE',
+                },
+                'TEST': {},
+            }
+            try:
+                user_ids = self.prepare(alias, options['users'], options['seed_rows'])
+                results.append((mode, self.run(alias, user_ids, options)))
+            finally:
+                connections[alias].close()
+                del connections.databases[alias]
+                shutil.rmtree(directory, ignore_errors=True)
+
+        self.report(results, options['duration'])
+
+    @staticmethod
+    def prepare(alias, users, seed_rows):
+        """Create the tables the workload touches and seed them; bulk_create skips signals"""
+        with connections[alias].schema_editor() as editor:
+            editor.create_model(User)
+            editor.create_model(Income)
+        created = User.objects.using(alias).bulk_create([
+            User(email=f'bench{i}@example.com', username=f'bench{i}', first_name=f'Bench{i}', last_name=f'User{i}')
+            for i in range(users)
+        ])
+        user_ids = [user.pk for user in created]
+        start = date.today() - timedelta(days=365)
+        rng = random.Random(0)
+        Income.objects.using(alias).bulk_create([
+            Income(user_id=rng.choice(user_ids), value=Decimal(rng.randint(100, 100000)),
+                   date=start + timedelta(days=rng.randint(0, 365)), type=Income.ITypes.SAL)
+            for _ in range(seed_rows)
+        ], batch_size=1000)
+        connections[alias].close()
+        return user_ids
+
+    @staticmethod
+    def run(alias, user_ids, options):
+        deadline = time.perf_counter() + options['duration']
+        reads, writes, errors = [], [], [0]
+        lock = threading.Lock()
+        month_start = date.today().replace(day=1)
+
+        def worker(seed):
+            rng = random.Random(seed)
+            local_reads, local_writes, local_errors = [], [], 0
+            incomes = Income.objects.using(alias)
+            try:
+                while time.perf_counter() < deadline:
+                    user_id = rng.choice(user_ids)
+                    started = time.perf_counter()
+                    try:
+                        if rng.random() < options['write_ratio']:
+                            with transaction.atomic(using=alias):
+                                incomes.bulk_create([Income(user_id=user_id, value=Decimal(rng.randint(100, 5000)),
+                                                            date=date.today(), type=Income.ITypes.OTH)])
+                            local_writes.append(time.perf_counter() - started)
+                        else:
+                            # What a dashboard render reads: month total plus the latest rows
+                            incomes.filter(user_id=user_id, date__gte=month_start).aggregate(total=Sum('value'))
+                            list(incomes.filter(user_id=user_id).order_by('-date')[:20])
+                            local_reads.append(time.perf_counter() - started)
+                    except OperationalError:
+                        local_errors += 1
+            finally:
+                connections[alias].close()
+            with lock:
+                reads.extend(local_reads)
+                writes.extend(local_writes)
+                errors[0] += local_errors
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return reads, writes, errors[0]
+
+    def report(self, results, duration):
+        def percentiles(values):
+            if not values:
+                return '-'
+            p50, p95 = np.percentile(np.array(values) * 1000, [50, 95])
+            return f'{p50:.1f}/{p95:.1f}'
+
+        self.stdout.write(f"{'mode':<18} {'ops/s':>8} {'reads/s':>8} {'writes/s':>9} "
+                          f"{'read p50/p95 ms':>16} {'write p50/p95 ms':>17} {'errors':>7}")
+        throughput = []
+        for mode, (reads, writes, errors) in results:
+            throughput.append((len(reads) + len(writes)) / duration)
+            self.stdout.write(f'{mode:<18} {throughput[-1]:>8.0f} {len(reads) / duration:>8.0f} '
+                              f'{len(writes) / duration:>9.0f} {percentiles(reads):>16} '
+                              f'{percentiles(writes):>17} {errors:>7}')
+        if throughput[0]:
+            self.stdout.write(self.style.SUCCESS(
+                f'Tuned pragmas: {throughput[1] / throughput[0]:.1f}x the throughput of the rollback journal'
+            ))
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from helper.cache import bump_data_version
+from .models import Balance, Income, Outcome
+
+
+@receiver(post_save, sender=Income)
+@receiver(post_save, sender=Outcome)
+@receiver(post_save, sender=Balance)
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Outcome)
+@receiver(post_delete, sender=Balance)
+def invalidate_user_cache(sender, instance, **kwargs):
+    bump_data_version('my_finances', instance.user_id)
@@ -1,7 +1,13 @@
+from datetime import timedelta
 from decimal import Decimal
+from unittest import skipUnless
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from helper.cache import bump_data_version, user_key
 from .models import Income, Outcome, Balance
 
 
@@ -137,4 +143,65 @@ class ModelTestCase(TestCase):
         self.assertTrue(isinstance(self.balance, Balance))
         self.assertEqual(self.balance.value, 5000.00)
         self.assertEqual(self.balance.type, Balance.BType.CUR)
-        self.assertEqual(self.balance.comment, "Test Balance")
\ No newline at end of file
+        self.assertEqual(self.balance.comment, "Test Balance")
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite pragmas only apply to the sqlite profile')
+class SqlitePragmasTest(TestCase):
+    def test_connection_init_applies_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+
+class CachedJsonViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='cached@example.com', password='testpass123',
+                                                     first_name='Cached', last_name='User')
+        Balance.objects.create(user=self.user, value=Decimal('1000.00'),
+                               date=timezone.localdate() - timedelta(days=5), type=Balance.BType.CUR)
+        self.client.force_login(self.user)
+        self.url = reverse('my_finances:get_summary_tiles')
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.json(), second.json())
+
+    def test_income_change_invalidates_cached_response(self):
+        self.client.get(self.url)
+        Income.objects.create(user=self.user, value=Decimal('250.00'), date=timezone.localdate(),
+                              type=Income.ITypes.SAL)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(Decimal(response.json()['total_income']), Decimal('250.00'))
+
+    def test_lost_version_never_revives_old_entries(self):
+        self.client.get(self.url)
+        # e.g. culled by LocMemCache or lost with a cache server restart
+        cache.delete(user_key('my_finances', self.user.pk, 'version'))
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+        cache.delete(user_key('my_finances', self.user.pk, 'version'))
+        bump_data_version('my_finances', self.user.pk)
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+
+    def test_cache_is_per_user(self):
+        self.client.get(self.url)
+        other = get_user_model().objects.create_user(email='other@example.com', password='testpass123',
+                                                 first_name='Other', last_name='Person')
+        self.client.force_login(other)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('error', response.json())
+
+    def test_income_list_fragment_follows_data_version(self):
+        url = reverse('my_finances:income_list')
+        self.client.get(url)
+        Income.objects.create(user=self.user, value=Decimal('75.00'), date=timezone.localdate(),
+                              type=Income.ITypes.SAL, comment='Freshly added')
+        self.assertContains(self.client.get(url), 'Freshly added')
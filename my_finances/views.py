@@ -12,6 +12,7 @@ from django.views.generic.detail import DetailView
 from django.views.generic.edit import CreateView, DeleteView, UpdateView
 from django.views.generic.list import ListView
 
+from helper.cache import cache_json_view
 from my_finances.forms import IncomeForm, OutcomeForm, BalanceForm
 from my_finances.helpers import calculate_repetitive_total
 from my_finances.models import Income, Outcome, Balance
@@ -275,6 +276,7 @@ def year_overview(request):
 
 
 @login_required
+@cache_json_view('my_finances')
 def get_summary_tiles(request):
     today = date.today()
     last_balance = Balance.objects.filter(user=request.user, type=1).order_by('-date').first()
@@ -308,6 +310,7 @@ def get_summary_tiles(request):
 
 
 @login_required
+@cache_json_view('my_finances')
 def get_year_chart(request):
     balance_type = request.GET.get('balance_type')
     if balance_type not in ['current', 'savings']:
@@ -405,6 +408,7 @@ def get_year_chart(request):
 
 
 @login_required()
+@cache_json_view('my_finances')
 def get_income_or_outcome_by_type(request):
     get_what = request.GET.get('get_what')
     summary_type = request.GET.get('summary_type')
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SavingsSectionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'savings_section'
+
+    def ready(self):
+        import savings_section.signals
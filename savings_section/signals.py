@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from helper.cache import bump_data_version
+from .models import Deposit, SavingsAccount, SavingsGoal, Withdrawal
+
+
+@receiver(post_save, sender=SavingsAccount)
+@receiver(post_save, sender=Deposit)
+@receiver(post_save, sender=Withdrawal)
+@receiver(post_save, sender=SavingsGoal)
+@receiver(post_delete, sender=SavingsAccount)
+@receiver(post_delete, sender=Deposit)
+@receiver(post_delete, sender=Withdrawal)
+@receiver(post_delete, sender=SavingsGoal)
+def invalidate_user_cache(sender, instance, **kwargs):
+    bump_data_version('savings_section', instance.user_id)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class TaxManagementConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tax_management'
+
+    def ready(self):
+        import tax_management.signals
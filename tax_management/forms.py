@@ -4,10 +4,11 @@ from .models import TaxProfile, TaxableIncome, TaxDeduction
 class TaxProfileForm(forms.ModelForm):
     class Meta:
         model = TaxProfile
-        fields = ['tax_id', 'filing_status']
+        fields = ['tax_id', 'filing_status', 'regime']
         widgets = {
             'tax_id': forms.TextInput(attrs={'class': 'form-control'}),
             'filing_status': forms.Select(attrs={'class': 'form-control'}),
+            'regime': forms.Select(attrs={'class': 'form-control'}),
         }
 
 class TaxableIncomeForm(forms.ModelForm):
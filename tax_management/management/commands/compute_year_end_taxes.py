@@ -0,0 +1,117 @@
+import os
+import time
+from collections import deque
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from helper.processes import process_pool
+from tax_management.models import TaxBatchCheckpoint, TaxDeduction, TaxableIncome
+from tax_management.services import TaxCalculationService
+
+
+def evaluate_chunk(job):
+    """
+    Worker entry point: run the slab engine over one chunk of aggregates, no DB access.
+
+    Returns the last user id of the chunk, the results whose input fingerprint
+    differs from the stored one and the number of unchanged users.
+    """
+    year, rows = job
+    changed = []
+    for user_id, total_income, total_deductions, filing_status, regime, stored_fingerprint in rows:
+        result = TaxCalculationService.evaluate(year, total_income, total_deductions, filing_status, regime)
+        if result['input_fingerprint'] != stored_fingerprint:
+            changed.append((user_id, result))
+    return rows[-1][0], changed, len(rows) - len(changed)
+
+
+class Command(BaseCommand):
+    help = 'Computes the year-end TaxCalculation of every user with income or deductions in a tax year'
+
+    def add_arguments(self, parser):
+        parser.add_argument('year', type=int, help='Tax year (financial year start)')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Users evaluated and saved per chunk')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes (default: CPU count, 1 runs inline)')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore the saved checkpoint and start from the first user')
+
+    def handle(self, *args, **options):
+        year = options['year']
+        chunk_size = options['chunk_size']
+        workers = options['workers']
+        started = time.perf_counter()
+
+        checkpoint, _ = TaxBatchCheckpoint.objects.get_or_create(year=year)
+        if options['restart']:
+            checkpoint.last_user_id = 0
+            checkpoint.completed_at = None
+            checkpoint.save()
+        elif checkpoint.completed_at:
+            self.stdout.write(f'Tax year {year} was already completed at {checkpoint.completed_at}; '
+                              f'use --restart to recompute it')
+            return
+        elif checkpoint.last_user_id:
+            self.stdout.write(f'Resuming tax year {year} after user {checkpoint.last_user_id}')
+
+        has_data = Q(Exists(TaxableIncome.objects.filter(user=OuterRef('pk'), year=year))) | \
+            Q(Exists(TaxDeduction.objects.filter(user=OuterRef('pk'), year=year)))
+        rows = TaxCalculationService.inputs_queryset(year).filter(
+            has_data, pk__gt=checkpoint.last_user_id
+        ).annotate(
+            stored_fingerprint=TaxCalculationService.stored_fingerprint(year),
+        ).order_by('pk').values_list(
+            'pk', 'total_income', 'total_deductions', 'filing_status', 'regime', 'stored_fingerprint'
+        )
+
+        executor = process_pool(workers)
+
+        stored = unchanged = 0
+        try:
+            # Keep a bounded number of chunks in flight and save them in order,
+            # so the checkpoint only ever moves past fully stored users
+            pending = deque()
+            max_pending = 2 * (workers or os.cpu_count() or 1) if executor is not None else 1
+            chunk = []
+            for row in rows.iterator(chunk_size=chunk_size):
+                chunk.append(row)
+                if len(chunk) == chunk_size:
+                    pending.append(self.submit(executor, year, chunk))
+                    chunk = []
+                    if len(pending) >= max_pending:
+                        counts = self.save_chunk(checkpoint, pending.popleft())
+                        stored, unchanged = stored + counts[0], unchanged + counts[1]
+            if chunk:
+                pending.append(self.submit(executor, year, chunk))
+            while pending:
+                counts = self.save_chunk(checkpoint, pending.popleft())
+                stored, unchanged = stored + counts[0], unchanged + counts[1]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        checkpoint.completed_at = timezone.now()
+        checkpoint.save(update_fields=['completed_at', 'updated_at'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Tax year {year}: {stored} calculations stored, {unchanged} unchanged in {elapsed:.2f}s'
+        ))
+
+    @staticmethod
+    def submit(executor, year, chunk):
+        if executor is None:
+            return evaluate_chunk((year, chunk))
+        return executor.submit(evaluate_chunk, (year, chunk))
+
+    @staticmethod
+    def save_chunk(checkpoint, pending):
+        last_user_id, changed, unchanged = pending if isinstance(pending, tuple) else pending.result()
+        with transaction.atomic():
+            TaxCalculationService.upsert_calculations(checkpoint.year, changed)
+            checkpoint.last_user_id = last_user_id
+            checkpoint.save(update_fields=['last_user_id', 'updated_at'])
+        return len(changed), unchanged
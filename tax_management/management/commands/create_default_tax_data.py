@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
-from tax_management.models import TaxProfile, TaxableIncome, TaxDeduction, TaxCalculation
+from tax_management.models import TaxProfile, TaxableIncome, TaxDeduction
+from tax_management.services import TaxCalculationService
 from decimal import Decimal
 from datetime import datetime
 
@@ -86,16 +87,9 @@ class Command(BaseCommand):
             # Create tax calculation
             total_income = sum(income['amount'] for income in default_incomes)
             total_deductions = sum(deduction['amount'] for deduction in default_deductions)
-            taxable_income = total_income - total_deductions
-            tax_liability = taxable_income * Decimal('0.22')  # Simple 22% tax rate
+            result = TaxCalculationService.evaluate(2024, total_income, total_deductions,
+                                                    filing_status=default_profiles[0]['filing_status'])
 
-            TaxCalculation.objects.get_or_create(
-                user=user,
-                year=2024,
-                total_income=total_income,
-                total_deductions=total_deductions,
-                taxable_income=taxable_income,
-                tax_liability=tax_liability
-            )
+            TaxCalculationService.upsert_calculations(2024, [(user.pk, result)])
 
         self.stdout.write(self.style.SUCCESS('Successfully created default tax data')) 
\ No newline at end of file
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from my_finances.models import Income
+from tax_management.models import TaxableIncome
+from tax_management.services import TaxableIncomeSyncService
+
+
+class Command(BaseCommand):
+    help = ('Rebuilds the TaxableIncome totals derived from my_finances incomes; run it once to '
+            'backfill and at the start of each financial year to extend open-ended recurring incomes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, action='append', dest='years',
+                            help='Financial year to rebuild (repeatable, default: every year with income)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        user_ids = set(Income.objects.values_list('user_id', flat=True).distinct())
+        user_ids |= set(TaxableIncome.objects.filter(source=TaxableIncomeSyncService.SOURCE)
+                        .values_list('user_id', flat=True).distinct())
+        for user_id in sorted(user_ids):
+            TaxableIncomeSyncService.sync_user(user_id, options['years'])
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Synced taxable income for {len(user_ids)} users in {elapsed:.2f}s'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 17:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tax_management', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taxprofile',
+            name='regime',
+            field=models.CharField(choices=[('NEW', 'New Regime'), ('OLD', 'Old Regime')], default='NEW', max_length=10),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-19 17:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tax_management', '0003_taxbatchcheckpoint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taxableincome',
+            name='source',
+            field=models.CharField(choices=[('MANUAL', 'Manual Entry'), ('FINANCES', 'My Finances')], default='MANUAL', max_length=10),
+        ),
+        migrations.AddConstraint(
+            model_name='taxableincome',
+            constraint=models.UniqueConstraint(condition=models.Q(('source', 'FINANCES')), fields=('user', 'year', 'income_type'), name='unique_synced_taxable_income'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-19 18:01
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def drop_duplicate_calculations(apps, schema_editor):
+    """Keep only the newest calculation per (user, year) before adding the unique constraint"""
+    TaxCalculation = apps.get_model('tax_management', 'TaxCalculation')
+    newest = TaxCalculation.objects.values('user', 'year').annotate(newest_id=Max('id')).values('newest_id')
+    TaxCalculation.objects.exclude(id__in=newest).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tax_management', '0004_taxableincome_source'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taxcalculation',
+            name='input_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='taxcalculation',
+            name='calculated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='taxcalculation',
+            index=models.Index(fields=['user', '-year'], name='taxcalc_user_year_idx'),
+        ),
+        migrations.RunPython(drop_duplicate_calculations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='taxcalculation',
+            constraint=models.UniqueConstraint(fields=('user', 'year'), name='unique_tax_calculation_per_year'),
+        ),
+    ]
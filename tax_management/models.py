@@ -1,6 +1,8 @@
 from django.db import models
 from django.conf import settings
 
+from .slabs import REGIMES
+
 class TaxProfile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     tax_id = models.CharField(max_length=50, blank=True)
@@ -10,6 +12,7 @@ class TaxProfile(models.Model):
         ('MARRIED_SEPARATE', 'Married Filing Separately'),
         ('HEAD_HOUSEHOLD', 'Head of Household')
     ])
+    regime = models.CharField(max_length=10, choices=REGIMES, default='NEW')
     
 class TaxableIncome(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -21,6 +24,20 @@ class TaxableIncome(models.Model):
         ('OTHER', 'Other Income')
     ])
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # FINANCES rows are per-(user, year, type) totals maintained from my_finances.Income
+    source = models.CharField(max_length=10, choices=[
+        ('MANUAL', 'Manual Entry'),
+        ('FINANCES', 'My Finances')
+    ], default='MANUAL')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'year', 'income_type'],
+                condition=models.Q(source='FINANCES'),
+                name='unique_synced_taxable_income'
+            ),
+        ]
     
 class TaxDeduction(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -41,4 +58,24 @@ class TaxCalculation(models.Model):
     total_deductions = models.DecimalField(max_digits=10, decimal_places=2)
     taxable_income = models.DecimalField(max_digits=10, decimal_places=2)
     tax_liability = models.DecimalField(max_digits=10, decimal_places=2)
-    calculated_at = models.DateTimeField(auto_now_add=True) 
\ No newline at end of file
+    # Digest of the inputs the result was computed from; see TaxCalculationService.fingerprint
+    input_fingerprint = models.CharField(max_length=64, blank=True, default='')
+    calculated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'year'], name='unique_tax_calculation_per_year'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-year'], name='taxcalc_user_year_idx'),
+        ] 
+
+class TaxBatchCheckpoint(models.Model):
+    """Progress of the year-end batch computation, so an interrupted run can resume."""
+    year = models.IntegerField(unique=True)
+    last_user_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Tax year {self.year} batch up to user {self.last_user_id}"
@@ -1,31 +1,430 @@
+import calendar
+import hashlib
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
-from django.db.models import Sum
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DecimalField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from helper.cache import bump_data_version, data_version, versioned_user_key
 from .models import TaxProfile, TaxableIncome, TaxDeduction, TaxCalculation
+from .slabs import REGIMES, get_slab_table
 from django.contrib.auth import get_user_model
+from my_finances.models import Income
 
 User = get_user_model()
 
 class TaxCalculationService:
+    """
+    Table-driven income tax engine.
+
+    A user's income and deduction totals for a year, with their filing status
+    and regime, are read in one grouped query and run through the slab table
+    in force for that year. Results are stored as one TaxCalculation per user
+    and year together with a fingerprint of their inputs, and only recomputed
+    when the fingerprint changes. The per-user data version, bumped whenever a
+    TaxableIncome, TaxDeduction or TaxProfile of theirs changes, keeps the
+    cached dashboard fragments in step.
+    """
+    DEFAULT_FILING_STATUS = 'SINGLE'
+    DEFAULT_REGIME = 'NEW'
+    # Bump when the calculation itself changes so stored results are recomputed
+    ENGINE_VERSION = 1
+
+    @staticmethod
+    def input_version(user_id):
+        return data_version('tax_management', user_id)
+
+    @staticmethod
+    def invalidate(user_id):
+        """Bump the user's input version so memoized results are recomputed"""
+        bump_data_version('tax_management', user_id)
+
+    @staticmethod
+    def inputs_queryset(year, income_sources=None):
+        """
+        Users annotated with their income and deduction totals, filing status
+        and regime for a year, as one grouped query
+
+        Args:
+            year (int): Tax year
+            income_sources (list): Only count TaxableIncome rows from these sources
+        """
+        zero = Value(Decimal('0.00'), output_field=DecimalField(max_digits=10, decimal_places=2))
+
+        def year_total(model, **filters):
+            return Coalesce(Subquery(
+                model.objects.filter(user=OuterRef('pk'), year=year, **filters)
+                .values('user').annotate(total=Sum('amount')).values('total')
+            ), zero)
+
+        income_filters = {'source__in': income_sources} if income_sources is not None else {}
+        profile = TaxProfile.objects.filter(user=OuterRef('pk'))
+        return User.objects.annotate(
+            total_income=year_total(TaxableIncome, **income_filters),
+            total_deductions=year_total(TaxDeduction),
+            filing_status=Subquery(profile.values('filing_status')[:1]),
+            regime=Subquery(profile.values('regime')[:1]),
+        )
+
+    @classmethod
+    def get_inputs(cls, user_id, year, income_sources=None):
+        """
+        Income and deduction totals, filing status and regime in one query
+
+        Returns:
+            dict: total_income, total_deductions, filing_status and regime
+        """
+        return cls.inputs_queryset(year, income_sources).filter(pk=user_id).values(
+            'total_income', 'total_deductions', 'filing_status', 'regime'
+        ).get()
+
+    @classmethod
+    def evaluate(cls, year, total_income, total_deductions, filing_status=None, regime=None):
+        """
+        Apply the slab table in force for the year to income less deductions
+
+        Returns:
+            dict: the inputs, taxable_income, the table used and the tax breakdown
+        """
+        filing_status = filing_status or cls.DEFAULT_FILING_STATUS
+        regime = regime or cls.DEFAULT_REGIME
+        table = get_slab_table(year, regime, filing_status)
+        taxable_income = max(total_income - total_deductions, Decimal('0.00'))
+        return {
+            'input_fingerprint': cls.fingerprint(year, total_income, total_deductions, filing_status, regime),
+            'year': year,
+            'filing_status': filing_status,
+            'regime': regime,
+            'table_version': table.version,
+            'total_income': total_income,
+            'total_deductions': total_deductions,
+            'taxable_income': taxable_income,
+            **table.compute(taxable_income),
+        }
+
+    @classmethod
+    def fingerprint(cls, year, total_income, total_deductions, filing_status=None, regime=None):
+        """
+        Digest of everything a stored result depends on: the input totals, the
+        filing status and regime, the slab table version and the engine version
+        """
+        filing_status = filing_status or cls.DEFAULT_FILING_STATUS
+        regime = regime or cls.DEFAULT_REGIME
+        table = get_slab_table(year, regime, filing_status)
+        key = '|'.join(str(part) for part in (
+            cls.ENGINE_VERSION, year, Decimal(total_income).quantize(Decimal('0.01')),
+            Decimal(total_deductions).quantize(Decimal('0.01')), filing_status, regime,
+            table.version, table.filing_status,
+        ))
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def upsert_calculations(cls, year, results):
+        """
+        Store one TaxCalculation per user for the year, overwriting any earlier result.
+        bulk_create sends no signals, so the users' cached dashboard fragments are
+        invalidated here.
+
+        Args:
+            year (int): Tax year
+            results (list): (user_id, result) pairs from evaluate()
+        """
+        TaxCalculation.objects.bulk_create(
+            [
+                TaxCalculation(
+                    user_id=user_id,
+                    year=year,
+                    total_income=result['total_income'],
+                    total_deductions=result['total_deductions'],
+                    taxable_income=result['taxable_income'],
+                    tax_liability=result['tax_liability'],
+                    input_fingerprint=result['input_fingerprint'],
+                ) for user_id, result in results
+            ],
+            update_conflicts=True,
+            unique_fields=['user', 'year'],
+            update_fields=['total_income', 'total_deductions', 'taxable_income', 'tax_liability',
+                           'input_fingerprint', 'calculated_at'],
+            batch_size=500
+        )
+        for user_id, _ in results:
+            cls.invalidate(user_id)
+
+    @staticmethod
+    def stored_fingerprint(year):
+        """Annotation with the fingerprint of the user's stored calculation for the year"""
+        return Subquery(
+            TaxCalculation.objects.filter(user=OuterRef('pk'), year=year).values('input_fingerprint')[:1]
+        )
+
+    @classmethod
+    def calculate_tax_liability(cls, user, year):
+        """
+        Return the stored calculation for the year, recomputing and upserting it
+        only when the fingerprint of its inputs has changed
+        """
+        inputs = cls.inputs_queryset(year).filter(pk=user.pk).annotate(
+            stored_fingerprint=cls.stored_fingerprint(year),
+        ).values('total_income', 'total_deductions', 'filing_status', 'regime', 'stored_fingerprint').get()
+        stored_fingerprint = inputs.pop('stored_fingerprint')
+        if stored_fingerprint != cls.fingerprint(year, **inputs):
+            cls.upsert_calculations(year, [(user.pk, cls.evaluate(year, **inputs))])
+        return TaxCalculation.objects.get(user=user, year=year)
+
+class TaxScenarioService:
+    """
+    What-if comparison of regimes and deduction mixes.
+
+    All scenarios are evaluated at once against each regime's slab table with
+    array operations, and nothing is written to the database. A scenario's
+    deductions are either one amount for every regime or a mapping of regime
+    to amount, since most deductions only apply under the old regime.
+    """
+    MAX_SCENARIOS = 1000
+
+    @staticmethod
+    def _deductions_for(scenario, regime):
+        deductions = scenario.get('deductions', 0)
+        if isinstance(deductions, dict):
+            deductions = deductions.get(regime, 0)
+        return float(deductions)
+
+    @classmethod
+    def evaluate_scenarios(cls, year, scenarios, filing_status=None, regimes=None):
+        """
+        Evaluate income/deduction variants under each regime
+
+        Args:
+            year (int): Financial year the slab tables are chosen for
+            scenarios (list): dicts with 'income', 'deductions' and an optional 'label'
+            filing_status (str): Filing status, defaults to SINGLE
+            regimes (list): Regime codes to compare, defaults to all of them
+
+        Returns:
+            dict: per-scenario breakdown by regime and the optimal choice, the
+            scenario and regime with the lowest tax. Scenarios are only ranked
+            against each other when they share the same income, since a higher
+            income always leaves more after tax; otherwise 'optimal' is None and
+            each scenario's best_regime is the comparison to use.
+        """
+        if not scenarios:
+            raise ValueError('At least one scenario is required')
+        if len(scenarios) > cls.MAX_SCENARIOS:
+            raise ValueError(f'At most {cls.MAX_SCENARIOS} scenarios can be evaluated at once')
+        filing_status = filing_status or TaxCalculationService.DEFAULT_FILING_STATUS
+        regimes = regimes or [code for code, _ in REGIMES]
+        unknown = set(regimes) - {code for code, _ in REGIMES}
+        if unknown:
+            raise ValueError(f'Unknown regimes: {", ".join(sorted(unknown))}')
+
+        incomes = np.array([float(scenario['income']) for scenario in scenarios])
+        if not np.isfinite(incomes).all():
+            raise ValueError('Income must be a finite number')
+        if (incomes < 0).any():
+            raise ValueError('Income cannot be negative')
+        deductions_by_regime = {
+            regime: np.array([cls._deductions_for(scenario, regime) for scenario in scenarios])
+            for regime in regimes
+        }
+        for deductions in deductions_by_regime.values():
+            if not np.isfinite(deductions).all():
+                raise ValueError('Deductions must be a finite number')
+            if (deductions < 0).any():
+                raise ValueError('Deductions cannot be negative')
+
+        # One row per regime, one column per scenario
+        breakdowns = {}
+        for regime, deductions in deductions_by_regime.items():
+            taxable = np.maximum(incomes - deductions, 0)
+            result = get_slab_table(year, regime, filing_status).compute_many(taxable)
+            breakdowns[regime] = {'deductions': deductions, 'taxable_income': taxable, **result}
+        liability = np.vstack([breakdowns[regime]['tax_liability'] for regime in regimes])
+        take_home = incomes - liability
+
+        best_regime = liability.argmin(axis=0)
+
+        results = []
+        for i, scenario in enumerate(scenarios):
+            results.append({
+                'label': scenario.get('label', f'Scenario {i + 1}'),
+                'income': incomes[i].item(),
+                'best_regime': regimes[best_regime[i]],
+                'regimes': {
+                    regime: {
+                        key: values[i].item() for key, values in breakdowns[regime].items()
+                    } for regime in regimes
+                },
+            })
+        optimal = None
+        if (incomes == incomes[0]).all():
+            regime_index, scenario_index = np.unravel_index(liability.argmin(), liability.shape)
+            optimal = {
+                'scenario': int(scenario_index),
+                'label': results[scenario_index]['label'],
+                'regime': regimes[regime_index],
+                'tax_liability': liability[regime_index, scenario_index].item(),
+                'take_home': take_home[regime_index, scenario_index].item(),
+            }
+        return {
+            'year': year,
+            'filing_status': filing_status,
+            'scenarios': results,
+            'optimal': optimal,
+        }
+
+class TaxableIncomeSyncService:
+    """
+    Keeps TaxableIncome in step with my_finances.Income.
+
+    Incomes are mapped to tax income types and, when recurring, expanded into
+    their occurrences within each financial year (April to March). The result
+    is stored as one FINANCES-sourced TaxableIncome row per (user, year, type),
+    which the tax engine sums together with manual entries. Saving or deleting
+    an Income recomputes only the years it touches; open-ended recurring
+    incomes are projected to the end of the current financial year.
+    """
+    INCOME_TYPE_MAP = {
+        Income.ITypes.SAL: 'SALARY',
+        Income.ITypes.BON: 'SALARY',
+        Income.ITypes.GIF: 'OTHER',
+        Income.ITypes.OTH: 'OTHER',
+        # Money moved out of savings is not income
+    }
+    SOURCE = 'FINANCES'
+
     @staticmethod
-    def calculate_tax_liability(user, year):
-        # Sample calculation for demonstration
-        total_income = Decimal('60000.00')  # Sample income
-        total_deductions = Decimal('12000.00')  # Sample deductions
-        taxable_income = total_income - total_deductions
-
-        # Simple tax calculation (22% flat rate for demonstration)
-        tax_liability = taxable_income * Decimal('0.22')
-
-        return TaxCalculation.objects.create(
-            user=user,
-            year=year,
-            total_income=total_income,
-            total_deductions=total_deductions,
-            taxable_income=taxable_income,
-            tax_liability=tax_liability
+    def financial_year(day):
+        return day.year if day.month >= 4 else day.year - 1
+
+    @staticmethod
+    def year_bounds(year):
+        return date(year, 4, 1), date(year + 1, 3, 31)
+
+    @classmethod
+    def horizon(cls):
+        """Last day open-ended recurring incomes are expanded to"""
+        return cls.year_bounds(cls.financial_year(timezone.localdate()))[1]
+
+    @staticmethod
+    def _add_months(day, months):
+        y, m = divmod(day.month - 1 + months, 12)
+        year, month = day.year + y, m + 1
+        return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+    @classmethod
+    def occurrences(cls, income, until):
+        """Dates an income is received on, up to and including ``until``"""
+        step = income.repetition_time
+        if not income.repetitive or income.repetition_interval == Income.RInterval.NA or step <= 0:
+            if income.date <= until:
+                yield income.date
+            return
+        if income.repetition_end:
+            until = min(until, income.repetition_end)
+        # Step from the first date each time so month-end dates do not drift
+        n = 0
+        while True:
+            if income.repetition_interval == Income.RInterval.DAY:
+                day = income.date + timedelta(days=n * step)
+            elif income.repetition_interval == Income.RInterval.WEK:
+                day = income.date + timedelta(weeks=n * step)
+            elif income.repetition_interval == Income.RInterval.MON:
+                day = cls._add_months(income.date, n * step)
+            else:
+                day = cls._add_months(income.date, n * step * 12)
+            if day > until:
+                return
+            yield day
+            n += 1
+
+    @classmethod
+    def contributions(cls, income, horizon=None):
+        """
+        Amount an income adds to each financial year
+
+        Returns:
+            dict: {(year, income_type): Decimal}
+        """
+        income_type = cls.INCOME_TYPE_MAP.get(income.type)
+        totals = defaultdict(Decimal)
+        if income_type is None:
+            return totals
+        # Instances passed to signals still hold whatever they were created with (floats, strings)
+        for field in ('value', 'date', 'repetition_end'):
+            setattr(income, field, Income._meta.get_field(field).to_python(getattr(income, field)))
+        for day in cls.occurrences(income, horizon or cls.horizon()):
+            totals[(cls.financial_year(day), income_type)] += income.value
+        return totals
+
+    @classmethod
+    def taxable_incomes(cls, user_id, start, end):
+        """Incomes of a taxable type with at least one possible occurrence between two dates"""
+        return Income.objects.filter(
+            Q(repetitive=False, date__gte=start) |
+            Q(repetitive=True) & (Q(repetition_end__isnull=True) | Q(repetition_end__gte=start)),
+            user_id=user_id, type__in=list(cls.INCOME_TYPE_MAP), date__lte=end,
         )
 
+    @classmethod
+    def recompute(cls, user_id, years):
+        """Rebuild the synced TaxableIncome rows of a user for the given years"""
+        years = set(years)
+        if not years:
+            return
+        start, end = cls.year_bounds(min(years))[0], cls.year_bounds(max(years))[1]
+        horizon = cls.horizon()
+        totals = defaultdict(Decimal)
+        for income in cls.taxable_incomes(user_id, start, end).iterator():
+            for (year, income_type), amount in cls.contributions(income, horizon).items():
+                if year in years:
+                    totals[(year, income_type)] += amount
+
+        with transaction.atomic():
+            existing = {
+                (row.year, row.income_type): row
+                for row in TaxableIncome.objects.select_for_update().filter(
+                    user_id=user_id, year__in=years, source=cls.SOURCE
+                )
+            }
+            for key, row in existing.items():
+                if key not in totals:
+                    row.delete()
+                elif row.amount != totals[key]:
+                    row.amount = totals[key]
+                    row.save(update_fields=['amount'])
+            for (year, income_type), amount in totals.items():
+                if (year, income_type) not in existing:
+                    TaxableIncome.objects.create(user_id=user_id, year=year, income_type=income_type,
+                                                 amount=amount, source=cls.SOURCE)
+
+    @classmethod
+    def sync_user(cls, user_id, years=None):
+        """Rebuild a user's synced rows for the given years, or every year they have income in"""
+        if years is None:
+            horizon = cls.horizon()
+            years = set()
+            for income in Income.objects.filter(user_id=user_id, type__in=list(cls.INCOME_TYPE_MAP)).iterator():
+                years.update(year for year, _ in cls.contributions(income, horizon))
+            years.update(TaxableIncome.objects.filter(user_id=user_id, source=cls.SOURCE)
+                         .values_list('year', flat=True))
+        cls.recompute(user_id, years)
+
 class TaxPlanningService:
+    # Advance tax due dates within the financial year and the cumulative share of
+    # the year's liability payable by each
+    ADVANCE_TAX_SCHEDULE = [
+        ((6, 15), Decimal('0.15')),
+        ((9, 15), Decimal('0.45')),
+        ((12, 15), Decimal('0.75')),
+        ((3, 15), Decimal('1.00')),
+    ]
+    # Below this liability no advance tax is due
+    ADVANCE_TAX_THRESHOLD = Decimal('10000.00')
+
     @staticmethod
     def suggest_deductions(user):
         """Generate sample tax deduction suggestions."""
@@ -37,7 +436,78 @@ class TaxPlanningService:
         ]
         return suggestions
 
-    @staticmethod
-    def estimate_quarterly_taxes(user, year):
-        """Provide a sample quarterly tax estimate."""
-        return Decimal('3000.00')  # Sample quarterly payment 
\ No newline at end of file
+    @classmethod
+    def estimate_quarterly_taxes(cls, user, year=None):
+        """
+        Advance tax installments for a financial year, cached per user per day
+
+        Args:
+            user: The taxpayer
+            year (int): Financial year, defaults to the current one
+
+        Returns:
+            dict: year-to-date and projected income, the projected liability and
+            the installments due on each advance tax date
+        """
+        today = timezone.localdate()
+        year = year if year is not None else TaxableIncomeSyncService.financial_year(today)
+        key = versioned_user_key('tax_management', user.pk, 'advance_tax', year, today.isoformat())
+        estimate = cache.get(key)
+        if estimate is None:
+            estimate = cls.project_advance_tax(user.pk, year, today)
+            tomorrow = datetime.combine(today + timedelta(days=1), time.min, tzinfo=timezone.get_current_timezone())
+            cache.set(key, estimate, timeout=max(1, int((tomorrow - timezone.now()).total_seconds())))
+        return estimate
+
+    @classmethod
+    def project_advance_tax(cls, user_id, year, today):
+        """
+        Project the year's income and spread the resulting liability over the due dates
+
+        Incomes recorded in my_finances are expanded once over the whole year and
+        split into what has been received up to today and what recurring rules
+        will still pay; manual TaxableIncome entries count as annual figures.
+        """
+        start, end = TaxableIncomeSyncService.year_bounds(year)
+        ytd_income = projected_income = Decimal('0.00')
+        for income in TaxableIncomeSyncService.taxable_incomes(user_id, start, end).iterator():
+            for day in TaxableIncomeSyncService.occurrences(income, end):
+                if day < start:
+                    continue
+                if day <= today:
+                    ytd_income += income.value
+                else:
+                    projected_income += income.value
+
+        inputs = TaxCalculationService.get_inputs(user_id, year, income_sources=['MANUAL'])
+        manual_income = inputs.pop('total_income')
+        result = TaxCalculationService.evaluate(year, ytd_income + projected_income + manual_income, **inputs)
+        liability = result['tax_liability']
+        required = liability >= cls.ADVANCE_TAX_THRESHOLD
+
+        installments = []
+        paid_share = Decimal('0')
+        for (month, day), share in cls.ADVANCE_TAX_SCHEDULE:
+            due_date = date(year if month >= 4 else year + 1, month, day)
+            amount = (liability * (share - paid_share)).quantize(Decimal('0.01')) if required else Decimal('0.00')
+            installments.append({
+                'due_date': due_date,
+                'cumulative_share': share,
+                'amount': amount,
+                'is_past': due_date < today,
+            })
+            paid_share = share
+
+        return {
+            'year': year,
+            'as_of': today,
+            'ytd_income': ytd_income,
+            'projected_income': projected_income,
+            'manual_income': manual_income,
+            'total_income': result['total_income'],
+            'taxable_income': result['taxable_income'],
+            'tax_liability': liability,
+            'advance_tax_required': required,
+            'installments': installments,
+            'next_installment': next((i for i in installments if not i['is_past']), None),
+        } 
\ No newline at end of file
@@ -0,0 +1,35 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from my_finances.models import Income
+from .models import TaxDeduction, TaxProfile, TaxableIncome
+from .services import TaxCalculationService, TaxableIncomeSyncService
+
+
+@receiver(post_save, sender=TaxableIncome)
+@receiver(post_save, sender=TaxDeduction)
+@receiver(post_save, sender=TaxProfile)
+@receiver(post_delete, sender=TaxableIncome)
+@receiver(post_delete, sender=TaxDeduction)
+@receiver(post_delete, sender=TaxProfile)
+def invalidate_tax_results(sender, instance, **kwargs):
+    TaxCalculationService.invalidate(instance.user_id)
+
+
+@receiver(pre_save, sender=Income)
+def remember_taxable_years(sender, instance, **kwargs):
+    """Note which years the income counted towards before the edit, so they are rebuilt too"""
+    previous = Income.objects.filter(pk=instance.pk).first() if instance.pk else None
+    instance._previous_taxable_years = {
+        year for year, _ in TaxableIncomeSyncService.contributions(previous)
+    } if previous else set()
+
+
+@receiver(post_save, sender=Income)
+@receiver(post_delete, sender=Income)
+def sync_taxable_income(sender, instance, **kwargs):
+    years = {year for year, _ in TaxableIncomeSyncService.contributions(instance)}
+    years |= getattr(instance, '_previous_taxable_years', set())
+    TaxableIncomeSyncService.recompute(instance.user_id, years)
+    # Timing changes within a year leave the totals alone but move the advance tax projection
+    TaxCalculationService.invalidate(instance.user_id)
@@ -0,0 +1,172 @@
+"""
+Versioned income tax slab tables.
+
+Each table is keyed by the financial year it takes effect from (FY 2024-25 is
+2024), the regime and the filing status. A year uses the newest version that is
+not later than it, so a table stays in force until it is superseded. Indian
+slabs do not depend on filing status, so every regime ships a single table
+under ALL_STATUSES; a status-specific entry takes precedence when present.
+"""
+from bisect import bisect_right
+from decimal import Decimal
+from functools import cached_property, lru_cache
+
+import numpy as np
+
+ALL_STATUSES = '*'
+CENTS = Decimal('0.01')
+
+REGIMES = [
+    ('NEW', 'New Regime'),
+    ('OLD', 'Old Regime'),
+]
+
+# (effective year, regime, filing status) -> table definition.
+# Brackets are (lower bound, marginal rate); the last one is open ended.
+# marginal_relief caps the tax just above rebate_limit at the income over it (new regime
+# section 87A), so earning a rupee more never costs more than that rupee.
+SLAB_TABLES = {
+    (2023, 'NEW', ALL_STATUSES): {
+        'brackets': [(0, '0'), (300000, '0.05'), (600000, '0.10'), (900000, '0.15'),
+                     (1200000, '0.20'), (1500000, '0.30')],
+        'rebate_limit': 700000,
+        'rebate_max': 25000,
+        'cess_rate': '0.04',
+        'marginal_relief': True,
+    },
+    (2024, 'NEW', ALL_STATUSES): {
+        'brackets': [(0, '0'), (300000, '0.05'), (700000, '0.10'), (1000000, '0.15'),
+                     (1200000, '0.20'), (1500000, '0.30')],
+        'rebate_limit': 700000,
+        'rebate_max': 25000,
+        'cess_rate': '0.04',
+        'marginal_relief': True,
+    },
+    (2025, 'NEW', ALL_STATUSES): {
+        'brackets': [(0, '0'), (400000, '0.05'), (800000, '0.10'), (1200000, '0.15'),
+                     (1600000, '0.20'), (2000000, '0.25'), (2400000, '0.30')],
+        'rebate_limit': 1200000,
+        'rebate_max': 60000,
+        'cess_rate': '0.04',
+        'marginal_relief': True,
+    },
+    (2023, 'OLD', ALL_STATUSES): {
+        'brackets': [(0, '0'), (250000, '0.05'), (500000, '0.20'), (1000000, '0.30')],
+        'rebate_limit': 500000,
+        'rebate_max': 12500,
+        'cess_rate': '0.04',
+    },
+}
+
+
+class SlabTable:
+    """
+    A slab table compiled into bracket arrays.
+
+    ``lowers`` and ``rates`` hold each bracket's lower bound and marginal rate,
+    and ``base`` the tax accumulated below each lower bound, so the tax on any
+    income is ``base[i] + (income - lowers[i]) * rates[i]`` for the bracket
+    ``i`` it falls in.
+    """
+
+    def __init__(self, version, regime, filing_status, brackets, rebate_limit=0, rebate_max=0, cess_rate='0',
+                 marginal_relief=False):
+        self.version = version
+        self.regime = regime
+        self.filing_status = filing_status
+        self.lowers = tuple(Decimal(lower) for lower, _ in brackets)
+        self.rates = tuple(Decimal(rate) for _, rate in brackets)
+        base = [Decimal('0')]
+        for i in range(1, len(self.lowers)):
+            base.append(base[-1] + (self.lowers[i] - self.lowers[i - 1]) * self.rates[i - 1])
+        self.base = tuple(base)
+        self.rebate_limit = Decimal(rebate_limit)
+        self.rebate_max = Decimal(rebate_max)
+        self.cess_rate = Decimal(cess_rate)
+        self.marginal_relief = marginal_relief
+
+    @cached_property
+    def arrays(self):
+        """lowers, rates and base as float arrays for vectorized evaluation"""
+        return (np.array(self.lowers, dtype=float), np.array(self.rates, dtype=float),
+                np.array(self.base, dtype=float))
+
+    def compute_many(self, taxable_incomes):
+        """
+        Vectorized counterpart of compute() for an array of taxable incomes.
+
+        Returns:
+            dict: arrays of slab_tax, rebate, cess, tax_liability and marginal_rate
+        """
+        lowers, rates, base = self.arrays
+        incomes = np.maximum(np.asarray(taxable_incomes, dtype=float), 0)
+        brackets = np.maximum(np.searchsorted(lowers, incomes, side='right') - 1, 0)
+        slab_tax = base[brackets] + (incomes - lowers[brackets]) * rates[brackets]
+        limit = float(self.rebate_limit)
+        rebate = np.where(incomes <= limit, np.minimum(slab_tax, float(self.rebate_max)), 0.0)
+        if self.marginal_relief:
+            rebate = np.where(incomes > limit, np.maximum(slab_tax - (incomes - limit), 0.0), rebate)
+        cess = (slab_tax - rebate) * float(self.cess_rate)
+        return {
+            'slab_tax': np.round(slab_tax, 2),
+            'rebate': np.round(rebate, 2),
+            'cess': np.round(cess, 2),
+            'tax_liability': np.round(slab_tax - rebate + cess, 2),
+            'marginal_rate': rates[brackets],
+        }
+
+    def bracket(self, income):
+        """Index of the bracket an income falls in"""
+        return max(bisect_right(self.lowers, income) - 1, 0)
+
+    def slab_tax(self, income):
+        i = self.bracket(income)
+        return self.base[i] + (income - self.lowers[i]) * self.rates[i]
+
+    def compute(self, taxable_income):
+        """
+        Tax on a taxable income.
+
+        Args:
+            taxable_income (Decimal): Income after deductions
+
+        Returns:
+            dict: slab_tax, rebate (including any marginal relief), cess,
+            tax_liability and marginal_rate
+        """
+        taxable_income = max(Decimal(taxable_income), Decimal('0'))
+        slab_tax = self.slab_tax(taxable_income)
+        if taxable_income <= self.rebate_limit:
+            rebate = min(slab_tax, self.rebate_max)
+        elif self.marginal_relief:
+            rebate = max(slab_tax - (taxable_income - self.rebate_limit), Decimal('0'))
+        else:
+            rebate = Decimal('0')
+        cess = (slab_tax - rebate) * self.cess_rate
+        return {
+            'slab_tax': slab_tax.quantize(CENTS),
+            'rebate': rebate.quantize(CENTS),
+            'cess': cess.quantize(CENTS),
+            'tax_liability': (slab_tax - rebate + cess).quantize(CENTS),
+            'marginal_rate': self.rates[self.bracket(taxable_income)],
+        }
+
+
+@lru_cache(maxsize=None)
+def get_slab_table(year, regime, filing_status):
+    """
+    Return the compiled table in force for a financial year.
+
+    Years before the first version use the earliest table for the regime.
+    """
+    versions = sorted(
+        (version, status) for version, table_regime, status in SLAB_TABLES
+        if table_regime == regime and status in (filing_status, ALL_STATUSES)
+    )
+    if not versions:
+        raise ValueError(f'No slab table for regime {regime}')
+    in_force = [entry for entry in versions if entry[0] <= year] or versions[:1]
+    version = in_force[-1][0]
+    # Prefer a status-specific table over the shared one for the same version
+    status = filing_status if (version, regime, filing_status) in SLAB_TABLES else ALL_STATUSES
+    return SlabTable(version, regime, status, **SLAB_TABLES[(version, regime, status)])
@@ -0,0 +1,316 @@
+import json
+from io import StringIO
+from datetime import date
+from unittest import mock
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.db.models import Sum
+from django.urls import reverse
+
+from my_finances.models import Income
+from .models import TaxBatchCheckpoint, TaxCalculation, TaxDeduction, TaxProfile, TaxableIncome
+from .services import TaxCalculationService, TaxPlanningService, TaxScenarioService, TaxableIncomeSyncService
+from .slabs import get_slab_table
+
+
+class SlabTableTest(TestCase):
+    def test_closed_form_matches_bracket_by_bracket_sum(self):
+        table = get_slab_table(2024, 'NEW', 'SINGLE')
+        for income in [0, 250000, 700000, 1000001, 1499999, 3200000]:
+            income = Decimal(income)
+            expected = sum(
+                (min(income, upper) - lower) * rate
+                for lower, upper, rate in zip(table.lowers, table.lowers[1:] + (income,), table.rates)
+                if income > lower
+            )
+            self.assertEqual(table.slab_tax(income), expected)
+
+    def test_vectorized_matches_decimal_engine(self):
+        table = get_slab_table(2025, 'NEW', 'SINGLE')
+        incomes = [0, 399999.5, 800000, 1200000, 1200000.01, 1875000.25, 5000000]
+        vectorized = table.compute_many(incomes)
+        for i, income in enumerate(incomes):
+            expected = table.compute(Decimal(str(income)))
+            self.assertAlmostEqual(vectorized['tax_liability'][i], float(expected['tax_liability']), places=2)
+            self.assertEqual(vectorized['marginal_rate'][i], float(expected['marginal_rate']))
+
+    def test_version_in_force(self):
+        self.assertEqual(get_slab_table(2024, 'NEW', 'SINGLE').version, 2024)
+        self.assertEqual(get_slab_table(2030, 'NEW', 'SINGLE').version, 2025)
+        self.assertEqual(get_slab_table(2019, 'OLD', 'MARRIED_JOINT').version, 2023)
+
+    def test_rebate_and_cess(self):
+        table = get_slab_table(2024, 'NEW', 'SINGLE')
+        self.assertEqual(table.compute(Decimal('700000'))['tax_liability'], Decimal('0.00'))
+        # 20000 on 3-7L + 30000 on 7-10L + 15000 on 10-11L, plus 4% cess
+        result = table.compute(Decimal('1100000'))
+        self.assertEqual(result['slab_tax'], Decimal('65000.00'))
+        self.assertEqual(result['tax_liability'], Decimal('67600.00'))
+        self.assertEqual(result['marginal_rate'], Decimal('0.15'))
+
+    def test_marginal_relief_above_rebate_limit(self):
+        for year in (2023, 2024, 2025):
+            table = get_slab_table(year, 'NEW', 'SINGLE')
+            # pre-cess tax is capped at the income over the limit, plus 4% cess
+            incomes = [table.rebate_limit + 1, table.rebate_limit + 10000]
+            expected = [Decimal('1.04'), Decimal('10400.00')]
+            for income, liability in zip(incomes, expected):
+                self.assertEqual(table.compute(income)['tax_liability'], liability)
+            self.assertEqual(list(table.compute_many(incomes)['tax_liability']), [float(x) for x in expected])
+        # the cap no longer binds once the slab tax is below the income over the limit
+        self.assertEqual(get_slab_table(2024, 'NEW', 'SINGLE').compute(Decimal('1100000'))['rebate'], Decimal('0.00'))
+
+
+class TaxCalculationServiceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='tax@example.com',
+            first_name='Tax',
+            last_name='Payer',
+            password='testpass123'
+        )
+        TaxProfile.objects.create(user=self.user, filing_status='SINGLE', regime='OLD')
+        TaxableIncome.objects.create(user=self.user, year=2024, income_type='SALARY', amount=Decimal('900000.00'))
+        TaxableIncome.objects.create(user=self.user, year=2024, income_type='INVESTMENT', amount=Decimal('100000.00'))
+        TaxableIncome.objects.create(user=self.user, year=2023, income_type='SALARY', amount=Decimal('50000.00'))
+        TaxDeduction.objects.create(user=self.user, year=2024, deduction_type='STANDARD', amount=Decimal('50000.00'))
+
+    def test_inputs_read_in_one_query(self):
+        with self.assertNumQueries(1):
+            inputs = TaxCalculationService.get_inputs(self.user.pk, 2024)
+        self.assertEqual(inputs, {
+            'total_income': Decimal('1000000.00'),
+            'total_deductions': Decimal('50000.00'),
+            'filing_status': 'SINGLE',
+            'regime': 'OLD',
+        })
+
+    def test_liability_is_recomputed_when_inputs_change(self):
+        calculation = TaxCalculationService.calculate_tax_liability(self.user, 2024)
+        # Old regime on 9.5L: 12500 + 90000 = 102500, plus 4% cess
+        self.assertEqual(calculation.taxable_income, Decimal('950000.00'))
+        self.assertEqual(calculation.tax_liability, Decimal('106600.00'))
+
+        TaxDeduction.objects.create(user=self.user, year=2024, deduction_type='ITEMIZED', amount=Decimal('450000.00'))
+        calculation = TaxCalculationService.calculate_tax_liability(self.user, 2024)
+        self.assertEqual(calculation.taxable_income, Decimal('500000.00'))
+        self.assertEqual(calculation.tax_liability, Decimal('0.00'))
+
+    def test_calculation_is_upserted_once_per_year(self):
+        url = reverse('tax_management:calculate_taxes', args=[2024])
+        self.client.force_login(self.user)
+        first = self.client.get(url).context['calculation']
+        self.assertEqual(first.tax_liability, Decimal('106600.00'))
+
+        # Unchanged inputs: one query for the inputs and stored fingerprint, one to load the row
+        with self.assertNumQueries(2):
+            self.assertEqual(TaxCalculationService.calculate_tax_liability(self.user, 2024).pk, first.pk)
+
+        TaxProfile.objects.filter(user=self.user).update(regime='NEW')
+        second = self.client.get(url).context['calculation']
+        self.assertEqual(second.pk, first.pk)
+        self.assertNotEqual(second.input_fingerprint, first.input_fingerprint)
+        self.assertEqual(TaxCalculation.objects.filter(user=self.user, year=2024).count(), 1)
+
+    def test_dashboard_fragments_refresh_after_calculation(self):
+        self.client.force_login(self.user)
+        dashboard = reverse('tax_management:dashboard')
+        self.assertNotContains(self.client.get(dashboard), 'Tax Year 2024')
+        self.client.get(reverse('tax_management:calculate_taxes', args=[2024]))
+        self.assertContains(self.client.get(dashboard), 'Tax Year 2024')
+
+
+class TaxScenarioViewTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='scenario@example.com',
+            first_name='Scenario',
+            last_name='Planner',
+            password='testpass123'
+        )
+        self.client.force_login(self.user)
+
+    def post(self, payload):
+        return self.client.post(reverse('tax_management:evaluate_scenarios'),
+                                data=json.dumps(payload), content_type='application/json')
+
+    def test_picks_regime_with_lowest_tax(self):
+        response = self.post({
+            'year': 2024,
+            'scenarios': [
+                {'label': 'Few deductions', 'income': 1500000, 'deductions': {'NEW': 75000, 'OLD': 50000}},
+                {'label': 'Full 80C and HRA', 'income': 1500000, 'deductions': {'NEW': 75000, 'OLD': 600000}},
+            ],
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['scenarios'][0]['best_regime'], 'NEW')
+        self.assertEqual(data['scenarios'][1]['best_regime'], 'OLD')
+        self.assertEqual(data['optimal']['label'], 'Full 80C and HRA')
+        self.assertEqual(data['optimal']['regime'], 'OLD')
+        self.assertEqual(TaxCalculation.objects.count(), 0)
+
+    def test_many_scenarios_in_one_request(self):
+        scenarios = [{'income': 300000 + 10000 * i, 'deductions': 50000} for i in range(500)]
+        response = self.post({'year': 2025, 'scenarios': scenarios, 'regimes': ['NEW']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['scenarios']), 500)
+        # A higher income is not a better plan; scenarios with different incomes are not ranked
+        self.assertIsNone(response.json()['optimal'])
+
+    def test_rejects_invalid_payload(self):
+        self.assertEqual(self.post({'year': 2024, 'scenarios': []}).status_code, 400)
+        self.assertEqual(self.post({'year': 2024, 'scenarios': [{'income': 1}], 'regimes': ['FLAT']}).status_code, 400)
+        self.assertEqual(self.post({'scenarios': [{'income': 1}]}).status_code, 400)
+
+    def test_rejects_non_finite_amounts_and_negative_deductions(self):
+        for scenario in [{'income': 'NaN'}, {'income': float('inf')}, {'income': 1000000, 'deductions': 'nan'},
+                         {'income': 1000000, 'deductions': -50000},
+                         {'income': 1000000, 'deductions': {'OLD': -1, 'NEW': 0}}]:
+            with self.assertRaises(ValueError):
+                TaxScenarioService.evaluate_scenarios(2024, [scenario])
+        response = self.client.post(reverse('tax_management:evaluate_scenarios'), content_type='application/json',
+                                    data='{"year": 2024, "scenarios": [{"income": NaN}]}')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.post({'year': 2024, 'scenarios': [{'income': 1, 'deductions': -5}]}).status_code, 400)
+
+
+class ComputeYearEndTaxesCommandTest(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.users = []
+        for i, income in enumerate(['800000.00', '1800000.00', '400000.00']):
+            user = User.objects.create_user(
+                email=f'yearend{i}@example.com',
+                first_name=f'Year{i}',
+                last_name=f'End{i}',
+                password='testpass123'
+            )
+            TaxableIncome.objects.create(user=user, year=2024, income_type='SALARY', amount=Decimal(income))
+            self.users.append(user)
+        # No data for the year: skipped
+        User.objects.create_user(email='idle@example.com', first_name='Idle', last_name='User', password='testpass123')
+
+    def run_command(self, *args):
+        call_command('compute_year_end_taxes', 2024, '--workers', '1', '--chunk-size', '2', *args, stdout=StringIO())
+
+    def test_computes_every_user_once(self):
+        # A stale row from an interactive calculation is updated in place
+        TaxCalculation.objects.create(user=self.users[0], year=2024, total_income=0, total_deductions=0,
+                                      taxable_income=0, tax_liability=0)
+        self.run_command()
+        stdout = StringIO()
+        call_command('compute_year_end_taxes', 2024, '--workers', '1', '--restart', stdout=stdout)
+        self.assertIn('0 calculations stored, 3 unchanged', stdout.getvalue())
+
+        self.assertEqual(TaxCalculation.objects.filter(year=2024).count(), 3)
+        for user in self.users:
+            calculation = TaxCalculation.objects.get(user=user, year=2024)
+            inputs = TaxCalculationService.get_inputs(user.pk, 2024)
+            self.assertEqual(calculation.tax_liability,
+                             TaxCalculationService.evaluate(2024, **inputs)['tax_liability'])
+        self.assertIsNotNone(TaxBatchCheckpoint.objects.get(year=2024).completed_at)
+
+    def test_resumes_after_checkpoint(self):
+        TaxBatchCheckpoint.objects.create(year=2024, last_user_id=self.users[0].pk)
+        self.run_command()
+        self.assertQuerySetEqual(
+            TaxCalculation.objects.filter(year=2024).order_by('user_id').values_list('user_id', flat=True),
+            [self.users[1].pk, self.users[2].pk]
+        )
+
+
+class TaxableIncomeSyncTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='sync@example.com',
+            first_name='Sync',
+            last_name='Earner',
+            password='testpass123'
+        )
+
+    def synced(self):
+        return dict(
+            TaxableIncome.objects.filter(user=self.user, source='FINANCES')
+            .values('year').annotate(total=Sum('amount')).values_list('year', 'total')
+        )
+
+    def test_recurring_salary_is_expanded_per_financial_year(self):
+        # Jan 31 monthly: clamps to month ends, 3 payments in FY 2023 and 12 in FY 2024
+        salary = Income.objects.create(
+            user=self.user, value=Decimal('50000.00'), date=date(2024, 1, 31), type=Income.ITypes.SAL,
+            repetitive=True, repetition_interval=Income.RInterval.MON, repetition_time=1,
+            repetition_end=date(2025, 3, 31)
+        )
+        Income.objects.create(user=self.user, value=Decimal('100000.00'), date=date(2024, 12, 20),
+                              type=Income.ITypes.BON)
+        Income.objects.create(user=self.user, value=Decimal('999.00'), date=date(2024, 12, 20),
+                              type=Income.ITypes.SAV)
+        self.assertEqual(self.synced(), {2023: Decimal('150000.00'), 2024: Decimal('700000.00')})
+
+        salary.value = Decimal('60000.00')
+        salary.date = date(2024, 4, 30)
+        salary.save()
+        self.assertEqual(self.synced(), {2024: Decimal('820000.00')})
+
+        salary.delete()
+        self.assertEqual(self.synced(), {2024: Decimal('100000.00')})
+
+    def test_synced_totals_feed_the_tax_engine(self):
+        TaxableIncome.objects.create(user=self.user, year=2024, income_type='INVESTMENT', amount=Decimal('50000.00'))
+        Income.objects.create(user=self.user, value=Decimal('900000.00'), date=date(2024, 6, 1),
+                              type=Income.ITypes.SAL)
+        self.assertEqual(TaxCalculationService.calculate_tax_liability(self.user, 2024).total_income,
+                         Decimal('950000.00'))
+
+        TaxableIncome.objects.filter(user=self.user, source='FINANCES').delete()
+        call_command('sync_taxable_income', stdout=StringIO())
+        self.assertEqual(self.synced(), {2024: Decimal('900000.00')})
+
+
+class AdvanceTaxEstimateTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='advance@example.com',
+            first_name='Advance',
+            last_name='Payer',
+            password='testpass123'
+        )
+        # 12 x 1.5L monthly salary through FY 2024, 9 of them paid by 2024-12-20
+        Income.objects.create(
+            user=self.user, value=Decimal('150000.00'), date=date(2024, 4, 1), type=Income.ITypes.SAL,
+            repetitive=True, repetition_interval=Income.RInterval.MON, repetition_time=1,
+            repetition_end=date(2025, 3, 31)
+        )
+        TaxableIncome.objects.create(user=self.user, year=2024, income_type='INVESTMENT', amount=Decimal('200000.00'))
+
+    def estimate(self, today):
+        with mock.patch('tax_management.services.timezone.localdate', return_value=today):
+            return TaxPlanningService.estimate_quarterly_taxes(self.user, 2024)
+
+    def test_projection_and_installments(self):
+        estimate = self.estimate(date(2024, 12, 20))
+        self.assertEqual(estimate['ytd_income'], Decimal('1350000.00'))
+        self.assertEqual(estimate['projected_income'], Decimal('450000.00'))
+        # Synced salary rows are not counted twice
+        self.assertEqual(estimate['total_income'], Decimal('2000000.00'))
+        self.assertEqual(estimate['tax_liability'],
+                         TaxCalculationService.calculate_tax_liability(self.user, 2024).tax_liability)
+        amounts = [installment['amount'] for installment in estimate['installments']]
+        self.assertEqual(sum(amounts), estimate['tax_liability'])
+        self.assertEqual(amounts[0], (estimate['tax_liability'] * Decimal('0.15')).quantize(Decimal('0.01')))
+        self.assertEqual(estimate['next_installment']['due_date'], date(2025, 3, 15))
+
+    def test_cached_per_day(self):
+        self.estimate(date(2024, 12, 20))
+        with self.assertNumQueries(0):
+            self.estimate(date(2024, 12, 20))
+        with self.assertNumQueries(2):
+            self.estimate(date(2024, 12, 21))
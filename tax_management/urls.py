@@ -7,4 +7,5 @@ urlpatterns = [
     path('dashboard/', views.tax_dashboard, name='dashboard'),
     path('profile/update/', views.update_tax_profile, name='update_profile'),
     path('calculate/<int:year>/', views.calculate_taxes, name='calculate_taxes'),
+    path('scenarios/', views.evaluate_scenarios, name='evaluate_scenarios'),
 ] 
\ No newline at end of file
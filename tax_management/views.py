@@ -1,15 +1,24 @@
+import json
 from django.shortcuts import render, redirect
+from django.http import JsonResponse
+from django.db.models import Sum
+from django.utils import timezone
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .services import TaxCalculationService, TaxPlanningService
+from .services import TaxCalculationService, TaxPlanningService, TaxScenarioService, TaxableIncomeSyncService
 from .models import TaxProfile, TaxableIncome, TaxDeduction, TaxCalculation
 from .forms import TaxProfileForm, TaxableIncomeForm, TaxDeductionForm
 
 @login_required
 def tax_dashboard(request):
+    tax_year = TaxableIncomeSyncService.financial_year(timezone.localdate())
     context = {
         'profile': TaxProfile.objects.get_or_create(user=request.user)[0],
+        'tax_year': tax_year,
+        'income_totals': TaxableIncome.objects.filter(user=request.user, year=tax_year)
+            .values('income_type').annotate(total=Sum('amount')).order_by('income_type'),
         'recent_calculations': TaxCalculation.objects.filter(user=request.user).order_by('-year')[:3],
+        'advance_tax': TaxPlanningService.estimate_quarterly_taxes(request.user, tax_year),
         'deduction_suggestions': TaxPlanningService.suggest_deductions(request.user)
     }
     return render(request, 'tax_management/dashboard.html', context)
@@ -32,4 +41,22 @@ def update_tax_profile(request):
 @login_required
 def calculate_taxes(request, year):
     calculation = TaxCalculationService.calculate_tax_liability(request.user, year)
-    return render(request, 'tax_management/tax_calculation.html', {'calculation': calculation}) 
\ No newline at end of file
+    return render(request, 'tax_management/tax_calculation.html', {'calculation': calculation}) 
+
+@login_required
+def evaluate_scenarios(request):
+    """Compare regimes and deduction mixes for a JSON list of scenarios without saving anything"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=405)
+    try:
+        payload = json.loads(request.body)
+        profile = TaxProfile.objects.filter(user=request.user).first()
+        result = TaxScenarioService.evaluate_scenarios(
+            int(payload['year']),
+            payload['scenarios'],
+            filing_status=payload.get('filing_status') or (profile.filing_status if profile else None),
+            regimes=payload.get('regimes'),
+        )
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        return JsonResponse({'error': f'Invalid scenarios: {e}'}, status=400)
+    return JsonResponse(result)
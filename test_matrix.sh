@@ -0,0 +1,108 @@
+#!/bin/bash
+# Runs the test suite and the AI view benchmark against each database profile, plus the
+# SQLite journal/pragma benchmark for the sqlite profile.
+#
+#   ./test_matrix.sh                 # sqlite and postgres
+#   ./test_matrix.sh postgres        # one profile only
+#
+# The postgres profile expects a local server, e.g.
+#   docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=postgres postgres:16
+# and reads POSTGRES_HOST/PORT/USER/PASSWORD from the environment (defaults below).
+# BENCH_WORKERS sets the gunicorn worker count used for the benchmark.
+
+set -u
+
+PROFILES=${*:-sqlite postgres}
+BENCH_WORKERS=${BENCH_WORKERS:-4}
+BENCH_REQUESTS=${BENCH_REQUESTS:-200}
+BENCH_PORT=${BENCH_PORT:-8111}
+FAKE_GEMINI_PORT=${FAKE_GEMINI_PORT:-8765}
+WORKDIR=$(mktemp -d)
+STATUS=0
+
+export GEMINI_BASE_URL="http://127.0.0.1:${FAKE_GEMINI_PORT}/v1beta/models"
+# Measure raw throughput rather than the AI rate limiter
+export AI_RATE_LIMIT_USER_CAPACITY=1000000
+export AI_RATE_LIMIT_GLOBAL_CAPACITY=1000000
+
+cleanup() {
+    [ -n "${SERVER_PID:-}" ] && kill "$SERVER_PID" 2>/dev/null
+    [ -n "${FAKE_PID:-}" ] && kill "$FAKE_PID" 2>/dev/null
+    rm -rf "$WORKDIR"
+}
+trap cleanup EXIT
+
+use_profile() {
+    case "$1" in
+        sqlite)
+            export DB_ENGINE=sqlite
+            export SQLITE_PATH="$WORKDIR/matrix.sqlite3"
+            ;;
+        postgres)
+            export DB_ENGINE=postgres
+            export POSTGRES_HOST=${POSTGRES_HOST:-127.0.0.1}
+            export POSTGRES_PORT=${POSTGRES_PORT:-5432}
+            export POSTGRES_USER=${POSTGRES_USER:-postgres}
+            export POSTGRES_PASSWORD=${POSTGRES_PASSWORD:-postgres}
+            export POSTGRES_NAME=${MATRIX_POSTGRES_NAME:-fintracr_matrix}
+            export POSTGRES_SSLMODE=${POSTGRES_SSLMODE:-disable}
+            python - <<'EOF' || return 1
+import os, psycopg2
+conn = psycopg2.connect(dbname='postgres', host=os.environ['POSTGRES_HOST'], port=os.environ['POSTGRES_PORT'],
+                        user=os.environ['POSTGRES_USER'], password=os.environ['POSTGRES_PASSWORD'],
+                        sslmode=os.environ['POSTGRES_SSLMODE'], connect_timeout=5)
+conn.autocommit = True
+with conn.cursor() as cursor:
+    cursor.execute('DROP DATABASE IF EXISTS "%s"' % os.environ['POSTGRES_NAME'])
+    cursor.execute('CREATE DATABASE "%s"' % os.environ['POSTGRES_NAME'])
+EOF
+            ;;
+        *)
+            echo "Unknown profile $1" >&2
+            return 1
+            ;;
+    esac
+}
+
+run_benchmark() {
+    python manage.py migrate -v0 || return 1
+    python manage.py shell -c "
+from django.contrib.auth import get_user_model
+get_user_model().objects.filter(email='bench@example.com').exists() or get_user_model().objects.create_user(
+    email='bench@example.com', first_name='Bench', last_name='Mark', password='bench-password')
+" || return 1
+
+    python manage.py fake_gemini_server --port "$FAKE_GEMINI_PORT" --latency-ms 300 --seed 1 \
+        > "$WORKDIR/fake_gemini.log" 2>&1 &
+    FAKE_PID=$!
+    gunicorn benji_portfolio.wsgi --workers "$BENCH_WORKERS" --bind "127.0.0.1:$BENCH_PORT" \
+        > "$WORKDIR/gunicorn.log" 2>&1 &
+    SERVER_PID=$!
+    sleep 3
+
+    python manage.py benchmark_ai_views --base-url "http://127.0.0.1:$BENCH_PORT" --email bench@example.com \
+        --requests "$BENCH_REQUESTS" --concurrency $((BENCH_WORKERS * 2)) --server-workers "$BENCH_WORKERS" \
+        --endpoints calculate,anomalies,forecast,dashboard
+    local result=$?
+
+    kill "$SERVER_PID" "$FAKE_PID" 2>/dev/null
+    wait "$SERVER_PID" "$FAKE_PID" 2>/dev/null
+    SERVER_PID= FAKE_PID=
+    return $result
+}
+
+for profile in $PROFILES; do
+    echo "=== $profile ==="
+    if ! use_profile "$profile"; then
+        echo "Skipping $profile: database not reachable"
+        STATUS=1
+        continue
+    fi
+    python manage.py test || STATUS=1
+    run_benchmark || STATUS=1
+    if [ "$profile" = sqlite ]; then
+        python manage.py benchmark_sqlite_concurrency --threads "$BENCH_WORKERS" || STATUS=1
+    fi
+done
+
+exit $STATUS
@@ -0,0 +1,146 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from my_finances.models import Balance, Income
+
+User = get_user_model()
+
+STARTUP_SCRIPT = ('import django; django.setup(); '
+                  'from django.urls import get_resolver; get_resolver().url_patterns')
+
+
+class Command(BaseCommand):
+    help = ('Compares process startup and per-request cost of the dev and prod settings modules '
+            'on a scratch SQLite database. A "-nofragments" suffix (e.g. prod-nofragments) runs a '
+            'profile with {% cache %} fragments disabled.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='dev,prod-nofragments,prod',
+                            help='Comma separated DJANGO_ENV values, optionally suffixed with -nofragments')
+        parser.add_argument('--pages', default='website:index,my_finances:current_period,my_finances:income_list,'
+                                               'tax_management:dashboard',
+                            help='Comma separated URL names requested as a logged-in user')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per page and profile')
+        parser.add_argument('--seed-rows', type=int, default=100, help='Incomes of the benchmark user')
+        parser.add_argument('--startup-runs', type=int, default=3, help='Cold starts timed per profile')
+        parser.add_argument('--measure', action='store_true',
+                            help='Internal: time requests in this process and print JSON')
+
+    def handle(self, *args, **options):
+        pages = [name.strip() for name in options['pages'].split(',') if name.strip()]
+        if options['measure']:
+            self.stdout.write(json.dumps(self.measure(pages, options['requests'], options['seed_rows'])))
+            return
+
+        profiles = [name.strip() for name in options['profiles'].split(',') if name.strip()]
+        directory = tempfile.mkdtemp()
+        environment = {
+            **os.environ,
+            'DB_ENGINE': 'sqlite',
+            'SQLITE_PATH': os.path.join(directory, 'benchmark.sqlite3'),
+            # prod requires a cache shared between processes
+            'CACHE_BACKEND': 'file',
+            'CACHE_LOCATION': os.path.join(directory, 'cache'),
+            'STATIC_ROOT': os.path.join(directory, 'static'),
+        }
+        try:
+            self.run_manage(environment, 'migrate', '-v0')
+            if any(profile.startswith('prod') for profile in profiles):
+                # prod resolves {% static %} through the manifest that collectstatic writes
+                self.run_manage({**environment, 'DJANGO_ENV': 'prod'}, 'collectstatic', '--noinput', '-v0')
+            results = []
+            for profile in profiles:
+                django_env, _, variant = profile.partition('-')
+                profile_environment = {
+                    **environment,
+                    'DJANGO_ENV': django_env,
+                    'TEMPLATE_FRAGMENT_CACHE': 'off' if variant == 'nofragments' else 'on',
+                }
+                startup = min(self.time_startup(profile_environment) for _ in range(options['startup_runs']))
+                output = self.run_manage(profile_environment, 'benchmark_settings_profiles', '--measure',
+                                         '--pages', ','.join(pages), '--requests', str(options['requests']),
+                                         '--seed-rows', str(options['seed_rows']))
+                results.append((profile, startup, json.loads(output.splitlines()[-1])))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        self.report(results)
+
+    @staticmethod
+    def run_manage(environment, *arguments):
+        completed = subprocess.run([sys.executable, 'manage.py', *arguments], cwd=settings.BASE_DIR,
+                                   env=environment, capture_output=True, text=True)
+        if completed.returncode:
+            raise CommandError(f'manage.py {" ".join(arguments)} failed:\n{completed.stderr}')
+        return completed.stdout
+
+    @staticmethod
+    def time_startup(environment):
+        """Wall time for a fresh interpreter to set up Django and load the URLconf"""
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=settings.BASE_DIR, env=environment, check=True,
+                       capture_output=True)
+        return time.perf_counter() - started
+
+    @staticmethod
+    def measure(pages, requests, seed_rows):
+        user, created = User.objects.get_or_create(email='profiles@example.com', defaults={
+            'username': 'profiles', 'first_name': 'Profiles', 'last_name': 'Benchmark',
+        })
+        if created:
+            start = date.today() - timedelta(days=seed_rows)
+            Balance.objects.create(user=user, value=Decimal('10000'), date=start, type=Balance.BType.CUR)
+            Income.objects.bulk_create([
+                Income(user=user, value=Decimal(1000 + i), date=start + timedelta(days=i), type=Income.ITypes.SAL)
+                for i in range(seed_rows)
+            ])
+        client = Client()
+        client.force_login(user)
+        urls = [reverse(name) for name in pages]
+        for url in urls:
+            # Warm up: URL resolution, template compilation, fragment caches and the toolbar's first render
+            client.get(url)
+
+        latencies = []
+        for i in range(requests * len(urls)):
+            started = time.perf_counter()
+            response = client.get(urls[i % len(urls)])
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                raise CommandError(f'{urls[i % len(urls)]} returned {response.status_code}')
+        return {
+            'debug': settings.DEBUG,
+            'latencies': latencies,
+        }
+
+    def report(self, results):
+        self.stdout.write(f"{'profile':<17} {'DEBUG':>6} {'startup ms':>11} {'mean ms':>8} {'p50 ms':>7} "
+                          f"{'p95 ms':>7}")
+        means = {}
+        for profile, startup, measured in results:
+            latencies = np.array(measured['latencies']) * 1000
+            means[profile] = latencies.mean()
+            p50, p95 = np.percentile(latencies, [50, 95])
+            self.stdout.write(f"{profile:<17} {str(measured['debug']):>6} {startup * 1000:>11.0f} "
+                              f"{means[profile]:>8.2f} {p50:>7.2f} {p95:>7.2f}")
+        for slower, faster in [('dev', 'prod'), ('prod-nofragments', 'prod'), ('dev-nofragments', 'dev')]:
+            if {slower, faster} <= means.keys():
+                saved = means[slower] - means[faster]
+                self.stdout.write(self.style.SUCCESS(
+                    f'{faster} saves {saved:.2f} ms per request ({saved / means[slower]:.0%}) over {slower}'
+                ))
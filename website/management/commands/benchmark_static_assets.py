@@ -0,0 +1,49 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+ASSET_PATTERN = re.compile(r'''(?:href|src)=["']([^"']+)["']''')
+
+
+class Command(BaseCommand):
+    help = ('Loads pages anonymously and fetches every static asset they reference the way a browser '
+            'would, reporting transferred bytes and how many requests a repeat visit still makes. '
+            'Run it under each DJANGO_ENV; prod needs collectstatic first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', default='website:index,accounts:login',
+                            help='Comma separated URL names')
+        parser.add_argument('--accept-encoding', default='br, gzip', help='Accept-Encoding sent for assets')
+
+    def handle(self, *args, **options):
+        client = Client()
+        assets = []
+        for name in [name.strip() for name in options['pages'].split(',') if name.strip()]:
+            response = client.get(reverse(name))
+            if response.status_code != 200:
+                raise CommandError(f'{name} returned {response.status_code}')
+            for url in ASSET_PATTERN.findall(response.content.decode()):
+                if url.startswith(settings.STATIC_URL) and url not in assets:
+                    assets.append(url)
+
+        self.stdout.write(f"{'asset':<60} {'bytes':>9} {'encoding':>9}  cache-control")
+        total = revalidated = 0
+        for url in assets:
+            response = client.get(url, HTTP_ACCEPT_ENCODING=options['accept_encoding'])
+            if response.status_code != 200:
+                raise CommandError(f'{url} returned {response.status_code}')
+            size = sum(len(chunk) for chunk in response.streaming_content) if response.streaming \
+                else len(response.content)
+            cache_control = response.get('Cache-Control', '')
+            total += size
+            # Without immutable the browser revalidates the asset on every reload
+            revalidated += 'immutable' not in cache_control
+            self.stdout.write(f"{url[-60:]:<60} {size:>9} {response.get('Content-Encoding', '-'):>9}  "
+                              f"{cache_control or '-'}")
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(assets)} assets, {total / 1024:.0f} KiB transferred; '
+            f'{revalidated} requests on a repeat visit (DEBUG={settings.DEBUG})'
+        ))
@@ -1,3 +1,80 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from helper.context_processors import add_custom_context
+from my_finances.models import Income
+
+
+class CustomContextTest(TestCase):
+    def test_request_without_resolver_match(self):
+        request = RequestFactory().get('/missing/')
+        request.user = AnonymousUser()
+        context = add_custom_context(request)
+        self.assertEqual(context['app_name'], '')
+        self.assertFalse(context['user'])
+
+    def test_sidebar_cached_per_view_not_per_path(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(email='sidebar@example.com', password='testpass123',
+                                                    first_name='Sidebar', last_name='Visitor')
+        self.client.force_login(user)
+        for value in ('100.00', '200.00'):
+            income = Income.objects.create(user=user, value=Decimal(value), date=date.today(), type=Income.ITypes.SAL)
+            response = self.client.get(reverse('my_finances:income_detail', args=[income.pk]))
+            self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(cache.get(make_template_fragment_key('sidebar', ['my_finances:income_detail', True])))
+        path = reverse('my_finances:income_detail', args=[income.pk])
+        self.assertIsNone(cache.get(make_template_fragment_key('sidebar', [path, True])))
+
+    def test_built_once_per_request(self):
+        request = RequestFactory().get('/')
+        request.resolver_match = None
+        self.assertIs(add_custom_context(request), add_custom_context(request))
+
+
+class MainPageQueryCountTest(TestCase):
+    """Session and user (with profile, cached after the first request) are the only queries on top of each page's own"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='pages@example.com', password='testpass123',
+                                                         first_name='Pages', last_name='Visitor')
+        self.client.force_login(self.user)
+
+    def assertPageQueries(self, url_name, num):
+        with self.assertNumQueries(num):
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_anonymous_index_needs_no_queries(self):
+        self.client.logout()
+        self.assertPageQueries('website:index', 0)
+
+    def test_index(self):
+        self.assertPageQueries('website:index', 2)
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=60)
+    def test_repeat_request_takes_user_from_cache(self):
+        self.client.get(reverse('website:index'))
+        self.assertPageQueries('website:index', 1)
+
+    def test_current_period(self):
+        # + latest balance
+        self.assertPageQueries('my_finances:current_period', 3)
+
+    def test_income_list(self):
+        # + paginator count
+        self.assertPageQueries('my_finances:income_list', 3)
+
+    def test_profile_is_loaded_with_the_user(self):
+        response = self.assertPageQueries('accounts:profile', 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(response.context['user'].profile.user_id, self.user.pk)